@@ -0,0 +1,175 @@
+"""
+Admin-only diagnostics: sampling profiles and tracemalloc snapshots of the live process
+
+Every endpoint requires the X-Admin-Token header to match ADMIN_TOKEN; with
+no token configured the whole router answers 403.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import PlainTextResponse
+
+from app.profiling import (
+    ADMIN_TOKEN, MODES, PROFILE_INTERVAL, PROFILE_MAX_SECONDS, TRACEMALLOC_FRAMES,
+    admin_token_valid, profile_process, request_profiles, allocation_tracker,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# One process-wide profile at a time: concurrent samplers would skew each other
+_profile_lock = asyncio.Lock()
+
+KEY_TYPES = ("lineno", "traceback", "filename")
+
+
+def _profile_response(profiler, output: str, top: int, **extra):
+    if output == "folded":
+        return PlainTextResponse(profiler.folded())
+    return {
+        "status": "success",
+        **extra,
+        **profiler.summary(top),
+        "folded": profiler.folded().splitlines(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.post("/profile")
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    mode: str = Query("wall", pattern=f"^({'|'.join(MODES)})$"),
+    interval_ms: float = Query(PROFILE_INTERVAL * 1000, ge=0.5, le=1000),
+    output: str = Query("folded", pattern="^(folded|json)$"),
+    top: int = Query(25, ge=1, le=500)
+):
+    """
+    Sample every thread for `seconds` and return folded stacks (flamegraph.pl,
+    speedscope) or a JSON summary with the heaviest functions
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        async with _profile_lock:
+            logger.info(f"🔬 Profiling process for {seconds}s ({mode}, {interval_ms} ms interval)")
+            profiler = await profile_process(seconds, mode, interval_ms / 1000)
+        return _profile_response(profiler, output, top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error profiling process: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/profile/requests")
+async def list_request_profiles():
+    """Recent requests profiled with the X-Profile header or profile query flag"""
+    profiles = request_profiles.list()
+    return {
+        "status": "success",
+        "count": len(profiles),
+        "profiles": profiles,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/profile/requests/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    output: str = Query("folded", pattern="^(folded|json)$"),
+    top: int = Query(25, ge=1, le=500)
+):
+    """One request profile, as folded stacks or a JSON summary"""
+    entry = request_profiles.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Request profile {profile_id} not found")
+    details = {k: v for k, v in entry.items() if k not in ("profiler", "mode", "seconds", "samples")}
+    return _profile_response(entry["profiler"], output, top, request=details)
+
+
+@router.get("/tracemalloc")
+async def tracemalloc_status():
+    """Tracing state, traced memory and stored snapshots"""
+    return {
+        "status": "success",
+        **allocation_tracker.stats(),
+        "snapshot_list": allocation_tracker.snapshots(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.post("/tracemalloc/start")
+async def tracemalloc_start(frames: int = Query(TRACEMALLOC_FRAMES, ge=1, le=100)):
+    """Start tracing allocations; tracing slows allocation-heavy code while it is on"""
+    started = allocation_tracker.start(frames)
+    return {
+        "status": "success",
+        "started": started,
+        **allocation_tracker.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.post("/tracemalloc/stop")
+async def tracemalloc_stop():
+    """Stop tracing and drop stored snapshots"""
+    allocation_tracker.stop()
+    return {"status": "success", "timestamp": datetime.utcnow().isoformat()}
+
+
+@router.post("/tracemalloc/snapshots")
+async def tracemalloc_snapshot(
+    label: Optional[str] = Query(None, max_length=100),
+    key_type: str = Query("lineno", pattern=f"^({'|'.join(KEY_TYPES)})$"),
+    top: int = Query(10, ge=0, le=500)
+):
+    """Take a snapshot and return its id plus its largest allocation sites"""
+    try:
+        info = await asyncio.get_running_loop().run_in_executor(None, allocation_tracker.snapshot, label)
+        return {
+            "status": "success",
+            "snapshot": info,
+            "top": allocation_tracker.top(info["id"], key_type, top) if top else [],
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error taking tracemalloc snapshot: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/tracemalloc/diff")
+async def tracemalloc_diff(
+    base: str,
+    current: Optional[str] = Query(None, description="snapshot id; a new snapshot is taken when omitted"),
+    key_type: str = Query("lineno", pattern=f"^({'|'.join(KEY_TYPES)})$"),
+    limit: int = Query(25, ge=1, le=500)
+):
+    """Allocation sites ordered by growth between two snapshots"""
+    try:
+        loop = asyncio.get_running_loop()
+        if current is None:
+            current = (await loop.run_in_executor(None, allocation_tracker.snapshot, "diff"))["id"]
+        diff = await loop.run_in_executor(None, allocation_tracker.diff, base, current, key_type, limit)
+        return {"status": "success", **diff, "timestamp": datetime.utcnow().isoformat()}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e.args[0]} not found")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error diffing tracemalloc snapshots: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
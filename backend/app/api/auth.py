@@ -9,14 +9,12 @@ import logging
 from typing import Optional
 import os
 
-from ..schwab_api import SchwabAPIService
+from ..schwab_api import schwab_service
+from ..schwab_async import schwab_async
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
-# Get the Schwab API service instance
-schwab_service = SchwabAPIService()
-
 @router.get("/schwab/login")
 async def schwab_login():
     """
@@ -24,7 +22,7 @@ async def schwab_login():
     Redirects user to Schwab authorization page
     """
     try:
-        if not schwab_service.is_configured():
+        if not schwab_service or not schwab_service.is_configured():
             raise HTTPException(
                 status_code=503,
                 detail="Schwab API not configured. Please set APP_KEY and APP_SECRET in environment variables."
@@ -94,7 +92,7 @@ async def schwab_callback(
         
         # Exchange code for tokens
         logger.info("Received authorization code, exchanging for tokens")
-        tokens = await schwab_service.exchange_code_for_tokens(code)
+        tokens = await schwab_service.exchange_code_for_tokens(code) if schwab_service else None
         
         if tokens:
             logger.info("Successfully obtained Schwab API tokens")
@@ -150,14 +148,14 @@ async def schwab_status():
     Check the current Schwab API authentication status
     """
     try:
-        if not schwab_service.is_configured():
+        if not schwab_service or not schwab_service.is_configured():
             return {
                 "authenticated": False,
                 "configured": False,
                 "message": "Schwab API credentials not configured"
             }
         
-        is_authenticated = await schwab_service.is_authenticated()
+        is_authenticated = await schwab_async.is_authenticated()
         
         return {
             "authenticated": is_authenticated,
@@ -180,7 +178,8 @@ async def schwab_logout():
     Logout from Schwab API (clear tokens)
     """
     try:
-        await schwab_service.logout()
+        if schwab_service:
+            await schwab_service.logout()
         return {"message": "Successfully logged out from Schwab API"}
         
     except Exception as e:
@@ -194,7 +193,7 @@ async def schwab_refresh_token():
     Manually refresh the Schwab API token
     """
     try:
-        success = await schwab_service.refresh_token()
+        success = await schwab_async.refresh_token()
         
         if success:
             return {"message": "Token refreshed successfully"}
@@ -204,6 +203,8 @@ async def schwab_refresh_token():
                 detail="Failed to refresh token. Please re-authenticate."
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error refreshing token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,17 +2,43 @@
 Market data API endpoints for the trading platform
 """
 
+import json
+import asyncio
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models import MarketData, TradingSignal
+from app.models import MarketData, MarketBar, TradingSignal, TechnicalIndicator
 from app.schwab_api import schwab_service
+from app.schwab_async import schwab_async, SchwabCallTimeout
+from app.ingestion import market_data_writer
+from app.quote_cache import quote_cache
+from app.bar_cache import bar_cache
+from app.bars import bar_aggregator, market_bar_writer
+from app.indicators import indicator_engine, indicator_writer, indicator_feed
+from app import backpressure
+from app.screener import screener, UNIVERSES
+from app.signals import signal_engine, signal_writer
+from app.pagination import keyset_page, InvalidCursor
+from app.stream_subscriptions import subscription_manager
+from app.tick_journal import tick_journal, journal_replayer
+from app.stream_hub import stream_hub, HubFull, HUB_HEARTBEAT_SECONDS
+from app.export import stream_ndjson, tick_export_query, bar_export_query, NDJSON_MEDIA_TYPE
 
 router = APIRouter(prefix="/api/market", tags=["market"])
 
+# Upper bound on symbols per quote request (POST bodies carry full watchlists)
+MAX_QUOTE_SYMBOLS = 2000
+
+# Upper bound on bars returned per request
+MAX_BARS = 2000
+
 
 @router.get("/test-connection")
 async def test_schwab_connection():
@@ -25,10 +51,10 @@ async def test_schwab_connection():
                 "connection_time": datetime.utcnow().isoformat()
             }
         
-        if not schwab_service.initialize_client():
+        if not await schwab_async.call(schwab_service.initialize_client):
             raise HTTPException(status_code=503, detail="Failed to initialize Schwab API client")
         
-        accounts = schwab_service.get_account_info()
+        accounts = await schwab_async.get_account_info()
         if not accounts:
             raise HTTPException(status_code=503, detail="Failed to connect to Schwab API")
         
@@ -38,50 +64,112 @@ async def test_schwab_connection():
             "accounts_found": len(accounts),
             "connection_time": datetime.utcnow().isoformat()
         }
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Schwab API connection failed: {str(e)}")
 
 
-@router.get("/quotes/{symbols}")
-async def get_real_time_quotes(symbols: str):
-    """Get real-time quotes for given symbols (comma-separated)"""
+class QuotesRequest(BaseModel):
+    symbols: List[str]
+
+
+async def _get_quotes_response(symbol_list: List[str]) -> Dict[str, Any]:
+    """Serve quotes through the cache, fanning large symbol sets out in chunks"""
     try:
-        if not schwab_service.client:
-            if not schwab_service.initialize_client():
-                raise HTTPException(status_code=503, detail="Schwab API not available")
-        
-        symbol_list = [s.strip().upper() for s in symbols.split(",")]
-        quotes = schwab_service.get_real_time_quotes(symbol_list)
-        
+        if len(symbol_list) > MAX_QUOTE_SYMBOLS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {MAX_QUOTE_SYMBOLS} symbols can be requested at once"
+            )
+
+        if not await schwab_async.ensure_client():
+            raise HTTPException(status_code=503, detail="Schwab API not available")
+
+        quotes = await quote_cache.get_quotes(symbol_list, schwab_async.get_quotes_chunked)
+        errors = quotes.pop("errors", {})
+
         if not quotes:
-            raise HTTPException(status_code=404, detail="Failed to get quotes")
-        
+            raise HTTPException(status_code=404, detail={"message": "Failed to get quotes", "errors": errors})
+
         return {
             "status": "success",
             "symbols": symbol_list,
             "quotes": quotes,
+            "errors": errors,
             "timestamp": datetime.utcnow().isoformat()
         }
-        
+
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting quotes: {str(e)}")
 
 
+@router.get("/quotes/{symbols}")
+async def get_real_time_quotes(symbols: str):
+    """Get real-time quotes for given symbols (comma-separated)"""
+    symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    return await _get_quotes_response(symbol_list)
+
+
+@router.post("/quotes")
+async def post_real_time_quotes(request: QuotesRequest):
+    """Get real-time quotes for a symbol list sent in the request body (for large watchlists)"""
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+    return await _get_quotes_response(symbol_list)
+
+
+def _check_timeframe(timeframe: str):
+    if timeframe not in bar_aggregator.timeframes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported timeframe '{timeframe}', expected one of {bar_aggregator.timeframes}"
+        )
+
+
+def _query_bars(db: Session, symbol: str, timeframe: str, limit: int) -> List[MarketBar]:
+    """Latest stored bars for a symbol, newest first"""
+    return db.query(MarketBar).filter(
+        MarketBar.symbol == symbol,
+        MarketBar.timeframe == timeframe
+    ).order_by(MarketBar.timestamp.desc()).limit(limit).all()
+
+
+def _bar_to_dict(bar: MarketBar) -> Dict[str, Any]:
+    if isinstance(bar, dict):  # forming bar from the aggregator
+        bar = MarketBar(**bar)
+    return {
+        "timestamp": bar.timestamp.isoformat(),
+        "open": float(bar.open_price),
+        "high": float(bar.high),
+        "low": float(bar.low),
+        "close": float(bar.close),
+        "volume": bar.volume,
+        "vwap": bar.vwap,
+        "trades": bar.trade_count
+    }
+
+
 @router.get("/history/{symbol}")
 async def get_market_history(
     symbol: str,
     period_type: str = "day",
     period: int = 1,
+    timeframe: str = "1m",
     db: Session = Depends(get_db)
 ):
     """Get historical market data for a symbol"""
     try:
-        if not schwab_service.client:
-            if not schwab_service.initialize_client():
-                raise HTTPException(status_code=503, detail="Schwab API not available")
+        if not await schwab_async.ensure_client():
+            raise HTTPException(status_code=503, detail="Schwab API not available")
         
         # Get data from Schwab API
-        historical_data = schwab_service.get_market_data_history(
+        historical_data = await schwab_async.get_market_data_history(
             symbol=symbol.upper(),
             period_type=period_type,
             period=period
@@ -90,105 +178,338 @@ async def get_market_history(
         if not historical_data:
             raise HTTPException(status_code=404, detail="Failed to get historical data")
         
-        # Also get any stored data from our database
-        stored_data = db.query(MarketData).filter(
-            MarketData.symbol == symbol.upper()
-        ).order_by(MarketData.timestamp.desc()).limit(100).all()
+        # Also get the bars aggregated from our own stream
+        stored_bars = _query_bars(db, symbol.upper(), timeframe, 100)
         
         return {
             "status": "success",
             "symbol": symbol.upper(),
             "historical_data": historical_data,
-            "stored_data": [
-                {
-                    "timestamp": data.timestamp.isoformat(),
-                    "price": float(data.price),
-                    "volume": data.volume,
-                    "open": float(data.open_price),
-                    "high": float(data.high_price),
-                    "low": float(data.low_price),
-                    "close": float(data.close_price)
-                } for data in stored_data
-            ],
+            "timeframe": timeframe,
+            "stored_data": [_bar_to_dict(bar) for bar in stored_bars],
             "timestamp": datetime.utcnow().isoformat()
         }
         
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting historical data: {str(e)}")
 
 
-@router.post("/stream/start")
-async def start_market_stream(
-    symbols: List[str],
-    background_tasks: BackgroundTasks
+@router.get("/bars/{symbol}")
+async def get_market_bars(
+    symbol: str,
+    timeframe: str = "1m",
+    limit: int = 300,
+    db: Session = Depends(get_db)
 ):
-    """Start real-time market data streaming"""
+    """Get stream-aggregated OHLCV bars for a symbol, including the bar still forming"""
     try:
-        if not schwab_service.client:
-            if not schwab_service.initialize_client():
-                raise HTTPException(status_code=503, detail="Schwab API not available")
+        _check_timeframe(timeframe)
+        limit = max(1, min(limit, MAX_BARS))
+        bars = _query_bars(db, symbol.upper(), timeframe, limit)
+        current = bar_aggregator.current_bars(symbol.upper()).get(timeframe)
         
-        # Convert symbols to uppercase
-        symbols = [s.upper() for s in symbols]
+        return {
+            "status": "success",
+            "symbol": symbol.upper(),
+            "timeframe": timeframe,
+            "count": len(bars),
+            "current": _bar_to_dict(current) if current else None,
+            "bars": [_bar_to_dict(bar) for bar in bars]
+        }
         
-        # Start streaming in background
-        def stream_handler(message):
-            """Custom handler that saves data to database"""
-            try:
-                schwab_service.save_market_data_to_db(message)
-            except Exception as e:
-                print(f"Error saving stream data: {e}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting bars: {str(e)}")
+
+
+@router.get("/indicators/{symbol}")
+async def get_indicators(
+    symbol: str,
+    timeframe: str = "1m",
+    db: Session = Depends(get_db)
+):
+    """Get the latest technical indicators for a symbol"""
+    try:
+        _check_timeframe(timeframe)
+        values = indicator_engine.latest(symbol.upper(), timeframe)
+        source = "live"
+        if not values:
+            # Not seeded yet: fall back to the last stored values
+            latest_ts = db.query(TechnicalIndicator.timestamp).filter(
+                TechnicalIndicator.symbol == symbol.upper(),
+                TechnicalIndicator.timeframe == timeframe
+            ).order_by(TechnicalIndicator.timestamp.desc()).limit(1).scalar()
+            if latest_ts is not None:
+                rows = db.query(TechnicalIndicator).filter(
+                    TechnicalIndicator.symbol == symbol.upper(),
+                    TechnicalIndicator.timeframe == timeframe,
+                    TechnicalIndicator.timestamp == latest_ts
+                ).all()
+                values = {row.indicator_name: row.value for row in rows}
+            source = "stored"
         
-        success = schwab_service.start_real_time_stream(symbols, stream_handler)
+        return {
+            "status": "success",
+            "symbol": symbol.upper(),
+            "timeframe": timeframe,
+            "source": source,
+            "indicators": values,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting indicators: {str(e)}")
+
+
+@router.post("/indicators/recompute")
+async def recompute_indicators(timeframe: str = "1m", write_last: int = 1):
+    """Recompute indicators for every symbol with stored bars in one batch"""
+    try:
+        _check_timeframe(timeframe)
+        result = await run_in_threadpool(
+            indicator_engine.recompute_universe, timeframe, write_last=max(0, write_last)
+        )
+        return {
+            "status": "success",
+            "result": result,
+            "timestamp": datetime.utcnow().isoformat()
+        }
         
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to start streaming")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recomputing indicators: {str(e)}")
+
+
+@router.get("/screener")
+async def get_screener(
+    timeframe: str = "5m",
+    universe: str = "default",
+    limit: int = 10,
+    refresh: bool = False
+):
+    """Get the top-ranked symbols of a universe by indicator score"""
+    try:
+        _check_timeframe(timeframe)
+        if universe not in UNIVERSES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown universe '{universe}', expected one of {list(UNIVERSES)}"
+            )
+        ranking = await run_in_threadpool(screener.get_ranking, timeframe, universe, refresh)
+        top = ranking["ranked"][:max(1, limit)]
         
         return {
             "status": "success",
-            "message": f"Started real-time streaming for {len(symbols)} symbols",
-            "symbols": symbols,
+            "timeframe": timeframe,
+            "universe": universe,
+            "computed_at": ranking["computed_at"],
+            "ranked_symbols": len(ranking["ranked"]),
+            "count": len(top),
+            "results": top,
             "timestamp": datetime.utcnow().isoformat()
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running screener: {str(e)}")
+
+
+@router.get("/screener/stats")
+async def get_screener_stats():
+    """Get screener cache and refresh timing"""
+    return {
+        "status": "success",
+        "screener": screener.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+class SubscriptionRequest(BaseModel):
+    symbols: List[str]
+    service: str = "LEVELONE_EQUITIES"
+
+
+async def _change_subscriptions(change, symbols: List[str], service: str) -> Dict[str, Any]:
+    if not await schwab_async.ensure_client():
+        raise HTTPException(status_code=503, detail="Schwab API not available")
+    # Ticks feed the quote cache and bar aggregator and are queued for the
+    # batched writer, so the streamer thread never waits on a commit
+    market_data_writer.start()
+    bar_aggregator.start()
+    subscription_manager.start_watchdog()
+    try:
+        return await schwab_async.call(change, symbols, service)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/stream/start")
+async def start_market_stream(symbols: List[str]):
+    """
+    Stream exactly these symbols. Only the difference from the current
+    subscriptions is sent, so symbols that stay subscribed see no gap.
+    """
+    try:
+        changes = await _change_subscriptions(subscription_manager.set_symbols, symbols, "LEVELONE_EQUITIES")
+        return {
+            "status": "success",
+            "message": f"Streaming {len(subscription_manager.desired.get('LEVELONE_EQUITIES', ()))} symbols",
+            "symbols": sorted(subscription_manager.desired.get("LEVELONE_EQUITIES", ())),
+            "changes": changes,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting stream: {str(e)}")
 
 
+@router.post("/stream/subscriptions/add")
+async def add_stream_subscriptions(request: SubscriptionRequest):
+    """Subscribe additional symbols without touching existing subscriptions"""
+    try:
+        changes = await _change_subscriptions(subscription_manager.add, request.symbols, request.service.upper())
+        return {"status": "success", "changes": changes, "timestamp": datetime.utcnow().isoformat()}
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding subscriptions: {str(e)}")
+
+
+@router.post("/stream/subscriptions/remove")
+async def remove_stream_subscriptions(request: SubscriptionRequest):
+    """Unsubscribe symbols, leaving the rest streaming"""
+    try:
+        changes = await _change_subscriptions(subscription_manager.remove, request.symbols, request.service.upper())
+        return {"status": "success", "changes": changes, "timestamp": datetime.utcnow().isoformat()}
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing subscriptions: {str(e)}")
+
+
+@router.get("/stream/subscriptions")
+async def get_stream_subscriptions():
+    """Get desired subscriptions and per-shard message rate, lag and restarts"""
+    return {
+        "status": "success",
+        "subscriptions": subscription_manager.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 @router.post("/stream/stop")
 async def stop_market_stream():
     """Stop real-time market data streaming"""
     try:
-        schwab_service.stop_stream()
+        await schwab_async.call(subscription_manager.stop)
         return {
             "status": "success",
             "message": "Stopped market data streaming",
             "timestamp": datetime.utcnow().isoformat()
         }
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error stopping stream: {str(e)}")
 
 
+@router.get("/simulator/stats")
+async def get_simulator_stats():
+    """Get call, error and stream counters of the local market simulator"""
+    if not schwab_service or schwab_service.backend != "simulator":
+        raise HTTPException(status_code=404, detail="Market simulator is not the active backend")
+    return {
+        "status": "success",
+        "simulator": schwab_service.client.stats() if schwab_service.client else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/quotes-cache/stats")
+async def get_quote_cache_stats():
+    """Get hit/miss/coalesce counters of the quote cache"""
+    return {
+        "status": "success",
+        "cache": quote_cache.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/history-cache/stats")
+async def get_history_cache_stats():
+    """Get size and bytes served from cache versus upstream for the bar cache"""
+    return {
+        "status": "success",
+        "cache": bar_cache.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/ingest/stats")
+async def get_ingest_stats():
+    """Get queue depth, batch size and flush latency of the market data writer"""
+    return {
+        "status": "success",
+        "writer": market_data_writer.stats(),
+        "bar_writer": market_bar_writer.stats(),
+        "bars": bar_aggregator.stats(),
+        "indicator_writer": indicator_writer.stats(),
+        "indicator_feed": indicator_feed.stats(),
+        "indicators": indicator_engine.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 @router.get("/data/recent/{symbol}")
 async def get_recent_market_data(
     symbol: str,
     hours: int = 24,
+    limit: int = 500,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get recent market data from our database for a specific symbol"""
+    """
+    Get recent ticks for a symbol from our database, newest first, one page
+    at a time. Pass `next_cursor` back as `cursor` for the following page.
+    """
     try:
         since_time = datetime.utcnow() - timedelta(hours=hours)
-        
-        data = db.query(MarketData).filter(
+        query = select(
+            MarketData.id, MarketData.timestamp, MarketData.price, MarketData.volume,
+            MarketData.open_price, MarketData.high, MarketData.low, MarketData.bid, MarketData.ask
+        ).where(
             MarketData.symbol == symbol.upper(),
             MarketData.timestamp >= since_time
-        ).order_by(MarketData.timestamp.desc()).all()
+        )
+        data, next_cursor = keyset_page(
+            db, query, f"data:{symbol.upper()}", MarketData.timestamp, MarketData.id, limit, cursor
+        )
         
         return {
             "status": "success",
             "symbol": symbol.upper(),
             "hours": hours,
             "count": len(data),
+            "next_cursor": next_cursor,
             "data": [
                 {
                     "id": d.id,
@@ -196,26 +517,212 @@ async def get_recent_market_data(
                     "price": float(d.price),
                     "volume": d.volume,
                     "open": float(d.open_price),
-                    "high": float(d.high_price),
-                    "low": float(d.low_price),
-                    "close": float(d.close_price)
+                    "high": float(d.high),
+                    "low": float(d.low),
+                    "bid": float(d.bid) if d.bid is not None else None,
+                    "ask": float(d.ask) if d.ask is not None else None
                 } for d in data
             ]
         }
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting recent data: {str(e)}")
 
 
+@router.websocket("/ws/quotes")
+async def quotes_websocket(websocket: WebSocket):
+    """
+    Live quotes over WebSocket. Send {"action": "subscribe" | "unsubscribe",
+    "symbols": [...]}; quote messages carry the full latest quote per symbol.
+    """
+    await websocket.accept()
+    try:
+        client = stream_hub.connect()
+    except HubFull as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+
+    async def send_updates():
+        try:
+            while not client.closed:
+                for update in await client.next_batch():
+                    await websocket.send_text(update.text)
+        except (WebSocketDisconnect, RuntimeError):
+            client.close()
+
+    sender = asyncio.create_task(send_updates())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                action, symbols = message.get("action"), message.get("symbols") or []
+                if isinstance(symbols, str):
+                    symbols = symbols.split(",")
+            except (ValueError, AttributeError):
+                await websocket.send_text(json.dumps({"type": "error", "message": "Expected a JSON object"}))
+                continue
+            if action == "subscribe":
+                changed = client.subscribe(symbols)
+            elif action == "unsubscribe":
+                changed = client.unsubscribe(symbols)
+            else:
+                await websocket.send_text(json.dumps({"type": "error", "message": f"Unknown action '{action}'"}))
+                continue
+            await websocket.send_text(json.dumps(
+                {"type": action + "d", "symbols": changed, "subscriptions": sorted(client.symbols)}
+            ))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_hub.disconnect(client)
+        sender.cancel()
+
+
+@router.get("/stream/quotes")
+async def quotes_event_stream(request: Request, symbols: str):
+    """Live quotes as Server-Sent Events for a comma-separated symbol list"""
+    try:
+        client = stream_hub.connect()
+    except HubFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    client.subscribe(symbols.split(","))
+
+    async def events():
+        try:
+            while not client.closed and not await request.is_disconnected():
+                batch = await client.next_batch(timeout=HUB_HEARTBEAT_SECONDS)
+                yield b"".join(update.sse for update in batch) if batch else b": heartbeat\n\n"
+        finally:
+            stream_hub.disconnect(client)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/stream/hub/stats")
+async def get_stream_hub_stats():
+    """Get fan-out hub client, encode and conflation counters"""
+    return {
+        "status": "success",
+        "hub": stream_hub.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/stream/backpressure")
+async def get_backpressure_stats():
+    """Get depth, policy and dropped/conflated counts of every consumer buffer"""
+    hub = stream_hub.stats()
+    return {
+        "status": "success",
+        "buffers": backpressure.stats(),
+        # Browser clients conflate per symbol inside the hub
+        "clients": {"conflated": hub["conflated"], "max_backlog": hub["max_backlog"]},
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+class JournalReplayRequest(BaseModel):
+    day: Optional[str] = None
+    speed: float = 0.0
+    since_ms: Optional[int] = None
+    limit: Optional[int] = None
+
+
+@router.get("/journal/stats")
+async def get_journal_stats():
+    """Get the tick journal's current segment, record counts and the last replay"""
+    return {
+        "status": "success",
+        "journal": tick_journal.stats(),
+        "segments": tick_journal.segments(),
+        "replay": journal_replayer.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.post("/journal/replay")
+async def replay_journal(request: JournalReplayRequest):
+    """
+    Replay journaled stream messages in the background to rebuild stored ticks and
+    bars. Rows that already exist are skipped; live quotes, clients and indicators
+    are not touched. `speed` 1 keeps the recorded pacing, 0 replays as fast as
+    possible; `since_ms` skips messages received before that time.
+    """
+    try:
+        if request.speed < 0:
+            raise HTTPException(status_code=400, detail="speed must be >= 0")
+        if request.day and not tick_journal.segments(request.day):
+            raise HTTPException(status_code=404, detail=f"No journal for {request.day}")
+        if not journal_replayer.start(day=request.day, speed=request.speed,
+                                      since_ms=request.since_ms, limit=request.limit):
+            raise HTTPException(status_code=409, detail="A replay is already running")
+        return {
+            "status": "success",
+            "message": "Replay started",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting replay: {str(e)}")
+
+
+@router.post("/journal/replay/stop")
+async def stop_journal_replay():
+    """Stop a running replay"""
+    await run_in_threadpool(journal_replayer.stop)
+    return {
+        "status": "success",
+        "replay": journal_replayer.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/export/ticks/{symbol}")
+async def export_market_data(
+    symbol: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """
+    Stream every stored tick for a symbol in [start, end) as NDJSON, oldest
+    first. Rows are written as they are fetched, so any window size is safe.
+    """
+    symbol = symbol.upper()
+    return StreamingResponse(
+        stream_ndjson(tick_export_query(symbol, start, end)),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{symbol}-ticks.ndjson"'}
+    )
+
+
+@router.get("/export/bars/{symbol}")
+async def export_market_bars(
+    symbol: str,
+    timeframe: str = "1m",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Stream stored bars for a symbol and timeframe in [start, end) as NDJSON, oldest first"""
+    _check_timeframe(timeframe)
+    symbol = symbol.upper()
+    return StreamingResponse(
+        stream_ndjson(bar_export_query(symbol, timeframe, start, end)),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{symbol}-{timeframe}.ndjson"'}
+    )
+
+
 @router.get("/accounts")
 async def get_schwab_accounts():
     """Get linked Schwab account information"""
     try:
-        if not schwab_service.client:
-            if not schwab_service.initialize_client():
-                raise HTTPException(status_code=503, detail="Schwab API not available")
+        if not await schwab_async.ensure_client():
+            raise HTTPException(status_code=503, detail="Schwab API not available")
         
-        accounts = schwab_service.get_account_info()
+        accounts = await schwab_async.get_account_info()
         if not accounts:
             raise HTTPException(status_code=404, detail="No accounts found")
         
@@ -225,6 +732,10 @@ async def get_schwab_accounts():
             "timestamp": datetime.utcnow().isoformat()
         }
         
+    except HTTPException:
+        raise
+    except SchwabCallTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting accounts: {str(e)}")
 
@@ -232,29 +743,71 @@ async def get_schwab_accounts():
 @router.get("/signals/recent")
 async def get_recent_signals(
     limit: int = 50,
+    symbol: Optional[str] = None,
+    strategy_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get recent trading signals from the database"""
+    """Get recent trading signals from the database, newest first, one page at a time"""
     try:
-        signals = db.query(TradingSignal).order_by(
-            TradingSignal.timestamp.desc()
-        ).limit(limit).all()
+        query = select(*TradingSignal.__table__.c)
+        if symbol:
+            query = query.where(TradingSignal.symbol == symbol.upper())
+        if strategy_id is not None:
+            query = query.where(TradingSignal.strategy_id == strategy_id)
+        # Filters are part of the scope so a cursor cannot be replayed against another listing
+        scope = f"signals:{symbol.upper() if symbol else '*'}:{strategy_id}"
+        signals, next_cursor = keyset_page(
+            db, query, scope, TradingSignal.created_at, TradingSignal.id, limit, cursor
+        )
         
         return {
             "status": "success",
             "count": len(signals),
+            "next_cursor": next_cursor,
             "signals": [
                 {
                     "id": s.id,
+                    "strategy_id": s.strategy_id,
                     "symbol": s.symbol,
-                    "signal_type": s.signal_type,
-                    "strength": float(s.strength),
-                    "price": float(s.price),
-                    "timestamp": s.timestamp.isoformat(),
-                    "metadata": s.metadata
+                    "side": s.side.value,
+                    "confidence": s.confidence,
+                    "target_price": float(s.target_price) if s.target_price is not None else None,
+                    "stop_loss": float(s.stop_loss) if s.stop_loss is not None else None,
+                    "take_profit": float(s.take_profit) if s.take_profit is not None else None,
+                    "reasoning": s.reasoning,
+                    "is_executed": s.is_executed,
+                    "created_at": s.created_at.isoformat() if s.created_at else None
                 } for s in signals
             ]
         }
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting signals: {str(e)}")
+
+
+@router.get("/signals/stats")
+async def get_signal_stats():
+    """Get per-strategy evaluation latency and the signal writer's throughput"""
+    return {
+        "status": "success",
+        "engine": signal_engine.stats(),
+        "writer": signal_writer.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.post("/signals/strategies/reload")
+async def reload_strategies():
+    """Recompile active strategies after their rows changed"""
+    try:
+        loaded = await run_in_threadpool(signal_engine.reload)
+        return {
+            "status": "success",
+            "strategies": loaded,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading strategies: {str(e)}")
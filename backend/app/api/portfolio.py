@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Portfolio, Position, Trade
+from app.mark_to_market import mark_to_market
+from app.portfolio_snapshot import portfolio_snapshot
+from app.pagination import keyset_page, InvalidCursor
 from pydantic import BaseModel
 from typing import List, Optional
 from decimal import Decimal
@@ -49,65 +54,68 @@ class TradeResponse(BaseModel):
 
 
 @router.get("/portfolio", response_model=PortfolioResponse)
-async def get_portfolio(db: Session = Depends(get_db)):
-    """Get current portfolio status"""
-    
-    # Get or create default portfolio
-    portfolio = db.query(Portfolio).first()
-    if not portfolio:
-        # Create default portfolio if none exists
-        portfolio = Portfolio(
-            total_value=100000.00,
-            cash_balance=50000.00,
-            invested_value=50000.00,
-            total_pnl=0.0,
-            daily_pnl=0.0
-        )
-        db.add(portfolio)
-        db.commit()
-        db.refresh(portfolio)
-    
-    # Get positions
-    positions = db.query(Position).filter(Position.portfolio_id == portfolio.id).all()
-    
-    position_responses = []
-    for pos in positions:
-        position_responses.append(PositionResponse(
-            symbol=pos.symbol,
-            shares=float(pos.shares),
-            avg_cost=float(pos.avg_cost),
-            current_price=float(pos.current_price),
-            market_value=float(pos.market_value),
-            unrealized_pnl=float(pos.unrealized_pnl)
-        ))
-    
-    # Calculate performance percentages
-    total_value = float(portfolio.total_value)
-    daily_pnl_percent = (float(portfolio.daily_pnl) / total_value * 100) if total_value > 0 else 0
-    total_pnl_percent = (float(portfolio.total_pnl) / total_value * 100) if total_value > 0 else 0
-    
-    performance = PerformanceResponse(
-        daily_pnl=float(portfolio.daily_pnl),
-        daily_pnl_percent=daily_pnl_percent,
-        total_pnl=float(portfolio.total_pnl),
-        total_pnl_percent=total_pnl_percent
-    )
-    
-    return PortfolioResponse(
-        total_value=total_value,
-        cash_balance=float(portfolio.cash_balance),
-        invested_value=float(portfolio.invested_value),
-        positions=position_responses,
-        performance=performance
-    )
+async def get_portfolio(request: Request):
+    """
+    Get current portfolio status from the in-memory snapshot. Send the
+    returned ETag as If-None-Match to get a 304 while nothing has changed.
+    """
+    if portfolio_snapshot.is_dirty:
+        etag, body = await run_in_threadpool(portfolio_snapshot.get)
+    else:
+        etag, body = portfolio_snapshot.get()
+    if not body:
+        raise HTTPException(status_code=404, detail="No portfolio found")
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        portfolio_snapshot.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/portfolio/snapshot/stats")
+async def get_portfolio_snapshot_stats():
+    """Snapshot version, rebuild and revalidation counters"""
+    return {"status": "success", "stats": portfolio_snapshot.stats(), "timestamp": datetime.utcnow().isoformat()}
+
+
+@router.post("/portfolio/mark-to-market")
+async def run_mark_to_market():
+    """Revalue all positions from the latest quotes now, regardless of market hours"""
+    try:
+        result = await mark_to_market.run_once()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error marking positions to market: {str(e)}")
+    return {"status": "success", "result": result, "timestamp": datetime.utcnow().isoformat()}
+
+
+@router.get("/portfolio/mark-to-market/stats")
+async def get_mark_to_market_stats():
+    """Revaluation pass timings and counters"""
+    return {"status": "success", "stats": mark_to_market.stats(), "timestamp": datetime.utcnow().isoformat()}
 
 
 @router.get("/trades", response_model=List[TradeResponse])
-async def get_trades(limit: int = 50, db: Session = Depends(get_db)):
-    """Get recent trading activity"""
-    
-    trades = db.query(Trade).order_by(Trade.created_at.desc()).limit(limit).all()
-    
+async def get_trades(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get recent trading activity, newest first. When more trades exist the
+    X-Next-Cursor header carries the token for the next page (?cursor=...).
+    """
+    try:
+        trades, next_cursor = keyset_page(
+            db, select(*Trade.__table__.c), "trades", Trade.created_at, Trade.id, limit, cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
     trade_responses = []
     for trade in trades:
         trade_responses.append(TradeResponse(
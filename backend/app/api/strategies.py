@@ -0,0 +1,137 @@
+"""
+Strategy management and backtesting endpoints
+"""
+
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import Strategy
+from app.backtest import backtest_strategy, load_bars, parameter_sweep, strategy_params, VECTOR_RULES
+
+router = APIRouter(prefix="/api/strategies", tags=["strategies"])
+
+# Upper bound on parameter combinations per sweep
+MAX_SWEEP_COMBINATIONS = 500
+
+
+class BacktestRequest(BaseModel):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    write_results: bool = True
+
+
+class SweepRequest(BaseModel):
+    grid: Dict[str, List[Any]]
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    top: int = 10
+
+
+def _get_backtestable(db: Session, strategy_id: int) -> Strategy:
+    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    if strategy is None:
+        raise HTTPException(status_code=404, detail=f"Strategy {strategy_id} not found")
+    if strategy.type not in VECTOR_RULES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Strategy type '{strategy.type.value}' cannot be backtested"
+        )
+    return strategy
+
+
+@router.get("")
+async def list_strategies(db: Session = Depends(get_db)):
+    """List strategies with their latest backtest statistics"""
+    strategies = db.query(Strategy).order_by(Strategy.id).all()
+    return {
+        "status": "success",
+        "count": len(strategies),
+        "strategies": [
+            {
+                "id": s.id,
+                "name": s.name,
+                "type": s.type.value,
+                "is_active": s.is_active,
+                "parameters": s.parameters,
+                "performance_score": s.performance_score,
+                "total_trades": s.total_trades,
+                "winning_trades": s.winning_trades,
+                "total_pnl": float(s.total_pnl) if s.total_pnl is not None else None,
+                "updated_at": s.updated_at.isoformat() if s.updated_at else None
+            } for s in strategies
+        ]
+    }
+
+
+@router.post("/{strategy_id}/backtest")
+async def run_strategy_backtest(
+    strategy_id: int,
+    request: BacktestRequest,
+    db: Session = Depends(get_db)
+):
+    """Backtest a strategy over stored bars and record the summary on the strategy"""
+    try:
+        strategy = _get_backtestable(db, strategy_id)
+        summary = await run_in_threadpool(
+            backtest_strategy, db, strategy, request.start, request.end, request.write_results
+        )
+        return {
+            "status": "success",
+            "strategy_id": strategy_id,
+            "result": summary,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running backtest: {str(e)}")
+
+
+@router.post("/{strategy_id}/sweep")
+async def run_parameter_sweep(
+    strategy_id: int,
+    request: SweepRequest,
+    db: Session = Depends(get_db)
+):
+    """Backtest a grid of parameter overrides for a strategy in parallel"""
+    try:
+        strategy = _get_backtestable(db, strategy_id)
+        combinations = 1
+        for values in request.grid.values():
+            combinations *= max(1, len(values))
+        if not request.grid or combinations > MAX_SWEEP_COMBINATIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Grid must have between 1 and {MAX_SWEEP_COMBINATIONS} combinations"
+            )
+        params = strategy_params(strategy)
+        symbols = params.get("symbols", "*")
+        bars = load_bars(
+            db.connection(), params.get("timeframe", "5m"),
+            None if symbols == "*" else [s.upper() for s in symbols], request.start, request.end
+        )
+        results = await run_in_threadpool(parameter_sweep, bars, strategy.type, params, request.grid)
+        return {
+            "status": "success",
+            "strategy_id": strategy_id,
+            "combinations": combinations,
+            "bars": bars.bar_count,
+            "results": results[:max(1, request.top)],
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running parameter sweep: {str(e)}")
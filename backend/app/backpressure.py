@@ -0,0 +1,288 @@
+"""
+Bounded per-consumer buffers with an explicit overflow policy
+
+Every consumer of the stream pipeline (database writers, the strategy path)
+gets its own `BoundedBuffer`, so a slow consumer can no longer grow memory
+without limit or delay the streamer callback. What happens when a buffer is
+full is chosen per consumer:
+
+  block        wait up to BACKPRESSURE_BLOCK_TIMEOUT for room, then drop the new item
+  drop_oldest  evict the oldest pending item to make room
+  conflate     keep only the latest pending item per key (e.g. symbol); a new
+               key on a full buffer evicts the oldest key
+
+Only `block` can stall the producer. A consumer that has to know what it lost
+passes `on_drop`, which is called with every evicted, replaced or rejected item
+once the buffer lock is released.
+
+Policies and capacities can be overridden with `<NAME>_BUFFER_POLICY` and
+`<NAME>_BUFFER_SIZE`.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Callable, Hashable, Optional
+
+from dotenv import load_dotenv
+
+from app.metrics import registry
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+CONFLATE = "conflate"
+POLICIES = (BLOCK, DROP_OLDEST, CONFLATE)
+
+BACKPRESSURE_BLOCK_TIMEOUT = float(os.getenv("BACKPRESSURE_BLOCK_TIMEOUT", "1.0"))
+
+# Sentinel for "no item lost" (None is a valid item)
+_NOTHING = object()
+
+# Named buffers and consumers, for the stats endpoint
+_buffers: Dict[str, Any] = {}
+
+
+def buffer_settings(name: str, policy: str, capacity: int) -> tuple:
+    """(policy, capacity) for a named buffer, with environment overrides"""
+    prefix = name.upper().replace("-", "_")
+    policy = os.getenv(f"{prefix}_BUFFER_POLICY", policy).strip().lower()
+    capacity = int(os.getenv(f"{prefix}_BUFFER_SIZE", str(capacity)))
+    return policy, capacity
+
+
+class BoundedBuffer:
+    """Thread-safe bounded FIFO with a block / drop_oldest / conflate overflow policy"""
+
+    def __init__(self, name: str, capacity: int, policy: str = DROP_OLDEST,
+                 block_timeout: float = BACKPRESSURE_BLOCK_TIMEOUT,
+                 on_drop: Optional[Callable[[Any], None]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}', expected one of {POLICIES}")
+        if capacity <= 0:
+            raise ValueError("Buffer capacity must be positive")
+        self.name = name
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.on_drop = on_drop
+        self._items = OrderedDict() if policy == CONFLATE else deque()
+        self._cond = threading.Condition()
+        self.closed = False
+
+        # Stats
+        self.accepted = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        _buffers[name] = self
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any, key: Optional[Hashable] = None) -> bool:
+        """Add an item; returns False if it was dropped. `key` is required for conflate"""
+        lost = _NOTHING
+        accepted = True
+        with self._cond:
+            items = self._items
+            if self.closed:
+                self.dropped += 1
+                lost, accepted = item, False
+            elif self.policy == CONFLATE:
+                if key in items:
+                    # Replace in place: the symbol keeps its turn but carries the newest state
+                    lost = items[key]
+                    items[key] = item
+                    self.conflated += 1
+                else:
+                    if len(items) >= self.capacity:
+                        lost = items.popitem(last=False)[1]
+                        self.dropped += 1
+                    items[key] = item
+            else:
+                if len(items) >= self.capacity:
+                    if self.policy == DROP_OLDEST:
+                        lost = items.popleft()
+                        self.dropped += 1
+                    elif not self._wait_for_room():
+                        self.dropped += 1
+                        lost, accepted = item, False
+                if accepted:
+                    items.append(item)
+            if accepted:
+                self.accepted += 1
+                if len(items) > self.max_depth:
+                    self.max_depth = len(items)
+                self._cond.notify_all()
+        if lost is not _NOTHING and self.on_drop is not None:
+            try:
+                self.on_drop(lost)
+            except Exception as e:
+                logger.error(f"Buffer '{self.name}' drop callback failed: {e}")
+        return accepted
+
+    def _wait_for_room(self) -> bool:
+        """Block the producer until there is room, the timeout passes or the buffer closes"""
+        self.blocked += 1
+        started = time.monotonic()
+        deadline = started + self.block_timeout
+        while len(self._items) >= self.capacity and not self.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+        self.blocked_seconds += time.monotonic() - started
+        return len(self._items) < self.capacity and not self.closed
+
+    def get_batch(self, max_items: int, timeout: Optional[float] = None) -> List[Any]:
+        """Wait up to `timeout` for at least one item, then take up to `max_items`"""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            items = self._items
+            count = min(max_items, len(items))
+            if self.policy == CONFLATE:
+                batch = [items.popitem(last=False)[1] for _ in range(count)]
+            else:
+                batch = [items.popleft() for _ in range(count)]
+            self.delivered += count
+            if count and self.policy == BLOCK:
+                self._cond.notify_all()
+            return batch
+
+    def close(self):
+        """Reject further puts and wake any waiting producer or consumer"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self.closed = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "accepted": self.accepted,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "blocked": self.blocked,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+class BufferedConsumer:
+    """
+    Runs a slow listener on its own thread behind a bounded buffer. Calling
+    the consumer queues the call's arguments; the worker drains them in
+    batches and invokes the listener once per item. `on_drop` is called with
+    the arguments of every call the overflow policy discards.
+    """
+
+    def __init__(self, name: str, listener: Callable[..., None], policy: str = BLOCK,
+                 capacity: int = 10000, key: Optional[Callable[..., Hashable]] = None,
+                 batch_size: int = 500, on_drop: Optional[Callable[..., None]] = None):
+        policy, capacity = buffer_settings(name, policy, capacity)
+        self.name = name
+        self.listener = listener
+        self.key = key
+        self.batch_size = batch_size
+        self.buffer = BoundedBuffer(
+            name, capacity, policy, on_drop=(lambda args: on_drop(*args)) if on_drop else None
+        )
+        self._thread: Optional[threading.Thread] = None
+
+        # Stats
+        self.handled = 0
+        self.failed = 0
+        self.max_batch_ms = 0.0
+        _buffers[name] = self
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __call__(self, *args):
+        key = self.key(*args) if self.key is not None else None
+        self.buffer.put(args, key)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self.buffer.reopen()
+        self._thread = threading.Thread(target=self._run, name=f"consumer-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buffer = self.buffer
+        while True:
+            batch = buffer.get_batch(self.batch_size, timeout=1.0)
+            if not batch:
+                if buffer.closed:
+                    break
+                continue
+            started = time.perf_counter()
+            for args in batch:
+                try:
+                    self.listener(*args)
+                    self.handled += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Consumer '{self.name}' failed: {e}")
+            self.max_batch_ms = max(self.max_batch_ms, (time.perf_counter() - started) * 1000)
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Stop accepting items and let the worker finish what is already queued"""
+        self.buffer.close()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"Consumer '{self.name}' did not drain within {timeout}s ({len(self.buffer)} queued)")
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.buffer.stats()
+        stats.update({
+            "running": self.is_running,
+            "handled": self.handled,
+            "failed": self.failed,
+            "max_batch_ms": round(self.max_batch_ms, 3),
+        })
+        return stats
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every named buffer and consumer"""
+    return {name: buffer.stats() for name, buffer in _buffers.items()}
+
+
+def _buffer_metrics():
+    buffers = [(name, getattr(owner, "buffer", owner)) for name, owner in list(_buffers.items())]
+    yield "buffer_depth", "gauge", "Items waiting in a consumer buffer", [
+        ({"buffer": name}, len(buffer)) for name, buffer in buffers]
+    yield "buffer_capacity", "gauge", "Capacity of a consumer buffer", [
+        ({"buffer": name}, buffer.capacity) for name, buffer in buffers]
+    yield "buffer_dropped_total", "counter", "Items dropped by a buffer's overflow policy", [
+        ({"buffer": name}, buffer.dropped) for name, buffer in buffers]
+    yield "buffer_conflated_total", "counter", "Items replaced by a newer one for the same key", [
+        ({"buffer": name}, buffer.conflated) for name, buffer in buffers]
+    yield "buffer_blocked_seconds_total", "counter", "Time producers spent blocked on a full buffer", [
+        ({"buffer": name}, buffer.blocked_seconds) for name, buffer in buffers]
+
+
+registry.add_collector(_buffer_metrics)
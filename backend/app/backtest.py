@@ -0,0 +1,425 @@
+"""
+Backtesting of Strategy rules over stored bar history
+
+Bars are loaded once into contiguous (symbols, bars) NumPy arrays. Strategies
+whose exits depend only on their own signals are simulated fully vectorized;
+rules with path-dependent exits (ATR stop-loss / take-profit) fall back to a
+per-bar event loop over the same arrays. Both use the same fill model: a
+signal on a bar's close fills at the next bar's open, adjusted for slippage,
+with per-trade and notional-based commissions. Open positions are closed at
+the open of the last bar.
+"""
+
+import os
+import math
+import json
+import logging
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+from sqlalchemy import select, cast, Float
+from dotenv import load_dotenv
+
+from app.indicators import compute_indicators, rows_to_matrix
+from app.bars import TIMEFRAME_SECONDS
+from app.models import MarketBar, Strategy, StrategyType
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+
+DEFAULT_COSTS = {
+    "trade_notional": 10000.0,   # dollars committed per position
+    "commission_per_trade": 0.0,
+    "commission_bps": 1.0,
+    "slippage_bps": 2.0,
+}
+
+
+class BarArrays:
+    """Right-aligned (symbols, bars) price arrays, NaN-padded for shorter histories"""
+    __slots__ = ("symbols", "timeframe", "timestamps", "open", "high", "low", "close")
+
+    def __init__(self, symbols, timeframe, timestamps, open_, high, low, close):
+        self.symbols = symbols
+        self.timeframe = timeframe
+        self.timestamps = timestamps
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+
+    @property
+    def bar_count(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.close)))
+
+
+def load_bars(conn, timeframe: str, symbols: Optional[List[str]] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None) -> BarArrays:
+    """Load stored bars for a timeframe (and optional symbols/date range) in one query"""
+    query = select(
+        MarketBar.symbol, MarketBar.timestamp,
+        cast(MarketBar.open_price, Float), cast(MarketBar.high, Float),
+        cast(MarketBar.low, Float), cast(MarketBar.close, Float)
+    ).where(MarketBar.timeframe == timeframe)
+    if symbols:
+        query = query.where(MarketBar.symbol.in_(symbols))
+    if start is not None:
+        query = query.where(MarketBar.timestamp >= start)
+    if end is not None:
+        query = query.where(MarketBar.timestamp < end)
+    rows = conn.execute(query.order_by(MarketBar.symbol, MarketBar.timestamp)).all()
+    names, timestamps, open_, high, low, close = rows_to_matrix(rows, price_columns=4)
+    return BarArrays(names, timeframe, timestamps, open_, high, low, close)
+
+
+# -- Vectorized signal rules ---------------------------------------------------
+#
+# Same conditions as the live rules in app.signals, over whole arrays: each
+# returns +1 (buy), -1 (sell) or 0 for every bar close.
+
+def _previous(values: np.ndarray) -> np.ndarray:
+    shifted = np.full_like(values, np.nan)
+    shifted[:, 1:] = values[:, :-1]
+    return shifted
+
+
+def macd_cross_events(values, close, params):
+    hist, rsi = values["MACD_HIST"], values["RSI_14"]
+    previous = _previous(hist)
+    with np.errstate(invalid="ignore"):
+        buy = (previous <= 0) & (hist > 0) & (rsi < params.get("rsi_max", 70))
+        sell = (previous >= 0) & (hist < 0) & (rsi > params.get("rsi_min", 30))
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+def moving_average_trend_events(values, close, params):
+    fast, slow = values["SMA_20"], values["SMA_50"]
+    valid = ~np.isnan(slow) & ~np.isnan(values["ATR_14"])
+    with np.errstate(invalid="ignore"):
+        above = close > fast
+    previous_above = np.zeros_like(above)
+    previous_above[:, 1:] = above[:, :-1]
+    previous_valid = np.zeros_like(valid)
+    previous_valid[:, 1:] = valid[:, :-1]
+    crossed = valid & previous_valid & (above != previous_above)
+    with np.errstate(invalid="ignore"):
+        buy = crossed & above & (fast > slow)
+        sell = crossed & ~above & (fast < slow)
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+def rsi_reversion_events(values, close, params):
+    rsi = values["RSI_14"]
+    previous = _previous(rsi)
+    oversold, overbought = params.get("oversold", 30), params.get("overbought", 70)
+    with np.errstate(invalid="ignore"):
+        buy = (previous < oversold) & (rsi >= oversold)
+        sell = (previous > overbought) & (rsi <= overbought)
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+VECTOR_RULES = {
+    StrategyType.TECHNICAL: macd_cross_events,
+    StrategyType.MOMENTUM: moving_average_trend_events,
+    StrategyType.MEAN_REVERSION: rsi_reversion_events,
+}
+
+
+# -- Simulation ----------------------------------------------------------------
+
+def _forward_fill_index(mask: np.ndarray) -> np.ndarray:
+    """Column index of the most recent True at or before each bar (-1 if none)"""
+    index = np.where(mask, np.arange(mask.shape[1]), -1)
+    return np.maximum.accumulate(index, axis=1)
+
+
+def simulate_vectorized(bars: BarArrays, events: np.ndarray, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Fully vectorized simulation for rules whose exits are their own signals"""
+    costs = {**DEFAULT_COSTS, **params}
+    slip = costs["slippage_bps"] / 10000
+    bps = costs["commission_bps"] / 10000
+    allow_short = params.get("allow_short", False)
+
+    # Target position after each close: the latest event wins
+    last_event = _forward_fill_index(events != 0)
+    latest = np.take_along_axis(events, np.maximum(last_event, 0), axis=1)
+    latest[last_event < 0] = 0
+    target = np.where(latest > 0, 1, np.where(latest < 0, -1 if allow_short else 0, 0)).astype(np.int8)
+    target[:, -2:] = 0  # flat from the last bar's open
+
+    # Direction held through each bar (filled at that bar's open)
+    direction = np.zeros_like(target)
+    direction[:, 1:] = target[:, :-1]
+    previous_direction = np.zeros_like(direction)
+    previous_direction[:, 1:] = direction[:, :-1]
+    changed = direction != previous_direction
+
+    open_ = np.nan_to_num(bars.open)
+    close = np.nan_to_num(bars.close)
+    fill = np.where(changed, open_ * (1 + slip * np.sign(direction - previous_direction)), open_)
+
+    entries = changed & (direction != 0)
+    exits = changed & (previous_direction != 0)
+    last_entry = _forward_fill_index(entries)
+    entry_fill = np.take_along_axis(fill, np.maximum(last_entry, 0), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quantity = np.where(direction != 0, costs["trade_notional"] / entry_fill, 0.0)
+    hold = direction * quantity
+    previous_hold = np.zeros_like(hold)
+    previous_hold[:, 1:] = hold[:, :-1]
+    previous_close = np.zeros_like(close)
+    previous_close[:, 1:] = close[:, :-1]
+
+    commissions = (
+        (entries.astype(float) + exits) * costs["commission_per_trade"]
+        + bps * fill * (np.abs(hold) * entries + np.abs(previous_hold) * exits)
+    )
+    pnl = previous_hold * (fill - previous_close) + hold * (close - fill) - commissions
+
+    # Per-trade results: each row starts and ends flat, so entries and exits pair up in order
+    entry_flat = np.flatnonzero(entries)
+    exit_flat = np.flatnonzero(exits)
+    quantity_flat = np.abs(hold.ravel()[entry_flat])
+    entry_price = fill.ravel()[entry_flat]
+    exit_price = fill.ravel()[exit_flat]
+    trade_pnl = (
+        direction.ravel()[entry_flat] * quantity_flat * (exit_price - entry_price)
+        - 2 * costs["commission_per_trade"] - bps * quantity_flat * (entry_price + exit_price)
+    )
+    return {
+        "pnl": pnl,
+        "trade_row": entry_flat // target.shape[1],
+        "trade_pnl": trade_pnl,
+        "exposure": np.count_nonzero(direction, axis=1),
+    }
+
+
+def simulate_event_loop(bars: BarArrays, events: np.ndarray, atr: np.ndarray, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Per-bar simulation for path-dependent exits (ATR stop-loss and take-profit)"""
+    costs = {**DEFAULT_COSTS, **params}
+    slip = costs["slippage_bps"] / 10000
+    bps = costs["commission_bps"] / 10000
+    per_trade = costs["commission_per_trade"]
+    notional = costs["trade_notional"]
+    allow_short = params.get("allow_short", False)
+    stop_atr = params.get("stop_atr", 2.0)
+    take_atr = params.get("take_atr", 3.0)
+
+    symbols, width = bars.close.shape
+    pnl = np.zeros((symbols, width))
+    trade_rows: List[int] = []
+    trade_pnls: List[float] = []
+    exposure = np.zeros(symbols, dtype=np.int64)
+
+    for row in range(symbols):
+        opens, highs, lows, closes = (
+            bars.open[row].tolist(), bars.high[row].tolist(), bars.low[row].tolist(), bars.close[row].tolist()
+        )
+        row_events, row_atr = events[row].tolist(), atr[row].tolist()
+        equity = np.zeros(width)
+        realized = 0.0
+        direction, quantity, entry = 0, 0.0, 0.0
+        stop = take = 0.0
+        pending = None
+        in_position = 0
+
+        def close_trade(price):
+            nonlocal realized, direction, quantity
+            fill_price = price * (1 - slip * direction)
+            result = direction * quantity * (fill_price - entry) - 2 * per_trade - bps * quantity * (fill_price + entry)
+            realized += direction * quantity * (fill_price - entry) - per_trade - bps * quantity * fill_price
+            trade_rows.append(row)
+            trade_pnls.append(result)
+            direction, quantity = 0, 0.0
+
+        for t in range(width):
+            if closes[t] != closes[t]:  # NaN padding
+                continue
+            if t == width - 1:
+                pending = 0
+            if pending is not None and pending != direction:
+                if direction:
+                    close_trade(opens[t])
+                if pending:
+                    direction = pending
+                    entry = opens[t] * (1 + slip * direction)
+                    quantity = notional / entry
+                    realized -= per_trade + bps * quantity * entry
+                    band = row_atr[t - 1] if row_atr[t - 1] == row_atr[t - 1] else 0.0
+                    stop = entry - direction * stop_atr * band
+                    take = entry + direction * take_atr * band
+            pending = None
+
+            if direction and stop != take:
+                # Stop first: the conservative assumption when both levels are inside the bar
+                if (direction > 0 and lows[t] <= stop) or (direction < 0 and highs[t] >= stop):
+                    gapped = (direction > 0 and opens[t] < stop) or (direction < 0 and opens[t] > stop)
+                    close_trade(opens[t] if gapped else stop)
+                elif (direction > 0 and highs[t] >= take) or (direction < 0 and lows[t] <= take):
+                    gapped = (direction > 0 and opens[t] > take) or (direction < 0 and opens[t] < take)
+                    close_trade(opens[t] if gapped else take)
+
+            if direction:
+                in_position += 1
+            equity[t] = realized + (direction * quantity * (closes[t] - entry) if direction else 0.0)
+
+            event = row_events[t]
+            if event > 0:
+                pending = 1
+            elif event < 0:
+                pending = -1 if allow_short else 0
+
+        pnl[row] = np.diff(equity, prepend=0.0)
+        exposure[row] = in_position
+
+    return {
+        "pnl": pnl,
+        "trade_row": np.array(trade_rows, dtype=np.int64),
+        "trade_pnl": np.array(trade_pnls),
+        "exposure": exposure,
+    }
+
+
+def _bars_per_year(timeframe: str) -> float:
+    seconds = TIMEFRAME_SECONDS.get(timeframe, 60)
+    if seconds >= 86400:
+        return 252.0
+    return 252.0 * 6.5 * 3600 / seconds
+
+
+def summarize(bars: BarArrays, result: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Totals plus per-symbol P&L, drawdown and Sharpe ratio"""
+    pnl = result["pnl"]
+    equity = np.cumsum(pnl, axis=1)
+    drawdown = np.max(np.maximum.accumulate(np.maximum(equity, 0.0), axis=1) - equity, axis=1) if pnl.size else np.zeros(0)
+    valid = ~np.isnan(bars.close)
+    counts = np.maximum(valid.sum(axis=1), 1)
+    mean = pnl.sum(axis=1) / counts
+    std = np.sqrt(np.maximum((pnl * pnl).sum(axis=1) / counts - mean * mean, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * math.sqrt(_bars_per_year(bars.timeframe)), 0.0)
+
+    trade_row, trade_pnl = result["trade_row"], result["trade_pnl"]
+    trades = np.bincount(trade_row, minlength=len(bars.symbols))
+    wins = np.bincount(trade_row, weights=trade_pnl > 0, minlength=len(bars.symbols)).astype(int)
+    symbol_pnl = np.bincount(trade_row, weights=trade_pnl, minlength=len(bars.symbols))
+
+    active = trades > 0
+    mean_sharpe = float(sharpe[active].mean()) if active.any() else 0.0
+    total_trades = int(trades.sum())
+    return {
+        "symbols": len(bars.symbols),
+        "bars": bars.bar_count,
+        "total_trades": total_trades,
+        "winning_trades": int(wins.sum()),
+        "win_rate": round(int(wins.sum()) / total_trades, 4) if total_trades else 0.0,
+        "total_pnl": round(float(trade_pnl.sum()), 2),
+        "sharpe": round(mean_sharpe, 4),
+        "max_drawdown": round(float(drawdown.max()), 2) if len(drawdown) else 0.0,
+        # Sharpe mapped onto 0..1 (0 -> 0.5) for Strategy.performance_score
+        "performance_score": round(0.5 + 0.5 * math.tanh(mean_sharpe / 2), 4),
+        "per_symbol": [
+            {
+                "symbol": symbol,
+                "trades": int(trades[i]),
+                "winning_trades": int(wins[i]),
+                "pnl": round(float(symbol_pnl[i]), 2),
+                "max_drawdown": round(float(drawdown[i]), 2),
+                "sharpe": round(float(sharpe[i]), 4),
+                "exposure": round(float(result["exposure"][i]) / float(counts[i]), 4),
+            }
+            for i, symbol in enumerate(bars.symbols)
+        ],
+    }
+
+
+def run_backtest(bars: BarArrays, strategy_type: StrategyType, params: Dict[str, Any],
+                 indicators: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+    """Backtest one rule and parameter set over loaded bars"""
+    if strategy_type not in VECTOR_RULES:
+        raise ValueError(f"No backtestable rule for strategy type '{strategy_type.value}'")
+    if bars.close.shape[1] < 3:
+        raise ValueError("Not enough bars to backtest")
+    values = indicators if indicators is not None else compute_indicators(bars.high, bars.low, bars.close)
+    events = VECTOR_RULES[strategy_type](values, bars.close, params)
+    mode = "event_loop" if params.get("use_stops") else "vectorized"
+    if mode == "event_loop":
+        result = simulate_event_loop(bars, events, values["ATR_14"], params)
+    else:
+        result = simulate_vectorized(bars, events, params)
+    summary = summarize(bars, result)
+    summary["mode"] = mode
+    return summary
+
+
+# -- Strategy backtests and parameter sweeps -----------------------------------
+
+def strategy_params(strategy: Strategy) -> Dict[str, Any]:
+    return json.loads(strategy.parameters) if strategy.parameters else {}
+
+
+def backtest_strategy(db, strategy: Strategy, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      write: bool = True) -> Dict[str, Any]:
+    """Backtest a Strategy row over its symbols and timeframe and store the summary on it"""
+    params = strategy_params(strategy)
+    symbols = params.get("symbols", "*")
+    bars = load_bars(
+        db.connection(), params.get("timeframe", "5m"),
+        None if symbols == "*" else [s.upper() for s in symbols], start, end
+    )
+    summary = run_backtest(bars, strategy.type, params)
+    if write:
+        strategy.performance_score = summary["performance_score"]
+        strategy.total_trades = summary["total_trades"]
+        strategy.winning_trades = summary["winning_trades"]
+        strategy.total_pnl = summary["total_pnl"]
+        db.commit()
+    return summary
+
+
+_worker_bars: Optional[BarArrays] = None
+_worker_indicators: Optional[Dict[str, np.ndarray]] = None
+
+
+def _init_sweep_worker(bars: BarArrays):
+    """Receive the bar arrays once per worker instead of once per parameter set"""
+    global _worker_bars, _worker_indicators
+    _worker_bars = bars
+    _worker_indicators = compute_indicators(bars.high, bars.low, bars.close)
+
+
+def _sweep_task(strategy_type: StrategyType, params: Dict[str, Any]) -> Dict[str, Any]:
+    summary = run_backtest(_worker_bars, strategy_type, params, _worker_indicators)
+    summary.pop("per_symbol")
+    return {"params": params, **summary}
+
+
+def expand_grid(base: Dict[str, Any], grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    keys = sorted(grid)
+    return [{**base, **dict(zip(keys, combo))} for combo in itertools.product(*(grid[k] for k in keys))]
+
+
+def parameter_sweep(bars: BarArrays, strategy_type: StrategyType, base_params: Dict[str, Any],
+                    grid: Dict[str, List[Any]], workers: int = BACKTEST_WORKERS) -> List[Dict[str, Any]]:
+    """Backtest every parameter combination in parallel, best Sharpe first"""
+    combos = expand_grid(base_params, grid)
+    if workers <= 1 or len(combos) == 1:
+        _init_sweep_worker(bars)
+        results = [_sweep_task(strategy_type, params) for params in combos]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(combos)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_sweep_worker,
+            initargs=(bars,)
+        ) as pool:
+            results = list(pool.map(_sweep_task, itertools.repeat(strategy_type), combos))
+    return sorted(results, key=lambda r: (r["sharpe"], r["total_pnl"]), reverse=True)
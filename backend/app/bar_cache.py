@@ -0,0 +1,373 @@
+"""
+Incremental on-disk cache of historical price bars
+
+Bars are stored per symbol and frequency as fixed-size binary records sorted by
+time, read back through a NumPy memory map. Only the missing tail of a request
+is fetched from upstream and appended; past bars never change. A covered
+request is served without any upstream call when the tail was fetched less than
+BAR_CACHE_REFRESH_SECONDS ago, or when no session has opened since.
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Callable
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BAR_CACHE_DIR = os.getenv("BAR_CACHE_DIR", "bar_cache")
+BAR_CACHE_MAX_BYTES = int(os.getenv("BAR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# A tail fetched this recently is served as is; the forming bar may lag by up to this much
+BAR_CACHE_REFRESH_SECONDS = float(os.getenv("BAR_CACHE_REFRESH_SECONDS", "60"))
+
+BAR_DTYPE = np.dtype([
+    ("datetime", "<i8"),  # epoch milliseconds, bar open time
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<i8"),
+])
+
+# Fixed UTC-5 shift keeps an entire US session (04:00-20:00 ET) on one day in both EST and EDT
+_SESSION_SHIFT_MS = 5 * 3600 * 1000
+_DAY_MS = 86400 * 1000
+
+# Slack for weekends/holidays when deciding whether cached history reaches back far enough
+_COVERAGE_SLACK_MS = 4 * _DAY_MS
+# On the shifted (UTC-5) clock the session runs 04:00-20:00 in winter and 03:00-19:00 in summer
+_SESSION_OPEN_MS = 3 * 3600 * 1000
+_SESSION_CLOSE_MS = 20 * 3600 * 1000
+
+FetchFunc = Callable[..., Optional[Dict[str, Any]]]
+
+
+def candles_to_array(candles: List[Dict[str, Any]]) -> np.ndarray:
+    """Convert Schwab `candles` dicts into a structured bar array sorted by time"""
+    bars = np.empty(len(candles), dtype=BAR_DTYPE)
+    for i, candle in enumerate(candles):
+        bars[i] = (
+            candle["datetime"], candle["open"], candle["high"],
+            candle["low"], candle["close"], candle.get("volume", 0)
+        )
+    bars.sort(order="datetime")
+    return bars
+
+
+def array_to_candles(bars: np.ndarray) -> List[Dict[str, Any]]:
+    """Convert a bar array back into Schwab-shaped `candles` dicts"""
+    return [
+        {"open": o, "high": h, "low": l, "close": c, "volume": v, "datetime": t}
+        for t, o, h, l, c, v in zip(
+            bars["datetime"].tolist(), bars["open"].tolist(), bars["high"].tolist(),
+            bars["low"].tolist(), bars["close"].tolist(), bars["volume"].tolist()
+        )
+    ]
+
+
+def _in_session(ts_ms: int) -> bool:
+    """Whether bars can form at this time (weekday, between the earliest open and latest close)"""
+    local = ts_ms - _SESSION_SHIFT_MS
+    weekday = datetime.fromtimestamp(local / 1000, tz=timezone.utc).weekday()
+    return weekday < 5 and _SESSION_OPEN_MS <= local % _DAY_MS < _SESSION_CLOSE_MS
+
+
+def _next_session_open(ts_ms: int) -> int:
+    """First weekday session open after `ts_ms` (holidays are not known and count as sessions)"""
+    local = ts_ms - _SESSION_SHIFT_MS
+    candidate = local - local % _DAY_MS + _SESSION_OPEN_MS
+    if candidate <= local:
+        candidate += _DAY_MS
+    while datetime.fromtimestamp(candidate / 1000, tz=timezone.utc).weekday() >= 5:
+        candidate += _DAY_MS
+    return candidate + _SESSION_SHIFT_MS
+
+
+def tail_is_current(last_fetched_ms: Optional[int], now_ms: int,
+                    refresh_seconds: float = BAR_CACHE_REFRESH_SECONDS) -> bool:
+    """Whether upstream can be skipped: fetched recently, or the market has stayed closed since"""
+    if last_fetched_ms is None:
+        return False
+    if now_ms - last_fetched_ms < refresh_seconds * 1000:
+        return True
+    return not _in_session(last_fetched_ms) and now_ms < _next_session_open(last_fetched_ms)
+
+
+class BarCache:
+    """
+    Per-symbol columnar bar store keyed by frequency, with a total size cap
+    enforced by evicting the least recently used symbols.
+    """
+
+    def __init__(self, root: str = BAR_CACHE_DIR, max_bytes: int = BAR_CACHE_MAX_BYTES,
+                 refresh_seconds: float = BAR_CACHE_REFRESH_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self._lru: "OrderedDict[str, int]" = OrderedDict()  # symbol -> bytes on disk
+        self._scanned = False
+
+        # Stats
+        self.hits = 0
+        self.tail_fetches = 0
+        self.full_fetches = 0
+        self.evictions = 0
+        self.bytes_from_cache = 0
+        self.bytes_from_upstream = 0
+
+    # -- Storage ---------------------------------------------------------------
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.upper())
+
+    def _paths(self, symbol: str, frequency_key: str):
+        base = os.path.join(self._symbol_dir(symbol), frequency_key)
+        return base + ".bars", base + ".json"
+
+    def _scan(self):
+        """Seed the LRU from what is already on disk (oldest modification first)"""
+        if self._scanned:
+            return
+        self._scanned = True
+        if not os.path.isdir(self.root):
+            return
+        entries = []
+        for symbol in os.listdir(self.root):
+            path = os.path.join(self.root, symbol)
+            if not os.path.isdir(path):
+                continue
+            files = [os.path.join(path, f) for f in os.listdir(path)]
+            size = sum(os.path.getsize(f) for f in files)
+            mtime = max((os.path.getmtime(f) for f in files), default=0)
+            entries.append((mtime, symbol, size))
+        for _, symbol, size in sorted(entries):
+            self._lru[symbol] = size
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            self._scan()
+            lock = self._symbol_locks.get(symbol)
+            if lock is None:
+                lock = self._symbol_locks[symbol] = threading.Lock()
+            return lock
+
+    def _load(self, symbol: str, frequency_key: str):
+        data_path, meta_path = self._paths(symbol, frequency_key)
+        if not os.path.exists(data_path) or os.path.getsize(data_path) == 0:
+            return np.empty(0, dtype=BAR_DTYPE), {}
+        bars = np.memmap(data_path, dtype=BAR_DTYPE, mode="r")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        return bars, meta
+
+    def _write(self, symbol: str, frequency_key: str, bars: np.ndarray, meta: Dict[str, Any], append_from: Optional[int] = None):
+        """Persist bars; with `append_from`, truncate to that record and append instead of rewriting"""
+        data_path, meta_path = self._paths(symbol, frequency_key)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        if append_from is None:
+            tmp_path = data_path + ".tmp"
+            bars.tofile(tmp_path)
+            os.replace(tmp_path, data_path)
+        else:
+            with open(data_path, "r+b") as f:
+                f.truncate(append_from * BAR_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(bars.tobytes())
+        self._write_meta(symbol, frequency_key, meta)
+
+    def _write_meta(self, symbol: str, frequency_key: str, meta: Dict[str, Any]):
+        _, meta_path = self._paths(symbol, frequency_key)
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def _touch(self, symbol: str):
+        """Record an access and refresh the symbol's on-disk size"""
+        path = self._symbol_dir(symbol)
+        size = 0
+        if os.path.isdir(path):
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        with self._lock:
+            self._lru[symbol] = size
+            self._lru.move_to_end(symbol)
+
+    def _evict(self, keep: str):
+        """Drop least recently used symbols until the cache fits its size cap"""
+        victims = []
+        with self._lock:
+            total = sum(self._lru.values())
+            for symbol in list(self._lru):
+                if total <= self.max_bytes:
+                    break
+                lock = self._symbol_locks.setdefault(symbol, threading.Lock())
+                # Never evict the symbol just served or one that is being read/written
+                if symbol == keep or not lock.acquire(blocking=False):
+                    continue
+                total -= self._lru.pop(symbol)
+                victims.append((symbol, lock))
+        for symbol, lock in victims:
+            try:
+                shutil.rmtree(self._symbol_dir(symbol), ignore_errors=True)
+            finally:
+                lock.release()
+            self.evictions += 1
+            logger.info(f"🧹 Evicted cached bars for {symbol}")
+
+    # -- Requests --------------------------------------------------------------
+
+    @staticmethod
+    def _required_start(bars: np.ndarray, period_type: str, period: int, now_ms: int) -> Optional[int]:
+        """
+        Earliest bar time a request needs, or None if the cache cannot tell
+        (a 'day' period counts trading sessions, not calendar days).
+        """
+        if period_type == "day":
+            if len(bars) == 0:
+                return None
+            sessions = np.unique((bars["datetime"] - _SESSION_SHIFT_MS) // _DAY_MS)
+            if len(sessions) < period:
+                return None
+            return int(sessions[-period] * _DAY_MS + _SESSION_SHIFT_MS)
+        now = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+        if period_type == "month":
+            start = now - timedelta(days=31 * period)
+        elif period_type == "year":
+            start = now - timedelta(days=366 * period)
+        elif period_type == "ytd":
+            start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        else:
+            return None
+        return int(start.timestamp() * 1000)
+
+    def get_history(
+        self,
+        symbol: str,
+        period_type: str,
+        period: int,
+        fetch: FetchFunc,
+        frequency_type: str = "minute",
+        frequency: int = 1,
+        now_ms: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Serve price history from the cache, fetching only the missing tail from
+        upstream. `fetch` is called with price_history keyword arguments and
+        returns the decoded JSON response (or None on failure).
+        """
+        symbol = symbol.upper()
+        frequency_key = f"{frequency_type}_{frequency}"
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+        upstream_bytes = 0
+
+        with self._symbol_lock(symbol):
+            cached, meta = self._load(symbol, frequency_key)
+            required_start = self._required_start(cached, period_type, period, now_ms)
+            covered_from = meta.get("covered_from")
+            covered = (
+                len(cached) > 0 and covered_from is not None and required_start is not None
+                and covered_from <= required_start + _COVERAGE_SLACK_MS
+            )
+
+            if covered and tail_is_current(meta.get("last_fetched_ms"), now_ms, self.refresh_seconds):
+                self.hits += 1
+            elif covered:
+                # Refetch from the last cached bar (inclusive) since it may still have been forming
+                last_ms = int(cached["datetime"][-1])
+                response = fetch(
+                    symbol=symbol, frequencyType=frequency_type, frequency=frequency,
+                    startDate=last_ms, endDate=now_ms
+                )
+                if response is None:
+                    return None
+                tail = candles_to_array(response.get("candles", []))
+                tail = tail[tail["datetime"] >= last_ms]
+                upstream_bytes = tail.nbytes
+                self.tail_fetches += 1
+                meta["last_fetched_ms"] = now_ms
+                if len(tail):
+                    append_from = int(np.searchsorted(cached["datetime"], tail["datetime"][0], side="left"))
+                    del cached
+                    self._write(symbol, frequency_key, tail, meta, append_from=append_from)
+                    cached, meta = self._load(symbol, frequency_key)
+                else:
+                    self._write_meta(symbol, frequency_key, meta)
+            else:
+                response = fetch(
+                    symbol=symbol, periodType=period_type, period=period,
+                    frequencyType=frequency_type, frequency=frequency
+                )
+                if response is None:
+                    return None
+                fetched = candles_to_array(response.get("candles", []))
+                self.full_fetches += 1
+                upstream_bytes = fetched.nbytes
+                if len(fetched):
+                    merged = np.concatenate([cached, fetched]) if len(cached) else fetched
+                    # Keep the newest copy of any bar present in both
+                    _, last_index = np.unique(merged["datetime"][::-1], return_index=True)
+                    merged = merged[::-1][last_index]
+                    first_ms = int(fetched["datetime"][0])
+                    meta = {
+                        "covered_from": min(first_ms, covered_from) if covered_from else first_ms,
+                        "last_fetched_ms": now_ms,
+                    }
+                    del cached
+                    self._write(symbol, frequency_key, merged, meta)
+                    cached, meta = self._load(symbol, frequency_key)
+
+            required_start = self._required_start(cached, period_type, period, now_ms) or 0
+            start_index = int(np.searchsorted(cached["datetime"], required_start, side="left"))
+            window = np.array(cached[start_index:])
+            del cached
+            self.bytes_from_upstream += upstream_bytes
+            self.bytes_from_cache += max(0, window.nbytes - upstream_bytes)
+
+        self._touch(symbol)
+        self._evict(keep=symbol)
+
+        return {
+            "symbol": symbol,
+            "empty": len(window) == 0,
+            "candles": array_to_candles(window),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache effectiveness and size"""
+        with self._lock:
+            self._scan()
+            total_bytes = sum(self._lru.values())
+            symbols = len(self._lru)
+        served = self.bytes_from_cache + self.bytes_from_upstream
+        return {
+            "root": self.root,
+            "symbols": symbols,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "refresh_seconds": self.refresh_seconds,
+            "hits": self.hits,
+            "tail_fetches": self.tail_fetches,
+            "full_fetches": self.full_fetches,
+            "evictions": self.evictions,
+            "bytes_from_cache": self.bytes_from_cache,
+            "bytes_from_upstream": self.bytes_from_upstream,
+            "cache_byte_ratio": round(self.bytes_from_cache / served, 4) if served else 0.0,
+        }
+
+
+# Global bar cache used by SchwabAPIService.get_market_data_history
+bar_cache = BarCache()
@@ -0,0 +1,254 @@
+"""
+Streaming OHLCV+VWAP bar aggregation from level-one ticks
+"""
+
+import os
+import logging
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Callable
+
+from dotenv import load_dotenv
+
+from app.ingestion import BulkInsertWriter
+from app.models import MarketBar
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAME_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "1d": 86400}
+BAR_TIMEFRAMES = [tf.strip() for tf in os.getenv("BAR_TIMEFRAMES", "1m,5m,15m,1h").split(",") if tf.strip()]
+# How long after a period ends the timer waits for late ticks before closing a quiet bar
+BAR_CLOSE_GRACE = float(os.getenv("BAR_CLOSE_GRACE", "2.0"))
+
+# Layout of one timeframe slot in a symbol's state array
+_START, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _PV, _TRADES = range(8)
+_SLOT = 8
+
+ClosedBarListener = Callable[[str, str, Dict[str, Any]], None]
+
+
+class SymbolBars:
+    """Per-symbol aggregation state: one flat array of doubles for every timeframe"""
+    __slots__ = ("state", "closed", "last_price", "last_volume")
+
+    def __init__(self, timeframes: int):
+        self.state = array("d", [-1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0] * timeframes)
+        # Start of the last emitted bucket per timeframe; ticks at or before it are late
+        self.closed = array("d", [-1.0] * timeframes)
+        self.last_price = 0.0
+        self.last_volume = -1.0
+
+
+class BarAggregator:
+    """
+    Keeps rolling OHLCV+VWAP bars per symbol for several timeframes and emits
+    each bar when it closes, either on the first tick of the next period or by
+    the close timer once the period has ended. Closed bars are queued to the
+    `market_bars` writer and passed to any registered listeners.
+
+    A bar is emitted at most once: ticks for a period that has already closed
+    are counted as late and dropped. With `event_time` the close timer is not
+    used and bars close against the newest tick timestamp instead of the wall
+    clock, which is what recorded data (journal replay) needs.
+    """
+
+    def __init__(self, timeframes: List[str] = BAR_TIMEFRAMES, writer: Optional[BulkInsertWriter] = None,
+                 event_time: bool = False):
+        self.timeframes = list(timeframes)
+        self.event_time = event_time
+        self._periods_ms = [TIMEFRAME_SECONDS[tf] * 1000 for tf in self.timeframes]
+        self.writer = writer
+        self.listeners: List[ClosedBarListener] = []
+        self._symbols: Dict[str, SymbolBars] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Newest tick timestamp seen, the clock of an event-time aggregator
+        self.watermark_ms = 0
+        self._next_sweep_ms = 0
+
+        # Stats
+        self.ticks = 0
+        self.late_ticks = 0
+        self.bars_closed = 0
+
+    def add_listener(self, listener: ClosedBarListener):
+        self.listeners.append(listener)
+
+    def on_tick(self, symbol: str, price: Optional[float], cumulative_volume: Optional[float], ts_ms: int):
+        """
+        Apply one trade update. `cumulative_volume` is the session total volume
+        (level-one field 8); the traded size is its increase since the previous tick.
+        """
+        closed = []
+        with self._lock:
+            bars = self._symbols.get(symbol)
+            if bars is None:
+                bars = self._symbols[symbol] = SymbolBars(len(self.timeframes))
+
+            size = 0.0
+            if cumulative_volume is not None:
+                if bars.last_volume >= 0:
+                    size = cumulative_volume - bars.last_volume
+                    if size < 0:  # new session, totals restarted
+                        size = cumulative_volume
+                bars.last_volume = cumulative_volume
+            if price is None:
+                if size <= 0 or bars.last_price <= 0:
+                    return
+                price = bars.last_price  # volume-only update: trade at the last price
+            bars.last_price = price
+            self.ticks += 1
+            if ts_ms > self.watermark_ms:
+                self.watermark_ms = ts_ms
+
+            state = bars.state
+            for i, period_ms in enumerate(self._periods_ms):
+                base = i * _SLOT
+                bucket = ts_ms - ts_ms % period_ms
+                if bucket <= bars.closed[i]:
+                    self.late_ticks += 1
+                    continue  # late tick for a period whose bar was already emitted
+                start = state[base + _START]
+                if start != bucket:
+                    if start >= 0 and bucket > start:
+                        closed.append(self._close_slot(symbol, i, bars, base))
+                    elif start >= 0:
+                        self.late_ticks += 1
+                        continue  # late tick for an older period than the open bar
+                    state[base + _START] = bucket
+                    state[base + _OPEN] = state[base + _HIGH] = state[base + _LOW] = price
+                    state[base + _VOLUME] = state[base + _PV] = state[base + _TRADES] = 0.0
+                if price > state[base + _HIGH]:
+                    state[base + _HIGH] = price
+                elif price < state[base + _LOW]:
+                    state[base + _LOW] = price
+                state[base + _CLOSE] = price
+                state[base + _VOLUME] += size
+                state[base + _PV] += price * size
+                state[base + _TRADES] += 1
+        if closed:
+            self._emit(closed)
+        if self.event_time and ts_ms >= self._next_sweep_ms:
+            # Quiet symbols' bars close once event time has moved past their period
+            self._next_sweep_ms = ts_ms - ts_ms % 1000 + 1000
+            self.close_expired(self.watermark_ms)
+
+    def _bar(self, symbol: str, i: int, state: array, base: int) -> Dict[str, Any]:
+        volume = state[base + _VOLUME]
+        bar = {
+            "symbol": symbol,
+            "timeframe": self.timeframes[i],
+            "timestamp": datetime.fromtimestamp(state[base + _START] / 1000, tz=timezone.utc),
+            "open_price": state[base + _OPEN],
+            "high": state[base + _HIGH],
+            "low": state[base + _LOW],
+            "close": state[base + _CLOSE],
+            "volume": int(volume),
+            "vwap": state[base + _PV] / volume if volume > 0 else state[base + _CLOSE],
+            "trade_count": int(state[base + _TRADES]),
+        }
+        return bar
+
+    def _close_slot(self, symbol: str, i: int, bars: SymbolBars, base: int) -> Dict[str, Any]:
+        bar = self._bar(symbol, i, bars.state, base)
+        bars.closed[i] = bars.state[base + _START]
+        bars.state[base + _START] = -1.0
+        return bar
+
+    def close_expired(self, now_ms: Optional[int] = None) -> int:
+        """Close bars whose period has ended (plus grace) without a newer tick"""
+        if now_ms is None:
+            now_ms = self.watermark_ms if self.event_time else int(time.time() * 1000)
+        cutoff = now_ms - BAR_CLOSE_GRACE * 1000
+        closed = []
+        with self._lock:
+            for symbol, bars in self._symbols.items():
+                state = bars.state
+                for i, period_ms in enumerate(self._periods_ms):
+                    base = i * _SLOT
+                    start = state[base + _START]
+                    if start >= 0 and start + period_ms <= cutoff:
+                        closed.append(self._close_slot(symbol, i, bars, base))
+        if closed:
+            self._emit(closed)
+        return len(closed)
+
+    def close_all(self) -> int:
+        """Close every bar still forming, e.g. at the end of a recorded session"""
+        return self.close_expired(float("inf"))
+
+    def _emit(self, closed: List[Dict[str, Any]]):
+        self.bars_closed += len(closed)
+        if self.writer is not None:
+            self.writer.submit_many(closed)
+        for listener in self.listeners:
+            for bar in closed:
+                try:
+                    listener(bar["symbol"], bar["timeframe"], bar)
+                except Exception as e:
+                    logger.error(f"Bar listener failed: {e}")
+
+    def current_bars(self, symbol: str) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of the bars still forming for a symbol"""
+        with self._lock:
+            bars = self._symbols.get(symbol)
+            if bars is None:
+                return {}
+            state = array("d", bars.state)
+        snapshot = {}
+        for i, tf in enumerate(self.timeframes):
+            base = i * _SLOT
+            if state[base + _START] >= 0:
+                snapshot[tf] = self._bar(symbol, i, state, base)
+        return snapshot
+
+    def start(self, interval: float = 1.0):
+        """Start the close timer (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        if self.writer is not None:
+            self.writer.start()
+        if self.event_time:
+            return  # bars close on tick timestamps, not on the wall clock
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.close_expired()
+                except Exception as e:
+                    logger.error(f"Error closing expired bars: {e}")
+
+        self._thread = threading.Thread(target=run, name="bar-close-timer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the close timer after closing any bar whose period has already ended"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        self.close_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "timeframes": self.timeframes,
+            "symbols": len(self._symbols),
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "bars_closed": self.bars_closed,
+            "state_bytes": sum(
+                bars.state.buffer_info()[1] * bars.state.itemsize for bars in self._symbols.values()
+            ),
+        }
+
+
+# Global aggregator fed by the stream handler; closed bars go to `market_bars`
+market_bar_writer = BulkInsertWriter(MarketBar.__table__, conflict_columns=("symbol", "timeframe", "timestamp"))
+bar_aggregator = BarAggregator(writer=market_bar_writer)
@@ -1,23 +1,52 @@
 import os
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from app.metrics import registry, DB_POOL_WAIT_SECONDS
+
 load_dotenv()
 
 # Database URL
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://christian@localhost:5432/finsight")
 
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (including connecting when the pool grows)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_size=20,
     max_overflow=0,
     pool_pre_ping=True,
     echo=False  # Set to True for SQL query logging
 )
 
+
+def _pool_metrics():
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        yield "db_pool_size", "gauge", "Configured connections in the pool", [({}, pool.size())]
+        yield "db_pool_checked_out", "gauge", "Connections currently checked out", [({}, pool.checkedout())]
+        yield "db_pool_overflow", "gauge", "Connections open beyond pool_size", [({}, max(0, pool.overflow()))]
+
+
+registry.add_collector(_pool_metrics)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -37,6 +66,9 @@ def get_db():
 def create_tables():
     """Create all database tables"""
     from app.models import Base
+    from app.partitioning import create_partitioned_table
+    # market_data is created partitioned on PostgreSQL before create_all sees it
+    create_partitioned_table(engine)
     Base.metadata.create_all(bind=engine)
 
 
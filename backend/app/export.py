@@ -0,0 +1,111 @@
+"""
+Streaming NDJSON exports of stored market history
+
+Rows are read through a server-side cursor (`stream_results` + `yield_per`)
+and written to the client one fetched batch at a time, so memory stays flat
+and the first line goes out as soon as the first batch arrives, however many
+rows the export covers.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Any, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import Float, cast, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+from app.database import engine as default_engine
+from app.models import MarketData, MarketBar
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the server-side cursor (and written) per batch
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+EXPORT_FIRST_BATCH_ROWS = 50
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def tick_export_query(symbol: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Select:
+    """Ticks for a symbol in time order; prices cast in SQL so no Decimals are built"""
+    query = select(
+        MarketData.id,
+        MarketData.timestamp,
+        cast(MarketData.price, Float).label("price"),
+        MarketData.volume,
+        cast(MarketData.open_price, Float).label("open"),
+        cast(MarketData.high, Float).label("high"),
+        cast(MarketData.low, Float).label("low"),
+        cast(MarketData.bid, Float).label("bid"),
+        cast(MarketData.ask, Float).label("ask"),
+    ).where(MarketData.symbol == symbol)
+    if start is not None:
+        query = query.where(MarketData.timestamp >= start)
+    if end is not None:
+        query = query.where(MarketData.timestamp < end)
+    # Timestamp only: the (symbol, timestamp) index then yields rows without a sort
+    return query.order_by(MarketData.timestamp)
+
+
+def bar_export_query(symbol: str, timeframe: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> Select:
+    query = select(
+        MarketBar.timestamp,
+        cast(MarketBar.open_price, Float).label("open"),
+        cast(MarketBar.high, Float).label("high"),
+        cast(MarketBar.low, Float).label("low"),
+        cast(MarketBar.close, Float).label("close"),
+        MarketBar.volume,
+        MarketBar.vwap,
+        MarketBar.trade_count.label("trades"),
+    ).where(MarketBar.symbol == symbol, MarketBar.timeframe == timeframe)
+    if start is not None:
+        query = query.where(MarketBar.timestamp >= start)
+    if end is not None:
+        query = query.where(MarketBar.timestamp < end)
+    return query.order_by(MarketBar.timestamp)
+
+
+def _encode_batch(keys: List[str], rows) -> bytes:
+    dumps = json.dumps
+    lines = []
+    for row in rows:
+        record: Dict[str, Any] = dict(zip(keys, row))
+        record["timestamp"] = record["timestamp"].isoformat()
+        lines.append(dumps(record, separators=(",", ":")))
+    lines.append("")
+    return "\n".join(lines).encode()
+
+
+def stream_ndjson(query: Select, bind: Optional[Engine] = None,
+                  batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """
+    Yield NDJSON chunks for `query`, one per fetched batch. The connection is
+    held only while the client keeps reading and is released when the
+    response finishes or the client disconnects.
+    """
+    bind = bind if bind is not None else default_engine
+    exported = 0
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_rows).execute(query)
+        keys = list(result.keys())
+        try:
+            # A small first batch gets the first bytes out before a full batch is fetched
+            size = min(EXPORT_FIRST_BATCH_ROWS, batch_rows)
+            while True:
+                rows = result.fetchmany(size)
+                if not rows:
+                    break
+                exported += len(rows)
+                yield _encode_batch(keys, rows)
+                size = batch_rows
+        finally:
+            result.close()
+            logger.debug(f"Exported {exported} rows")
@@ -0,0 +1,549 @@
+"""
+Vectorized technical indicator engine
+
+Indicators are computed with NumPy over (symbols x bars) arrays, so the whole
+universe for a timeframe is one pass over a 2D array. Closed bars from the
+stream update a per-symbol state in O(1) (EMA, Wilder smoothing and running
+window sums) instead of recomputing the window.
+"""
+
+import os
+import logging
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Set, Tuple, Callable
+
+import numpy as np
+from sqlalchemy import select, delete, insert, func, cast, Float
+from dotenv import load_dotenv
+
+from app.backpressure import BufferedConsumer, DROP_OLDEST
+from app.database import engine as default_engine
+from app.ingestion import BulkInsertWriter
+from app.models import MarketBar, TechnicalIndicator
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Bars loaded per symbol by the batch recompute; enough for every window to converge
+INDICATOR_LOOKBACK_BARS = int(os.getenv("INDICATOR_LOOKBACK_BARS", "300"))
+INDICATOR_INSERT_CHUNK = 5000
+
+SMA_PERIODS = (20, 50)
+EMA_FAST, EMA_SLOW, MACD_SIGNAL_PERIOD = 12, 26, 9
+RSI_PERIOD = 14
+BB_PERIOD, BB_STDDEV = 20, 2.0
+ATR_PERIOD = 14
+_WINDOW = max(max(SMA_PERIODS), BB_PERIOD)
+
+INDICATOR_NAMES = (
+    "SMA_20", "SMA_50", "EMA_12", "EMA_26", "RSI_14", "MACD", "MACD_SIGNAL",
+    "MACD_HIST", "BB_UPPER", "BB_LOWER", "ATR_14",
+)
+
+# Bars a symbol needs before each indicator is reported
+WARMUP_BARS = {
+    "SMA_20": 20, "SMA_50": 50, "EMA_12": EMA_FAST, "EMA_26": EMA_SLOW,
+    "RSI_14": RSI_PERIOD + 1, "MACD": EMA_SLOW, "MACD_SIGNAL": EMA_SLOW + MACD_SIGNAL_PERIOD - 1,
+    "MACD_HIST": EMA_SLOW + MACD_SIGNAL_PERIOD - 1, "BB_UPPER": BB_PERIOD, "BB_LOWER": BB_PERIOD,
+    "ATR_14": ATR_PERIOD,
+}
+
+
+IndicatorListener = Callable[[str, str, Dict[str, Any], Dict[str, float]], None]
+
+
+# -- Vectorized kernels --------------------------------------------------------
+#
+# Every kernel takes float arrays shaped (symbols, bars), oldest bar first.
+# Symbols with shorter history are left-padded with NaN.
+
+def ema(values: np.ndarray, period: Optional[int] = None, alpha: Optional[float] = None) -> np.ndarray:
+    """Exponential moving average seeded with each row's first value"""
+    alpha = 2.0 / (period + 1) if alpha is None else alpha
+    out = np.empty_like(values)
+    prev = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        current = values[:, t]
+        prev = np.where(np.isnan(prev), current, prev + alpha * (current - prev))
+        out[:, t] = prev
+    return out
+
+
+def _window_sums(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling sums of values and squares over `period` bars (NaN where the window is incomplete)"""
+    filled = np.nan_to_num(values)
+    counts = np.cumsum(~np.isnan(values), axis=1)
+    sums = np.cumsum(filled, axis=1)
+    squares = np.cumsum(filled * filled, axis=1)
+    sums[:, period:] = sums[:, period:] - sums[:, :-period]
+    squares[:, period:] = squares[:, period:] - squares[:, :-period]
+    incomplete = counts < period
+    sums[incomplete] = np.nan
+    squares[incomplete] = np.nan
+    return sums, squares
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    sums, _ = _window_sums(values, period)
+    return sums / period
+
+
+def bollinger(values: np.ndarray, period: int = BB_PERIOD, stddev: float = BB_STDDEV):
+    """(upper, middle, lower) bands using the population standard deviation"""
+    sums, squares = _window_sums(values, period)
+    middle = sums / period
+    std = np.sqrt(np.maximum(squares / period - middle * middle, 0.0))
+    return middle + stddev * std, middle, middle - stddev * std
+
+
+def _rsi_averages(close: np.ndarray, period: int = RSI_PERIOD):
+    change = np.full_like(close, np.nan)
+    change[:, 1:] = np.diff(close, axis=1)
+    gains = ema(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), alpha=1.0 / period)
+    losses = ema(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), alpha=1.0 / period)
+    return gains, losses
+
+
+def _rsi_from_averages(gains, losses):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(losses == 0, np.where(gains == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + gains / losses))
+
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Wilder's relative strength index"""
+    return _rsi_from_averages(*_rsi_averages(close, period))
+
+
+def macd(close: np.ndarray, fast: int = EMA_FAST, slow: int = EMA_SLOW, signal: int = MACD_SIGNAL_PERIOD):
+    """(macd, signal, histogram)"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    ranges = high - low
+    with np.errstate(invalid="ignore"):
+        gaps = np.fmax(np.abs(high - prev_close), np.abs(low - prev_close))
+    return np.fmax(ranges, gaps)
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = ATR_PERIOD) -> np.ndarray:
+    """Average true range with Wilder smoothing"""
+    return ema(true_range(high, low, close), alpha=1.0 / period)
+
+
+def _compute(high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    """All indicators plus the smoothing state needed to continue incrementally"""
+    ema_fast, ema_slow = ema(close, EMA_FAST), ema(close, EMA_SLOW)
+    macd_line = ema_fast - ema_slow
+    signal_line = ema(macd_line, MACD_SIGNAL_PERIOD)
+    gains, losses = _rsi_averages(close)
+    upper, _, lower = bollinger(close)
+    atr_values = atr(high, low, close)
+
+    values = {
+        "SMA_20": sma(close, 20),
+        "SMA_50": sma(close, 50),
+        "EMA_12": ema_fast,
+        "EMA_26": ema_slow,
+        "RSI_14": _rsi_from_averages(gains, losses),
+        "MACD": macd_line,
+        "MACD_SIGNAL": signal_line,
+        "MACD_HIST": macd_line - signal_line,
+        "BB_UPPER": upper,
+        "BB_LOWER": lower,
+        "ATR_14": atr_values,
+    }
+    counts = np.cumsum(~np.isnan(close), axis=1)
+    state = {
+        "count": counts[:, -1],
+        "ema_fast": ema_fast[:, -1].copy(),
+        "ema_slow": ema_slow[:, -1].copy(),
+        "ema_signal": signal_line[:, -1].copy(),
+        "avg_gain": gains[:, -1],
+        "avg_loss": losses[:, -1],
+        "atr": atr_values[:, -1].copy(),
+        "window": close[:, -_WINDOW:].copy(),
+    }
+    for name, warmup in WARMUP_BARS.items():
+        values[name][counts < warmup] = np.nan
+    return values, state
+
+
+def compute_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+    """Every indicator in INDICATOR_NAMES as a (symbols, bars) array, NaN until warmed up"""
+    values, _ = _compute(high, low, close)
+    return values
+
+
+# -- Incremental state ---------------------------------------------------------
+
+class IndicatorState:
+    """O(1)-per-bar indicator state for one symbol and timeframe"""
+    __slots__ = (
+        "count", "prev_close", "ema_fast", "ema_slow", "ema_signal",
+        "avg_gain", "avg_loss", "atr", "window", "sum20", "sumsq20", "sum50",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.prev_close = self.ema_fast = self.ema_slow = self.ema_signal = float("nan")
+        self.avg_gain = self.avg_loss = self.atr = float("nan")
+        self.window = array("d", [0.0] * _WINDOW)  # ring buffer of recent closes
+        self.sum20 = self.sumsq20 = self.sum50 = 0.0
+
+    @classmethod
+    def from_batch(cls, state: Dict[str, np.ndarray], row: int) -> "IndicatorState":
+        """Continue from the last bar of a batch computation"""
+        self = cls()
+        self.count = int(state["count"][row])
+        for name in ("ema_fast", "ema_slow", "ema_signal", "avg_gain", "avg_loss", "atr"):
+            setattr(self, name, float(state[name][row]))
+        closes = state["window"][row]
+        closes = closes[~np.isnan(closes)]
+        if len(closes):
+            self.prev_close = float(closes[-1])
+        # Lay the closes out in the ring as if they had arrived one by one
+        for i, value in enumerate(closes.tolist(), start=self.count - len(closes)):
+            self.window[i % _WINDOW] = value
+        last20 = closes[-BB_PERIOD:]
+        self.sum20 = float(last20.sum())
+        self.sumsq20 = float((last20 * last20).sum())
+        self.sum50 = float(closes[-50:].sum())
+        return self
+
+    def update(self, high: float, low: float, close: float) -> Dict[str, float]:
+        """Apply one closed bar and return the indicators that are warmed up"""
+        prev_close = self.prev_close
+        first = self.count == 0
+
+        # Rolling window sums: drop the close that falls out of each window
+        slot = self.count % _WINDOW
+        if self.count >= BB_PERIOD:
+            leaving = self.window[(self.count - BB_PERIOD) % _WINDOW]
+            self.sum20 -= leaving
+            self.sumsq20 -= leaving * leaving
+        if self.count >= 50:
+            self.sum50 -= self.window[(self.count - 50) % _WINDOW]
+        self.window[slot] = close
+        self.sum20 += close
+        self.sumsq20 += close * close
+        self.sum50 += close
+        self.count += 1
+
+        if first:
+            self.ema_fast = self.ema_slow = close
+            self.ema_signal = 0.0
+            self.atr = high - low
+        else:
+            self.ema_fast += 2.0 / (EMA_FAST + 1) * (close - self.ema_fast)
+            self.ema_slow += 2.0 / (EMA_SLOW + 1) * (close - self.ema_slow)
+            self.ema_signal += 2.0 / (MACD_SIGNAL_PERIOD + 1) * ((self.ema_fast - self.ema_slow) - self.ema_signal)
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            self.atr += (true_range - self.atr) / ATR_PERIOD
+            change = close - prev_close
+            gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+            if self.avg_gain != self.avg_gain:  # NaN: first price change
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += (gain - self.avg_gain) / RSI_PERIOD
+                self.avg_loss += (loss - self.avg_loss) / RSI_PERIOD
+        self.prev_close = close
+        return self.values()
+
+    def values(self) -> Dict[str, float]:
+        """Indicator values as of the last bar, limited to those that are warmed up"""
+        n = self.count
+        values = {"EMA_12": self.ema_fast} if n >= EMA_FAST else {}
+        if n >= EMA_SLOW:
+            macd_line = self.ema_fast - self.ema_slow
+            values["EMA_26"] = self.ema_slow
+            values["MACD"] = macd_line
+            if n >= WARMUP_BARS["MACD_SIGNAL"]:
+                values["MACD_SIGNAL"] = self.ema_signal
+                values["MACD_HIST"] = macd_line - self.ema_signal
+        if n >= BB_PERIOD:
+            middle = self.sum20 / BB_PERIOD
+            std = max(self.sumsq20 / BB_PERIOD - middle * middle, 0.0) ** 0.5
+            values["SMA_20"] = middle
+            values["BB_UPPER"] = middle + BB_STDDEV * std
+            values["BB_LOWER"] = middle - BB_STDDEV * std
+        if n >= 50:
+            values["SMA_50"] = self.sum50 / 50
+        if n >= RSI_PERIOD + 1:
+            if self.avg_loss == 0:
+                values["RSI_14"] = 50.0 if self.avg_gain == 0 else 100.0
+            else:
+                values["RSI_14"] = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        if n >= ATR_PERIOD:
+            values["ATR_14"] = self.atr
+        return values
+
+
+# -- Engine --------------------------------------------------------------------
+
+def load_bar_matrix(conn, timeframe: str, lookback: int = INDICATOR_LOOKBACK_BARS,
+                    symbols: Optional[List[str]] = None, until: Optional[datetime] = None):
+    """
+    Load the latest `lookback` bars (before `until`, if given) of every symbol in one
+    query and lay them out as right-aligned (symbols, bars) arrays. Returns
+    (symbols, timestamps_ms, high, low, close).
+    """
+    # Prices come back as floats rather than Decimals, which is most of the fetch cost
+    ranked = select(
+        MarketBar.symbol, MarketBar.timestamp,
+        cast(MarketBar.high, Float).label("high"),
+        cast(MarketBar.low, Float).label("low"),
+        cast(MarketBar.close, Float).label("close"),
+        func.row_number().over(
+            partition_by=MarketBar.symbol, order_by=MarketBar.timestamp.desc()
+        ).label("rn")
+    ).where(MarketBar.timeframe == timeframe)
+    if symbols:
+        ranked = ranked.where(MarketBar.symbol.in_(symbols))
+    if until is not None:
+        ranked = ranked.where(MarketBar.timestamp < until)
+    ranked = ranked.subquery()
+    rows = conn.execute(
+        select(ranked.c.symbol, ranked.c.timestamp, ranked.c.high, ranked.c.low, ranked.c.close)
+        .where(ranked.c.rn <= lookback)
+        .order_by(ranked.c.symbol, ranked.c.timestamp)
+    ).all()
+    return rows_to_matrix(rows, price_columns=3)
+
+
+def rows_to_matrix(rows, price_columns: int) -> tuple:
+    """
+    Lay out (symbol, timestamp, *prices) rows, grouped by symbol in time order, as
+    (symbols, bars) arrays right-aligned on each symbol's latest bar and padded
+    with NaN. Returns (symbols, timestamps_ms, *price_matrices).
+    """
+    if not rows:
+        return ([], np.empty((0, 0), dtype=np.int64)) + tuple(np.empty((0, 0)) for _ in range(price_columns))
+
+    symbol_column, ts_column, *prices = zip(*rows)
+    names, codes, counts = np.unique(np.array(symbol_column), return_inverse=True, return_counts=True)
+    width = int(counts.max())
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    # Position of each row within its symbol, independent of how the database collates symbols
+    order = np.argsort(codes, kind="stable")
+    positions = np.empty(len(rows), dtype=np.int64)
+    positions[order] = np.arange(len(rows)) - starts[codes[order]]
+    columns = positions + (width - counts[codes])
+
+    def matrix(values, dtype=float, fill=np.nan):
+        out = np.full((len(names), width), fill, dtype=dtype)
+        out[codes, columns] = np.asarray(values, dtype=dtype)
+        return out
+
+    # Bars are aligned to period boundaries, so only a few distinct timestamps need converting
+    epoch_ms = {
+        ts: int(ts.replace(tzinfo=ts.tzinfo or timezone.utc).timestamp() * 1000)
+        for ts in set(ts_column)
+    }
+    timestamps = matrix([epoch_ms[ts] for ts in ts_column], dtype=np.int64, fill=0)
+    return (names.tolist(), timestamps) + tuple(matrix(column) for column in prices)
+
+
+class IndicatorEngine:
+    """
+    Keeps incremental indicator state per (symbol, timeframe), fed by closed
+    bars from the aggregator, and recomputes the universe in batch on demand.
+    """
+
+    def __init__(self, writer: Optional[BulkInsertWriter] = None, bind=None):
+        self.writer = writer
+        self.bind = bind if bind is not None else default_engine
+        self.listeners: List[IndicatorListener] = []
+        self._states: Dict[Tuple[str, str], IndicatorState] = {}
+        # Series that missed a bar and must be rebuilt from stored bars
+        self._stale: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._seed_thread: Optional[threading.Thread] = None
+
+        # Stats
+        self.bars_processed = 0
+        self.rows_emitted = 0
+        self.bars_missed = 0
+        self.resyncs = 0
+        self.last_batch: Dict[str, Any] = {}
+
+    def add_listener(self, listener: IndicatorListener):
+        """Called with (symbol, timeframe, bar, values) whenever a closed bar updates indicators"""
+        self.listeners.append(listener)
+
+    def mark_stale(self, symbol: str, timeframe: str, bar: Optional[Dict[str, Any]] = None):
+        """A bar of this series was lost upstream; its state is rebuilt before the next bar"""
+        with self._lock:
+            self._stale.add((symbol, timeframe))
+            self.bars_missed += 1
+
+    def resync(self, symbol: str, timeframe: str, until: Optional[datetime] = None,
+               lookback: int = INDICATOR_LOOKBACK_BARS):
+        """Rebuild one series' incremental state from its stored bars before `until`"""
+        with self.bind.connect() as conn:
+            names, _, high, low, close = load_bar_matrix(conn, timeframe, lookback, [symbol], until)
+        state = IndicatorState.from_batch(_compute(high, low, close)[1], 0) if names else IndicatorState()
+        with self._lock:
+            self._states[(symbol, timeframe)] = state
+            self.resyncs += 1
+
+    def on_bar(self, symbol: str, timeframe: str, bar: Dict[str, Any]):
+        """Bar aggregator listener: update state and queue the new indicator values"""
+        if (symbol, timeframe) in self._stale:
+            with self._lock:
+                self._stale.discard((symbol, timeframe))
+            try:
+                self.resync(symbol, timeframe, until=bar["timestamp"])
+            except Exception as e:
+                logger.error(f"Failed to resync {symbol} {timeframe} indicators: {e}")
+        with self._lock:
+            state = self._states.get((symbol, timeframe))
+            if state is None:
+                state = self._states[(symbol, timeframe)] = IndicatorState()
+            values = state.update(float(bar["high"]), float(bar["low"]), float(bar["close"]))
+            self.bars_processed += 1
+        if values and self.writer is not None:
+            rows = [
+                {"symbol": symbol, "indicator_name": name, "value": value,
+                 "timeframe": timeframe, "timestamp": bar["timestamp"]}
+                for name, value in values.items()
+            ]
+            self.rows_emitted += self.writer.submit_many(rows)
+        if values:
+            for listener in self.listeners:
+                try:
+                    listener(symbol, timeframe, bar, values)
+                except Exception as e:
+                    logger.error(f"Indicator listener failed: {e}")
+
+    def latest(self, symbol: str, timeframe: str) -> Dict[str, float]:
+        """Current indicator values from the incremental state"""
+        with self._lock:
+            state = self._states.get((symbol, timeframe))
+            return state.values() if state is not None else {}
+
+    def recompute_universe(
+        self,
+        timeframe: str,
+        lookback: int = INDICATOR_LOOKBACK_BARS,
+        write_last: int = 1,
+        symbols: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Batch mode: recompute every symbol's indicators from market_bars in one
+        vectorized pass, replace the rows for the last `write_last` bars, and
+        reseed the incremental state. `write_last=0` only reseeds.
+        """
+        started = time.perf_counter()
+        with self.bind.connect() as conn:
+            names, timestamps, high, low, close = load_bar_matrix(conn, timeframe, lookback, symbols)
+        loaded = time.perf_counter()
+        if not names:
+            self.last_batch = {"timeframe": timeframe, "symbols": 0, "rows_written": 0}
+            return self.last_batch
+
+        values, state = _compute(high, low, close)
+        computed = time.perf_counter()
+
+        rows = []
+        if write_last > 0:
+            tail = slice(-write_last, None)
+            tail_ts = timestamps[:, tail]
+            for name in INDICATOR_NAMES:
+                tail_values = values[name][:, tail]
+                row_index, column_index = np.nonzero(~np.isnan(tail_values))
+                rows.extend(
+                    {"symbol": names[r], "indicator_name": name, "value": v, "timeframe": timeframe,
+                     "timestamp": datetime.fromtimestamp(ts / 1000, tz=timezone.utc)}
+                    for r, v, ts in zip(
+                        row_index.tolist(),
+                        tail_values[row_index, column_index].tolist(),
+                        tail_ts[row_index, column_index].tolist()
+                    )
+                )
+            if rows:
+                # Replace each symbol's rows from its own first rewritten bar onwards
+                cutoffs: Dict[int, List[str]] = {}
+                for symbol, row_ts in zip(names, tail_ts.tolist()):
+                    valid = [ts for ts in row_ts if ts > 0]
+                    if valid:
+                        cutoffs.setdefault(min(valid), []).append(symbol)
+                table = TechnicalIndicator.__table__
+                with self.bind.begin() as conn:
+                    for cutoff_ms, cutoff_symbols in cutoffs.items():
+                        cutoff = datetime.fromtimestamp(cutoff_ms / 1000, tz=timezone.utc)
+                        for i in range(0, len(cutoff_symbols), INDICATOR_INSERT_CHUNK):
+                            conn.execute(delete(table).where(
+                                table.c.timeframe == timeframe,
+                                table.c.timestamp >= cutoff,
+                                table.c.symbol.in_(cutoff_symbols[i:i + INDICATOR_INSERT_CHUNK])
+                            ))
+                    for i in range(0, len(rows), INDICATOR_INSERT_CHUNK):
+                        conn.execute(insert(table), rows[i:i + INDICATOR_INSERT_CHUNK])
+        written = time.perf_counter()
+
+        with self._lock:
+            for row, symbol in enumerate(names):
+                self._states[(symbol, timeframe)] = IndicatorState.from_batch(state, row)
+
+        self.last_batch = {
+            "timeframe": timeframe,
+            "symbols": len(names),
+            "bars": int(np.count_nonzero(~np.isnan(close))),
+            "rows_written": len(rows),
+            "load_ms": round((loaded - started) * 1000, 3),
+            "compute_ms": round((computed - loaded) * 1000, 3),
+            "write_ms": round((written - computed) * 1000, 3),
+        }
+        logger.info(f"📈 Recomputed {timeframe} indicators: {self.last_batch}")
+        return self.last_batch
+
+    def start(self, timeframes: List[str]):
+        """Seed incremental state from stored bars in the background"""
+        if self.writer is not None:
+            self.writer.start()
+        if self._seed_thread and self._seed_thread.is_alive():
+            return
+
+        def seed():
+            for timeframe in timeframes:
+                try:
+                    self.recompute_universe(timeframe, write_last=0)
+                except Exception as e:
+                    logger.error(f"Failed to seed {timeframe} indicators: {e}")
+
+        self._seed_thread = threading.Thread(target=seed, name="indicator-seed", daemon=True)
+        self._seed_thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "states": len(self._states),
+            "bars_processed": self.bars_processed,
+            "rows_emitted": self.rows_emitted,
+            "bars_missed": self.bars_missed,
+            "resyncs": self.resyncs,
+            "stale": len(self._stale),
+            "last_batch": self.last_batch,
+        }
+
+
+# Global engine fed by the bar aggregator; rows go to `technical_indicators`
+indicator_writer = BulkInsertWriter(TechnicalIndicator.__table__)
+indicator_engine = IndicatorEngine(writer=indicator_writer)
+# Closed bars reach the engine (and the strategies behind it) through a bounded
+# buffer that never blocks the streamer thread: when a slow strategy lets it
+# fill, the oldest bars are dropped and their series are rebuilt from
+# market_bars before the next bar is applied
+indicator_feed = BufferedConsumer(
+    "indicators", indicator_engine.on_bar, policy=DROP_OLDEST,
+    key=lambda symbol, timeframe, bar: (symbol, timeframe), on_drop=indicator_engine.mark_stale
+)
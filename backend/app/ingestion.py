@@ -0,0 +1,242 @@
+"""
+Batched, queue-backed database writer for the streaming ingestion path
+"""
+
+import os
+import logging
+import threading
+import time
+from typing import Dict, List, Any, Optional, Sequence
+
+from sqlalchemy import Table, insert, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from dotenv import load_dotenv
+
+from app.backpressure import BoundedBuffer, buffer_settings
+from app.database import engine
+from app.metrics import INGEST_FLUSH_SECONDS
+from app.models import MarketData
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "50000"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "0.5"))
+# Overflow policy of every writer's queue (see app.backpressure), overridable per table
+INGEST_QUEUE_POLICY = os.getenv("INGEST_QUEUE_POLICY", "drop_oldest")
+
+
+def _conflation_key(row: Dict[str, Any]) -> tuple:
+    """Rows that supersede each other under the conflate policy: same series, newest wins"""
+    return row.get("symbol"), row.get("timeframe"), row.get("indicator_name")
+
+
+class BulkInsertWriter:
+    """
+    Bounded in-memory queue of rows for a single table, flushed by a background
+    thread in multi-row INSERT batches whenever the batch fills up or the flush
+    interval elapses, whichever comes first. When the database falls behind,
+    the queue's backpressure policy decides which rows are dropped
+    (`<TABLE>_BUFFER_POLICY`, default INGEST_QUEUE_POLICY).
+
+    With `conflict_columns` the INSERT skips rows that already exist
+    (ON CONFLICT DO NOTHING), so replaying the same data is idempotent. This
+    needs a unique index on those columns; without one the writer logs a
+    warning and inserts plainly.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        max_queue_size: int = INGEST_QUEUE_SIZE,
+        batch_size: int = INGEST_BATCH_SIZE,
+        flush_interval: float = INGEST_FLUSH_INTERVAL,
+        bind=None,
+        policy: str = INGEST_QUEUE_POLICY,
+        conflict_columns: Optional[Sequence[str]] = None
+    ):
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.bind = bind if bind is not None else engine
+        self.conflict_columns = tuple(conflict_columns) if conflict_columns else ()
+        self._statement = None
+        policy, max_queue_size = buffer_settings(table.name, policy, max_queue_size)
+        self._queue = BoundedBuffer(table.name, max_queue_size, policy)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._flush_seconds = INGEST_FLUSH_SECONDS.labels(table.name)
+
+        # Stats
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches_written = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background flusher (no-op if already running)"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop_event.clear()
+            self._queue.reopen()
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"bulk-writer-{self.table.name}",
+                daemon=True
+            )
+            self._thread.start()
+            logger.info(f"🚚 Started bulk writer for '{self.table.name}'")
+
+    def stop(self, timeout: Optional[float] = 30.0):
+        """Stop the flusher after draining every queued row to the database"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stop_event.set()
+            # Wakes the flusher, which then drains without waiting
+            self._queue.close()
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(
+                    f"Bulk writer for '{self.table.name}' did not drain within {timeout}s "
+                    f"({len(self._queue)} rows still queued)"
+                )
+            else:
+                logger.info(f"⏹️ Stopped bulk writer for '{self.table.name}'")
+            self._thread = None
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """Queue a single row; returns False if it was rejected by the queue's policy"""
+        dropped = self._queue.dropped
+        accepted = self._queue.put(row, _conflation_key(row))
+        if self._queue.dropped != dropped and self._queue.dropped % 1000 == 1:
+            logger.warning(
+                f"Ingestion queue for '{self.table.name}' is full ({self._queue.policy}), "
+                f"{self._queue.dropped} rows dropped so far"
+            )
+        return accepted
+
+    def submit_many(self, rows: List[Dict[str, Any]]) -> int:
+        """Queue several rows; returns how many were accepted"""
+        accepted = 0
+        for row in rows:
+            if self.submit(row):
+                accepted += 1
+        return accepted
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        """Block until a full batch is available or the flush interval elapses"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._stop_event.is_set():
+                # Draining: take whatever is left without waiting
+                taken = self._queue.get_batch(self.batch_size - len(batch), timeout=0)
+                if not taken:
+                    break
+                batch.extend(taken)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            batch.extend(self._queue.get_batch(self.batch_size - len(batch), timeout=remaining))
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self.flush(batch)
+            elif self._stop_event.is_set():
+                break
+
+    def _has_unique_key(self) -> bool:
+        try:
+            inspector = inspect(self.bind)
+            keys = [set(ix["column_names"]) for ix in inspector.get_indexes(self.table.name) if ix.get("unique")]
+            keys += [set(uc["column_names"]) for uc in inspector.get_unique_constraints(self.table.name)]
+        except Exception as e:
+            logger.warning(f"Could not inspect unique keys of '{self.table.name}': {e}")
+            return False
+        return set(self.conflict_columns) in keys
+
+    def _insert_statement(self):
+        """INSERT, or INSERT ... ON CONFLICT DO NOTHING when the table has the unique key for it"""
+        if self._statement is not None:
+            return self._statement
+        statement = insert(self.table)
+        if self.conflict_columns:
+            dialect = self.bind.dialect.name
+            if dialect in ("postgresql", "sqlite") and self._has_unique_key():
+                module = postgresql if dialect == "postgresql" else sqlite
+                statement = module.insert(self.table).on_conflict_do_nothing(
+                    index_elements=list(self.conflict_columns)
+                )
+            else:
+                logger.warning(
+                    f"⚠️ '{self.table.name}' has no unique index on ({', '.join(self.conflict_columns)}); "
+                    f"duplicate rows will not be skipped (apply database/migrations/002_unique_ticks_and_bars.sql)"
+                )
+        self._statement = statement
+        return statement
+
+    def flush(self, batch: List[Dict[str, Any]]):
+        """Write a batch with a single multi-row INSERT"""
+        started = time.perf_counter()
+        try:
+            statement = self._insert_statement()
+            with self.bind.begin() as conn:
+                conn.execute(statement, batch)
+        except Exception as e:
+            self.rows_failed += len(batch)
+            logger.error(f"Error flushing {len(batch)} rows to '{self.table.name}': {e}")
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._flush_seconds.observe(elapsed_ms / 1000)
+        self.rows_written += len(batch)
+        self.batches_written += 1
+        self.last_batch_size = len(batch)
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch size and flush latency for monitoring"""
+        batches = self.batches_written
+        return {
+            "table": self.table.name,
+            "running": self.is_running,
+            "queue_depth": len(self._queue),
+            "max_queue_size": self._queue.capacity,
+            "queue_policy": self._queue.policy,
+            "batch_size_limit": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "rows_written": self.rows_written,
+            "rows_dropped": self._queue.dropped,
+            "rows_conflated": self._queue.conflated,
+            "rows_failed": self.rows_failed,
+            "batches_written": batches,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": (self.rows_written / batches) if batches else 0.0,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / batches, 3) if batches else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+
+# Global writer for streamed market data
+market_data_writer = BulkInsertWriter(MarketData.__table__, conflict_columns=("symbol", "timestamp"))
@@ -1,12 +1,16 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
 from dotenv import load_dotenv
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 import time
+from contextlib import asynccontextmanager
+
+from app.metrics import MetricsMiddleware, registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.profiling import RequestProfilerMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -15,11 +19,22 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources and start background workers; drain and close them on exit"""
+    await startup_event()
+    try:
+        yield
+    finally:
+        await shutdown_event()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="FInsightAI Trading Agent",
     description="Autonomous trading agent with real-time market analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -29,31 +44,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Profile-Id"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestProfilerMiddleware)
 
-# Database connection
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://christian@localhost:5432/finsight")
-
-try:
-    engine = create_engine(DATABASE_URL)
-    logger.info("Database engine created successfully")
-except Exception as e:
-    logger.error(f"Failed to create database engine: {e}")
-    engine = None
+# A shard with no message for this long is reported as stale by /health
+STREAM_STALE_SECONDS = float(os.getenv("STREAM_STALE_SECONDS", "30"))
 
 
 # Import routers
 from app.api.portfolio import router as portfolio_router
 from app.api.market import router as market_router
 from app.api.auth import router as auth_router
+from app.api.strategies import router as strategies_router
+from app.api.admin import router as admin_router
 app.include_router(portfolio_router)
 app.include_router(market_router)
 app.include_router(auth_router)
+app.include_router(strategies_router)
+app.include_router(admin_router)
 
 
-@app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
+    from app.resources import resources
+    await resources.startup()
+
     try:
         from app.database import create_tables
         create_tables()
@@ -61,6 +78,80 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to create database tables: {e}")
 
+    try:
+        from app.database import SessionLocal
+        from app.portfolio_snapshot import ensure_default_portfolio
+        db = SessionLocal()
+        try:
+            ensure_default_portfolio(db)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"Failed to create default portfolio: {e}")
+
+    from app.ingestion import market_data_writer
+    from app.bars import bar_aggregator
+    from app.indicators import indicator_engine, indicator_feed
+    from app.screener import screener
+    from app.signals import signal_engine, signal_writer
+    from app.partitioning import partition_maintenance
+    from app.mark_to_market import mark_to_market
+    from app.stream_hub import stream_hub
+    market_data_writer.start()
+    stream_hub.start()
+    indicator_feed.start()
+    bar_aggregator.add_listener(indicator_feed)
+    bar_aggregator.add_listener(screener.on_bar)
+    indicator_engine.add_listener(signal_engine.on_indicators)
+    signal_writer.start()
+    try:
+        signal_engine.reload()
+    except Exception as e:
+        logger.error(f"Failed to load strategies: {e}")
+    bar_aggregator.start()
+    indicator_engine.start(bar_aggregator.timeframes)
+    partition_maintenance.start()
+    mark_to_market.start()
+
+
+async def shutdown_event():
+    """Stop streaming and drain queued market data before exit"""
+    from app.schwab_api import schwab_service
+    from app.schwab_async import schwab_async, shutdown_executor
+    from app.stream_subscriptions import subscription_manager
+    from app.tick_journal import tick_journal, journal_replayer
+    from app.ingestion import market_data_writer
+    from app.bars import bar_aggregator, market_bar_writer
+    from app.indicators import indicator_feed, indicator_writer
+    from app.screener import screener
+    from app.signals import signal_writer
+    from app.mark_to_market import mark_to_market
+    await mark_to_market.stop()
+    from app.stream_hub import stream_hub
+    stream_hub.stop()
+    if schwab_service:
+        try:
+            await schwab_async.call(subscription_manager.stop)
+        except Exception as e:
+            logger.error(f"Failed to stop market stream: {e}")
+    journal_replayer.stop()
+    tick_journal.close()
+    shutdown_executor()
+    screener.shutdown()
+    bar_aggregator.stop()
+    market_bar_writer.stop()
+    indicator_feed.stop()
+    indicator_writer.stop()
+    signal_writer.stop()
+    market_data_writer.stop()
+
+    from app.partitioning import partition_maintenance
+    partition_maintenance.stop()
+
+    # Last: the writers above flush through the shared pool
+    from app.resources import resources
+    resources.shutdown()
+
 
 @app.get("/")
 async def root():
@@ -73,6 +164,38 @@ async def root():
     }
 
 
+def _trading_engine_status() -> str:
+    """running / idle (no strategies loaded) / stopped (bar consumer not running)"""
+    from app.indicators import indicator_feed
+    from app.signals import signal_engine
+    if not indicator_feed.is_running:
+        return "stopped"
+    return "running" if signal_engine.stats()["strategies"] else "idle"
+
+
+def _market_data_status() -> str:
+    """not_configured / not_initialized / connected / streaming / stale"""
+    from app.schwab_api import schwab_service
+    from app.stream_subscriptions import subscription_manager
+    if not schwab_service or not schwab_service.is_configured():
+        return "not_configured"
+    if not schwab_service.client:
+        return "not_initialized"
+    shards = [shard for shard in subscription_manager.shards if shard.size]
+    if not shards:
+        return "connected"
+    now = time.monotonic()
+    if any(shard.last_message and now - shard.last_message <= STREAM_STALE_SECONDS for shard in shards):
+        return "streaming"
+    return "stale"
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request, upstream, stream, pool and buffer instrumentation"""
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     """Comprehensive health check endpoint"""
@@ -82,10 +205,12 @@ async def health_check():
         "services": {}
     }
     
+    from app.resources import resources
+    
     # Check database connection
     try:
-        if engine:
-            with engine.connect() as conn:
+        if not resources.closed:
+            with resources.engine.connect() as conn:
                 result = conn.execute(text("SELECT 1"))
                 health_status["services"]["database"] = "connected"
         else:
@@ -98,9 +223,14 @@ async def health_check():
         health_status["services"]["database"] = f"unknown error: {str(e)}"
         health_status["status"] = "unhealthy"
     
-    # Add other service checks here later
-    health_status["services"]["trading_engine"] = "not_implemented"
-    health_status["services"]["market_data"] = "not_implemented"
+    health_status["services"]["trading_engine"] = _trading_engine_status()
+    health_status["services"]["market_data"] = _market_data_status()
+    if health_status["status"] == "healthy" and (
+        health_status["services"]["trading_engine"] == "stopped"
+        or health_status["services"]["market_data"] == "stale"
+    ):
+        health_status["status"] = "degraded"
+    health_status["resources"] = resources.stats()
     
     if health_status["status"] == "unhealthy":
         raise HTTPException(status_code=503, detail=health_status)
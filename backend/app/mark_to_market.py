@@ -0,0 +1,290 @@
+"""
+Mark-to-market of open positions from the latest quotes
+
+Each pass prices every held symbol from the quote cache (kept current by the
+stream), fetches whatever is missing or too old in one batch, then revalues
+all positions with one set-based UPDATE joined to the quotes by symbol and
+rolls the totals up into `portfolios` with a second UPDATE, in the same
+transaction. No `Position` objects are loaded.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import String, Numeric, case, column, func, literal, select, update, values
+from sqlalchemy.engine import Engine
+
+from app.database import engine as default_engine
+from app.market_hours import is_market_open
+from app.models import Portfolio, Position
+from app.quote_cache import quote_cache
+from app.portfolio_snapshot import portfolio_snapshot
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MARK_TO_MARKET_INTERVAL = float(os.getenv("MARK_TO_MARKET_INTERVAL", "5"))
+# Run outside regular US equity hours as well (futures, testing)
+MARK_TO_MARKET_ALWAYS = os.getenv("MARK_TO_MARKET_ALWAYS", "false").lower() == "true"
+# Cached/streamed quotes older than this are refetched
+MARK_TO_MARKET_QUOTE_MAX_AGE = float(os.getenv("MARK_TO_MARKET_QUOTE_MAX_AGE", "60"))
+# Quotes joined in one statement on PostgreSQL (3 bind parameters each, limit 65535)
+MARK_TO_MARKET_MAX_SYMBOLS = 20000
+# Symbols per CASE-based UPDATE on other databases
+MARK_TO_MARKET_CASE_CHUNK = 100
+
+# symbol -> (last price, net change since the previous close)
+PriceMap = Dict[str, Tuple[float, Optional[float]]]
+
+
+def quote_price(quote: Dict[str, Any]) -> Optional[Tuple[float, Optional[float]]]:
+    """(last price, net change) from a REST or stream-merged quote"""
+    block = quote.get("quote") or {}
+    price = block.get("lastPrice") or block.get("mark")
+    if not price:
+        return None
+    change = block.get("netChange")
+    return float(price), float(change) if change is not None else None
+
+
+def held_symbols(conn) -> List[str]:
+    return list(conn.execute(
+        select(Position.symbol).where(Position.shares != 0).distinct()
+    ).scalars())
+
+
+def _revalue_join(conn, prices: PriceMap, symbols: List[str]) -> Tuple[int, Any]:
+    """PostgreSQL: UPDATE ... FROM (VALUES ...) joins each position to its quote"""
+    quotes = values(
+        column("symbol", String), column("price", Numeric), column("change", Numeric), name="quotes"
+    ).data([(s, prices[s][0], prices[s][1] or 0.0) for s in symbols])
+    positions = conn.execute(
+        update(Position)
+        .where(Position.symbol == quotes.c.symbol)
+        .values(
+            current_price=quotes.c.price,
+            market_value=Position.shares * quotes.c.price,
+            unrealized_pnl=Position.shares * (quotes.c.price - Position.avg_cost),
+            updated_at=func.now(),
+        )
+    ).rowcount
+    daily = (
+        select(func.coalesce(func.sum(Position.shares * quotes.c.change), 0))
+        .where(Position.portfolio_id == Portfolio.id, Position.symbol == quotes.c.symbol)
+        .scalar_subquery()
+    )
+    return positions, daily
+
+
+def _revalue_case(conn, prices: PriceMap, symbols: List[str]) -> Tuple[int, Any]:
+    """Portable fallback: CASE on symbol, in small chunks since each row scans the CASE"""
+    positions = 0
+    for i in range(0, len(symbols), MARK_TO_MARKET_CASE_CHUNK):
+        chunk = symbols[i:i + MARK_TO_MARKET_CASE_CHUNK]
+        price = case({s: prices[s][0] for s in chunk}, value=Position.symbol)
+        positions += conn.execute(
+            update(Position)
+            .where(Position.symbol.in_(chunk))
+            .values(
+                current_price=price,
+                market_value=Position.shares * price,
+                unrealized_pnl=Position.shares * (price - Position.avg_cost),
+                updated_at=func.now(),
+            )
+        ).rowcount
+    changes = {s: prices[s][1] for s in symbols if prices[s][1] is not None}
+    daily = literal(0.0)
+    if changes:
+        daily = Position.shares * case(changes, value=Position.symbol, else_=literal(0.0))
+    daily = (
+        select(func.coalesce(func.sum(daily), 0))
+        .where(Position.portfolio_id == Portfolio.id)
+        .scalar_subquery()
+    )
+    return positions, daily
+
+
+def revalue(conn, prices: PriceMap) -> Tuple[int, int]:
+    """
+    Revalue positions in `prices` and refresh the totals of the portfolios
+    holding them. Returns (positions updated, portfolios updated).
+
+    total_pnl is the unrealized P&L of open positions; daily_pnl is
+    shares x net change since the previous close. It is a sum over every open
+    position, so a portfolio keeps its last daily_pnl while any of its held
+    symbols has no net change in `prices`.
+    """
+    if not prices:
+        return 0, 0
+    symbols = sorted(prices)
+    changed = {s for s, (_, change) in prices.items() if change is not None}
+    held = conn.execute(select(Position.portfolio_id, Position.symbol).where(Position.shares != 0).distinct())
+    incomplete = {portfolio_id for portfolio_id, symbol in held if symbol not in changed}
+    if conn.dialect.name == "postgresql" and len(symbols) <= MARK_TO_MARKET_MAX_SYMBOLS:
+        positions, daily_pnl = _revalue_join(conn, prices, symbols)
+    else:
+        positions, daily_pnl = _revalue_case(conn, prices, symbols)
+
+    if incomplete:
+        daily_pnl = case((Portfolio.id.in_(incomplete), Portfolio.daily_pnl), else_=daily_pnl)
+
+    owned = Position.portfolio_id == Portfolio.id
+    invested = select(func.coalesce(func.sum(Position.market_value), 0)).where(owned).scalar_subquery()
+    unrealized = select(func.coalesce(func.sum(Position.unrealized_pnl), 0)).where(owned).scalar_subquery()
+    portfolios = conn.execute(
+        update(Portfolio)
+        .where(Portfolio.id.in_(
+            select(Position.portfolio_id).where(Position.symbol.in_(symbols)).distinct()
+        ))
+        .values(
+            invested_value=invested,
+            total_value=Portfolio.cash_balance + invested,
+            total_pnl=unrealized,
+            daily_pnl=daily_pnl,
+            updated_at=func.now(),
+        )
+    ).rowcount
+    return positions, portfolios
+
+
+class MarkToMarket:
+    """
+    Periodic revaluation task on the event loop. Quote lookups go through the
+    shared cache; the UPDATEs run in a worker thread.
+    """
+
+    def __init__(self, engine: Engine, interval: float = MARK_TO_MARKET_INTERVAL,
+                 always: bool = MARK_TO_MARKET_ALWAYS):
+        self.engine = engine
+        self.interval = interval
+        self.always = always
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Stats
+        self.passes = 0
+        self.skipped_closed = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_pass: Dict[str, Any] = {}
+
+    async def _prices(self, symbols: List[str]) -> Tuple[PriceMap, int, int]:
+        """Prices from the cache, one upstream batch for the rest. Returns (prices, cached, fetched)"""
+        from app.schwab_async import schwab_async
+
+        prices: PriceMap = {}
+        missing = []
+        now = time.monotonic()
+        for symbol in symbols:
+            quote = quote_cache.get_recent(symbol, MARK_TO_MARKET_QUOTE_MAX_AGE, now)
+            priced = quote_price(quote) if quote is not None else None
+            if priced is None:
+                missing.append(symbol)
+            else:
+                prices[symbol] = priced
+        cached = len(prices)
+        if missing and await schwab_async.ensure_client():
+            quotes = await quote_cache.get_quotes(missing, schwab_async.get_quotes_chunked)
+            quotes.pop("errors", None)
+            for symbol, quote in quotes.items():
+                priced = quote_price(quote)
+                if priced is not None:
+                    prices[symbol] = priced
+        return prices, cached, len(prices) - cached
+
+    def _revalue(self, prices: PriceMap) -> Tuple[int, int]:
+        with self.engine.begin() as conn:
+            return revalue(conn, prices)
+
+    def _held_symbols(self) -> List[str]:
+        with self.engine.connect() as conn:
+            return held_symbols(conn)
+
+    async def run_once(self, prices: Optional[PriceMap] = None) -> Dict[str, Any]:
+        """One revaluation pass; `prices` overrides the quote lookup"""
+        async with self._lock:
+            started = time.perf_counter()
+            symbols = await asyncio.to_thread(self._held_symbols)
+            cached = fetched = 0
+            if prices is None:
+                prices, cached, fetched = await self._prices(symbols)
+            else:
+                held = set(symbols)
+                prices = {s: p for s, p in prices.items() if s in held}
+            priced = time.perf_counter()
+            positions, portfolios = await asyncio.to_thread(self._revalue, prices)
+            if positions:
+                portfolio_snapshot.invalidate(prices)
+            finished = time.perf_counter()
+
+            elapsed_ms = (finished - started) * 1000
+            self.passes += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.last_pass = {
+                "at": datetime.utcnow().isoformat(),
+                "symbols_held": len(symbols),
+                "symbols_priced": len(prices),
+                "from_cache": cached,
+                "fetched": fetched,
+                "unpriced": len(symbols) - len(prices),
+                "positions_updated": positions,
+                "portfolios_updated": portfolios,
+                "quote_ms": round((priced - started) * 1000, 3),
+                "update_ms": round((finished - priced) * 1000, 3),
+                "total_ms": round(elapsed_ms, 3),
+            }
+            return self.last_pass
+
+    async def _run(self):
+        while True:
+            if self.always or is_market_open():
+                try:
+                    await self.run_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Mark-to-market pass failed: {e}")
+            else:
+                self.skipped_closed += 1
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "market_open": is_market_open(),
+            "always": self.always,
+            "passes": self.passes,
+            "skipped_closed": self.skipped_closed,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.passes, 3) if self.passes else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "last_pass": self.last_pass,
+        }
+
+
+# Global revaluation task for the application engine
+mark_to_market = MarkToMarket(default_engine)
@@ -0,0 +1,30 @@
+"""
+US equity market calendar shared by the tick journal and mark-to-market
+
+Kept free of app imports so lightweight modules can use it without pulling
+in the database engine or quote cache.
+"""
+
+import logging
+from datetime import datetime, time as dt_time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo("America/New_York")
+except Exception:
+    MARKET_TZ = None
+    logger.warning("America/New_York time zone unavailable, falling back to UTC days and ignoring market hours")
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Regular US equity session, weekdays 09:30-16:00 New York time (holidays not modelled)"""
+    if MARKET_TZ is None:
+        return True
+    now = datetime.now(MARKET_TZ) if now is None else now.astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
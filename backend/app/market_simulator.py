@@ -0,0 +1,399 @@
+"""
+Local market simulator standing in for the Schwab API
+
+With MARKET_DATA_BACKEND=simulator, SchwabAPIService talks to a
+`SimulatedClient` instead of schwabdev: no credentials, tokens or network.
+The simulator serves `quotes`, `price_history`, `account_linked` and
+`account_numbers` responses shaped like Schwab's, and its streams emit
+LEVELONE_EQUITIES messages at SIMULATOR_STREAM_RATE messages per second
+(10 to 100k) built from a per-symbol random walk, or replayed from the tick
+journal when SIMULATOR_SOURCE=journal (SIMULATOR_JOURNAL_DAY, by default the
+latest day before today). Simulated streams are never journaled themselves.
+
+Latency (SIMULATOR_LATENCY_MS +- SIMULATOR_LATENCY_JITTER_MS), failed REST
+calls (SIMULATOR_ERROR_RATE, HTTP 500) and dropped stream connections
+(SIMULATOR_DISCONNECT_RATE, per second) can be injected to exercise the
+timeout, retry and reconnect paths.
+"""
+
+import os
+import json
+import math
+import time
+import random
+import logging
+import threading
+import zlib
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+from dotenv import load_dotenv
+
+from app.stream_decoder import orjson
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SIMULATOR_STREAM_RATE = float(os.getenv("SIMULATOR_STREAM_RATE", "100"))
+SIMULATOR_ITEMS_PER_MESSAGE = int(os.getenv("SIMULATOR_ITEMS_PER_MESSAGE", "10"))
+# "random" walk or "journal" replay of recorded frames
+SIMULATOR_SOURCE = os.getenv("SIMULATOR_SOURCE", "random")
+SIMULATOR_JOURNAL_DAY = os.getenv("SIMULATOR_JOURNAL_DAY") or None
+SIMULATOR_LATENCY_MS = float(os.getenv("SIMULATOR_LATENCY_MS", "0"))
+SIMULATOR_LATENCY_JITTER_MS = float(os.getenv("SIMULATOR_LATENCY_JITTER_MS", "0"))
+SIMULATOR_ERROR_RATE = float(os.getenv("SIMULATOR_ERROR_RATE", "0"))
+SIMULATOR_DISCONNECT_RATE = float(os.getenv("SIMULATOR_DISCONNECT_RATE", "0"))
+SIMULATOR_SEED = int(os.getenv("SIMULATOR_SEED", "7"))
+
+MIN_STREAM_RATE = 10.0
+MAX_STREAM_RATE = 100000.0
+# Longest backlog the emitter tries to catch up on after a stall
+_MAX_CATCH_UP_SECONDS = 1.0
+
+_MINUTE_MS = 60_000
+_PERIOD_DAYS = {"day": 1, "month": 31, "year": 366, "ytd": 366}
+_FREQUENCY_MS = {"minute": _MINUTE_MS, "daily": 86_400_000, "weekly": 7 * 86_400_000, "monthly": 31 * 86_400_000}
+_MAX_CANDLES = 50_000
+
+
+def _dumps(value: Any) -> str:
+    return orjson.dumps(value).decode() if orjson is not None else json.dumps(value, separators=(",", ":"))
+
+
+def _symbol_seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode())
+
+
+class SimulatedResponse:
+    """The subset of requests.Response the service uses"""
+
+    def __init__(self, status_code: int, payload: Any):
+        self.status_code = status_code
+        self._payload = payload
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return _dumps(self._payload)
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class SymbolState:
+    """Random-walk level-one state of one symbol"""
+    __slots__ = ("symbol", "close", "open", "last", "high", "low", "volume", "sent_full")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.close = round(20 + _symbol_seed(symbol) % 480 + 0.5, 2)
+        self.open = self.last = self.high = self.low = self.close
+        self.volume = 0
+        self.sent_full = False
+
+    def step(self, rng: random.Random) -> int:
+        """Move the price one tick; returns the traded size"""
+        self.last = round(max(0.01, self.last * (1 + rng.gauss(0, 0.0005))), 2)
+        if self.last > self.high:
+            self.high = self.last
+        elif self.last < self.low:
+            self.low = self.last
+        size = rng.randint(1, 5) * 100
+        self.volume += size
+        return size
+
+    def quote(self, now_ms: int) -> Dict[str, Any]:
+        change = round(self.last - self.close, 2)
+        return {
+            "lastPrice": self.last, "bidPrice": round(self.last - 0.01, 2), "askPrice": round(self.last + 0.01, 2),
+            "bidSize": 300, "askSize": 300, "mark": self.last,
+            "openPrice": self.open, "highPrice": self.high, "lowPrice": self.low, "closePrice": self.close,
+            "netChange": change, "netPercentChange": round(change / self.close * 100, 4),
+            "totalVolume": self.volume, "52WeekHigh": round(self.close * 1.3, 2),
+            "52WeekLow": round(self.close * 0.7, 2), "quoteTime": now_ms, "tradeTime": now_ms,
+        }
+
+
+class SimulatedMarket:
+    """Shared per-symbol state, so REST quotes and streamed ticks agree"""
+
+    def __init__(self, seed: int = SIMULATOR_SEED):
+        self._states: Dict[str, SymbolState] = {}
+        self._lock = threading.Lock()
+        self.rng = random.Random(seed)
+
+    def state(self, symbol: str) -> SymbolState:
+        state = self._states.get(symbol)
+        if state is None:
+            with self._lock:
+                state = self._states.setdefault(symbol, SymbolState(symbol))
+        return state
+
+    def item(self, symbol: str, now_ms: int) -> Dict[str, Any]:
+        """One LEVELONE_EQUITIES content item: a full snapshot first, then deltas"""
+        state = self.state(symbol)
+        size = state.step(self.rng)
+        item = {"key": symbol, "delayed": False, "assetMainType": "EQUITY",
+                "1": round(state.last - 0.01, 2), "2": round(state.last + 0.01, 2), "3": state.last,
+                "8": state.volume, "9": size, "35": now_ms}
+        if not state.sent_full:
+            state.sent_full = True
+            item.update({"10": state.high, "11": state.low, "12": state.close, "17": state.open,
+                         "18": round(state.last - state.close, 2)})
+        else:
+            item["18"] = round(state.last - state.close, 2)
+            if state.last >= state.high:
+                item["10"] = state.high
+            if state.last <= state.low:
+                item["11"] = state.low
+        return item
+
+    def candles(self, symbol: str, start_ms: int, end_ms: int, step_ms: int) -> List[Dict[str, Any]]:
+        """Deterministic bars, so repeated and overlapping requests agree"""
+        base = self.state(symbol).close
+        phase = _symbol_seed(symbol) % 1000
+        start_ms -= start_ms % step_ms
+        count = min(_MAX_CANDLES, max(0, (end_ms - start_ms) // step_ms + 1))
+        first = max(start_ms, end_ms - end_ms % step_ms - (count - 1) * step_ms)
+        candles = []
+        for i in range(count):
+            ts = first + i * step_ms
+            x = ts / step_ms + phase
+            close = base * (1 + 0.04 * math.sin(x / 390) + 0.01 * math.sin(x / 17))
+            open_ = base * (1 + 0.04 * math.sin((x - 1) / 390) + 0.01 * math.sin((x - 1) / 17))
+            spread = abs(close - open_) + base * 0.001
+            candles.append({
+                "open": round(open_, 2), "high": round(max(open_, close) + spread / 2, 2),
+                "low": round(min(open_, close) - spread / 2, 2), "close": round(close, 2),
+                "volume": 1000 + int(abs(math.sin(x)) * 50000), "datetime": ts,
+            })
+        return candles
+
+
+class SimulatedStream:
+    """schwabdev Stream look-alike that generates LEVELONE_EQUITIES messages locally"""
+
+    def __init__(self, client: "SimulatedClient", rate: float = SIMULATOR_STREAM_RATE,
+                 items_per_message: int = SIMULATOR_ITEMS_PER_MESSAGE, source: str = SIMULATOR_SOURCE):
+        self.client = client
+        self.market = client.market
+        self.rate = min(MAX_STREAM_RATE, max(MIN_STREAM_RATE, rate))
+        self.items_per_message = max(1, items_per_message)
+        self.source = source
+        self.subscriptions: Dict[str, Dict[str, str]] = {}
+        self.active = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._request_id = 0
+        self._cursor = 0
+
+        # Stats
+        self.messages = 0
+        self.skipped = 0
+        self.disconnects = 0
+
+    def basic_request(self, service: str, command: str, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._request_id += 1
+        request = {"service": service.upper(), "command": command.upper(), "requestid": self._request_id}
+        if parameters:
+            request["parameters"] = {k: v for k, v in parameters.items() if v is not None}
+        return request
+
+    def level_one_equities(self, keys, fields, command: str = "ADD") -> Dict[str, Any]:
+        keys = ",".join(keys) if isinstance(keys, list) else keys
+        fields = ",".join(map(str, fields)) if isinstance(fields, list) else fields
+        return self.basic_request("LEVELONE_EQUITIES", command, {"keys": keys, "fields": fields})
+
+    def send(self, requests):
+        for request in requests if isinstance(requests, list) else [requests]:
+            service = request.get("service", "")
+            keys = [k.strip() for k in request.get("parameters", {}).get("keys", "").split(",") if k.strip()]
+            subscribed = self.subscriptions.setdefault(service, {})
+            command = request.get("command")
+            if command == "SUBS":
+                subscribed.clear()
+            if command in ("SUBS", "ADD"):
+                subscribed.update((key, key) for key in keys)
+            elif command == "UNSUBS":
+                for key in keys:
+                    subscribed.pop(key, None)
+
+    def start(self, receiver: Callable[[Any], None] = print, daemon: bool = True, **kwargs):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(receiver,), name="simulated-stream", daemon=daemon)
+        self._thread.start()
+
+    def stop(self, clear_subscriptions: bool = True):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.active = False
+        if clear_subscriptions:
+            self.subscriptions = {}
+
+    def _frames(self) -> Iterator[str]:
+        """Endless message source: journal frames (looped) or random-walk ticks"""
+        if self.source == "journal":
+            from app.tick_journal import tick_journal, trading_day
+            # A fixed, closed day: never the segment still being written
+            today = trading_day()
+            closed = [day for day in tick_journal.days() if day < today]
+            day = SIMULATOR_JOURNAL_DAY or (closed[-1] if closed else None)
+            if day is None:
+                logger.warning("No closed journal day to replay, falling back to random ticks")
+            while day is not None:
+                replayed = 0
+                for _, payload in tick_journal.read(day):
+                    replayed += 1
+                    yield payload.decode()
+                if not replayed:
+                    logger.warning("Simulator journal source is empty, falling back to random ticks")
+                    break
+        while True:
+            symbols = list(self.subscriptions.get("LEVELONE_EQUITIES", ()))
+            if not symbols:
+                yield None
+                continue
+            now_ms = int(time.time() * 1000)
+            count = min(self.items_per_message, len(symbols))
+            content = []
+            for _ in range(count):
+                symbol = symbols[self._cursor % len(symbols)]
+                self._cursor += 1
+                content.append(self.market.item(symbol, now_ms))
+            yield _dumps({"data": [{"service": "LEVELONE_EQUITIES", "timestamp": now_ms,
+                                    "command": "SUBS", "content": content}]})
+
+    def _run(self, receiver: Callable[[Any], None]):
+        self.active = True
+        frames = self._frames()
+        started = time.monotonic()
+        emitted = 0
+        burst = max(1, int(self.rate / 100))
+        last_disconnect_check = started
+        try:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                due = int((now - started) * self.rate) - emitted
+                if due > self.rate * _MAX_CATCH_UP_SECONDS:
+                    # The receiver could not keep up: skip instead of bursting
+                    skip = due - int(self.rate * _MAX_CATCH_UP_SECONDS)
+                    self.skipped += skip
+                    emitted += skip
+                    due -= skip
+                # At most ~10 ms worth per pass, so stop() and the skip check stay responsive
+                for _ in range(min(due, burst)):
+                    frame = next(frames)
+                    emitted += 1
+                    if frame is None:
+                        continue
+                    receiver(frame)
+                    self.messages += 1
+                if SIMULATOR_DISCONNECT_RATE and now - last_disconnect_check >= 1.0:
+                    last_disconnect_check = now
+                    if self.client.rng.random() < SIMULATOR_DISCONNECT_RATE:
+                        self.disconnects += 1
+                        logger.warning("🔌 Simulated stream disconnect")
+                        return
+                if due <= burst:
+                    self._stop_event.wait(max(0.001, 1.0 / self.rate))
+        except Exception as e:
+            logger.error(f"Simulated stream failed: {e}")
+        finally:
+            self.active = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "rate": self.rate,
+            "source": self.source,
+            "subscribed": {service: len(keys) for service, keys in self.subscriptions.items()},
+            "messages": self.messages,
+            "skipped": self.skipped,
+            "disconnects": self.disconnects,
+        }
+
+
+class SimulatedClient:
+    """schwabdev Client look-alike serving simulated REST responses"""
+
+    def __init__(self, market: Optional[SimulatedMarket] = None, latency_ms: float = SIMULATOR_LATENCY_MS,
+                 jitter_ms: float = SIMULATOR_LATENCY_JITTER_MS, error_rate: float = SIMULATOR_ERROR_RATE):
+        self.market = market or SimulatedMarket()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(SIMULATOR_SEED + 1)
+        self.streams: List[SimulatedStream] = []
+        self.stream = self.create_stream()
+
+        # Stats
+        self.calls = 0
+        self.errors = 0
+
+    def create_stream(self) -> SimulatedStream:
+        stream = SimulatedStream(self)
+        self.streams.append(stream)
+        return stream
+
+    def _respond(self, build: Callable[[], Any]) -> SimulatedResponse:
+        """Apply the injected latency and error rate around a response"""
+        self.calls += 1
+        delay = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return SimulatedResponse(500, {"errors": [{"status": 500, "title": "Simulated upstream error"}]})
+        return SimulatedResponse(200, build())
+
+    def quotes(self, symbols, fields: Optional[str] = None, indicative: bool = False) -> SimulatedResponse:
+        symbols = symbols.split(",") if isinstance(symbols, str) else symbols
+
+        def build():
+            now_ms = int(time.time() * 1000)
+            return {
+                s: {"symbol": s, "assetMainType": "EQUITY", "realtime": True,
+                    "quote": self.market.state(s).quote(now_ms)}
+                for s in (symbol.strip().upper() for symbol in symbols) if s
+            }
+        return self._respond(build)
+
+    def price_history(self, symbol: str, periodType: Optional[str] = None, period: Any = None,
+                      frequencyType: Optional[str] = None, frequency: Any = None, startDate: Any = None,
+                      endDate: Any = None, needExtendedHoursData: Optional[bool] = None,
+                      needPreviousClose: Optional[bool] = None) -> SimulatedResponse:
+        def build():
+            now_ms = int(time.time() * 1000)
+            end_ms = int(endDate) if endDate is not None else now_ms
+            if startDate is not None:
+                start_ms = int(startDate)
+            else:
+                days = _PERIOD_DAYS.get(periodType or "day", 1) * int(period or 1)
+                start_ms = end_ms - days * 86_400_000
+            step_ms = _FREQUENCY_MS.get(frequencyType or "minute", _MINUTE_MS) * int(frequency or 1)
+            candles = self.market.candles(symbol.upper(), start_ms, min(end_ms, now_ms), step_ms)
+            return {"symbol": symbol.upper(), "empty": not candles, "candles": candles}
+        return self._respond(build)
+
+    def account_linked(self) -> SimulatedResponse:
+        return self._respond(lambda: [{"accountNumber": "SIM00001", "hashValue": "SIMULATED0001"}])
+
+    def account_numbers(self) -> SimulatedResponse:
+        return self.account_linked()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "streams": [stream.stats() for stream in self.streams],
+        }
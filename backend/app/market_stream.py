@@ -0,0 +1,142 @@
+"""
+Dispatch of Schwab streamer messages to the market data consumers
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from app.ingestion import market_data_writer
+from app.quote_cache import quote_cache
+from app.bars import BarAggregator, bar_aggregator, market_bar_writer
+from app.stream_hub import stream_hub
+from app.stream_decoder import StreamDecoder, stream_decoder, equity_fields, loads
+
+logger = logging.getLogger(__name__)
+
+# LEVELONE_EQUITIES field codes (futures items are translated to these)
+LAST_PRICE = "3"
+TOTAL_VOLUME = "8"
+
+
+def parse_message(message: Any) -> Optional[Dict[str, Any]]:
+    """Decode a raw streamer message (JSON text or an already decoded dict)"""
+    message = loads(message)
+    return message if isinstance(message, dict) else None
+
+
+def iter_stream_items(message: Dict[str, Any]) -> Iterator[Tuple[str, str, Dict[str, Any], int]]:
+    """Yield (service, symbol, fields, timestamp_ms) for every keyed item in a streamer message"""
+    received_ms = int(time.time() * 1000)
+    # Streamer payloads wrap service content in a `data` list
+    sections = [message] if 'content' in message else []
+    sections.extend(message.get('data', []))
+
+    for section in sections:
+        service = section.get('service', '')
+        timestamp_ms = section.get('timestamp') or received_ms
+        for item in section.get('content', []):
+            if 'key' not in item:
+                continue
+            fields = item['content'] if isinstance(item.get('content'), dict) else item
+            yield service, item['key'], fields, timestamp_ms
+
+
+def handle_stream_message(message: Any):
+    """Stream callback: refresh the quote cache, fan out to clients, aggregate bars and queue rows for the database writer"""
+    try:
+        data = parse_message(message)
+        if data is None:
+            return
+
+        rows = []
+        for service, symbol, fields, timestamp_ms in iter_stream_items(data):
+            fields = equity_fields(service, fields)
+            if fields is None:
+                continue
+            # Merged state, so a delta without high/low/open still writes a complete row
+            record = stream_decoder.apply(symbol, fields, timestamp_ms)
+            quote_cache.update_from_stream(symbol, fields)
+            stream_hub.publish(symbol, fields)
+            if LAST_PRICE in fields or TOTAL_VOLUME in fields:
+                price = fields.get(LAST_PRICE)
+                volume = fields.get(TOTAL_VOLUME)
+                bar_aggregator.on_tick(
+                    symbol,
+                    float(price) if price is not None else None,
+                    float(volume) if volume is not None else None,
+                    timestamp_ms
+                )
+            if LAST_PRICE in fields:
+                row = record.market_data_row()
+                row["timestamp"] = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+                rows.append(row)
+
+        if rows:
+            market_data_writer.submit_many(rows)
+    except Exception as e:
+        logger.error(f"Error handling stream data: {e}")
+
+
+class ReplayHandler:
+    """
+    Consumer for journal replay, isolated from the live pipeline: it decodes
+    with its own decoder state, rebuilds bars on event time, and re-persists
+    ticks and bars. Both writers skip rows that already exist, so a replay
+    that overlaps stored data is harmless. The live quote cache, WebSocket/SSE
+    clients and indicator state never see recorded (stale) quotes.
+    """
+
+    def __init__(self):
+        self.decoder = StreamDecoder()
+        self.bars = BarAggregator(bar_aggregator.timeframes, writer=market_bar_writer, event_time=True)
+
+        # Stats
+        self.messages = 0
+        self.rows = 0
+
+    def __call__(self, message: Any):
+        try:
+            data = parse_message(message)
+            if data is None:
+                return
+            self.messages += 1
+            rows = []
+            for service, symbol, fields, timestamp_ms in iter_stream_items(data):
+                fields = equity_fields(service, fields)
+                if fields is None:
+                    continue
+                record = self.decoder.apply(symbol, fields, timestamp_ms)
+                if LAST_PRICE in fields or TOTAL_VOLUME in fields:
+                    price = fields.get(LAST_PRICE)
+                    volume = fields.get(TOTAL_VOLUME)
+                    self.bars.on_tick(
+                        symbol,
+                        float(price) if price is not None else None,
+                        float(volume) if volume is not None else None,
+                        timestamp_ms
+                    )
+                if LAST_PRICE in fields:
+                    row = record.market_data_row()
+                    row["timestamp"] = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+                    rows.append(row)
+            if rows:
+                self.rows += market_data_writer.submit_many(rows)
+        except Exception as e:
+            logger.error(f"Error replaying stream data: {e}")
+
+    def finish(self):
+        """
+        Close bars whose period ended before the last replayed tick. The bar
+        still forming at that point may be incomplete and is not written.
+        """
+        self.bars.close_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "rows_submitted": self.rows,
+            "bars_closed": self.bars.bars_closed,
+            "late_ticks": self.bars.late_ticks,
+        }
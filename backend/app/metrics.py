@@ -0,0 +1,314 @@
+"""
+Prometheus text-format metrics for the API, upstream calls and the stream pipeline
+
+A small, dependency-free registry of counters, gauges and histograms. Hot
+paths keep a reference to a labelled child (`HISTOGRAM.labels("quotes")`) and
+only do a bisect plus two list/attribute increments per event, without a
+lock: under the GIL a concurrent increment can very rarely be lost, which is
+an acceptable error for monitoring. Values that components already track
+(queue depths, stream counters, pool state) are read by collectors at scrape
+time instead, so they cost nothing between scrapes.
+
+`/metrics` renders everything in the Prometheus text exposition format.
+"""
+
+import time
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Any, Callable, Iterable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond handlers up to upstream timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (labels, value) samples of one metric family, produced at scrape time
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any):
+        """Child for these label values; keep it around on hot paths"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(dict(zip(self.labelnames, key)), child))
+        return lines
+
+    def _render_child(self, labels: Dict[str, str], child) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].value += amount
+
+    def _render_child(self, labels, child):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._children[()].value = value
+
+    def _render_child(self, labels, child):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _render_child(self, labels, child):
+        lines = []
+        cumulative = 0
+        counts = list(child.counts)
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named metrics plus scrape-time collectors"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        """`collector()` yields (name, type, help, samples) families, called on every scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+# Global registry served at /metrics
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+SCHWAB_CALL_SECONDS = registry.histogram(
+    "schwab_call_duration_seconds", "Upstream Schwab API call latency by client method", ("method",)
+)
+SCHWAB_CALL_ERRORS = registry.counter(
+    "schwab_call_errors_total", "Upstream Schwab API calls that raised or returned an error status", ("method",)
+)
+STREAM_LAG_SECONDS = registry.histogram(
+    "stream_lag_seconds", "Receive time minus server timestamp of streamer messages", ("shard",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+INGEST_FLUSH_SECONDS = registry.histogram(
+    "ingest_flush_duration_seconds", "Multi-row INSERT latency of the bulk writers", ("table",)
+)
+
+
+# method -> (latency child, error child), so a call skips the label lookups
+_call_children: Dict[str, Tuple[_HistogramChild, _CounterChild]] = {}
+
+
+def timed_call(method: str, func: Callable, *args, **kwargs):
+    """Call a schwabdev client method, recording its latency and errors (non-2xx counts as an error)"""
+    children = _call_children.get(method)
+    if children is None:
+        children = _call_children[method] = (SCHWAB_CALL_SECONDS.labels(method), SCHWAB_CALL_ERRORS.labels(method))
+    latency, errors = children
+    started = time.perf_counter()
+    try:
+        response = func(*args, **kwargs)
+    except Exception:
+        errors.inc()
+        raise
+    finally:
+        latency.observe(time.perf_counter() - started)
+    if not getattr(response, "ok", True):
+        errors.inc()
+    return response
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template (not the raw path)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str, int], _HistogramChild] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # For streamed responses this includes the time to send the body
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            key = (scope["method"], path, status)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = HTTP_REQUEST_SECONDS.labels(*key)
+            child.observe(time.perf_counter() - started)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, DECIMAL, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, ForeignKey, DECIMAL, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -93,8 +93,10 @@ class MarketData(Base):
     """Real-time and historical market data"""
     __tablename__ = "market_data"
     
-    id = Column(Integer, primary_key=True, index=True)
-    symbol = Column(String(10), nullable=False, index=True)
+    # On PostgreSQL the table is range-partitioned by timestamp (see app/partitioning.py),
+    # where the primary key is (id, timestamp)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    symbol = Column(String(10), nullable=False)
     price = Column(DECIMAL(10, 4), nullable=False)
     volume = Column(Integer, nullable=False, default=0)
     high = Column(DECIMAL(10, 4), nullable=False)
@@ -104,9 +106,36 @@ class MarketData(Base):
     change_percent = Column(Float, nullable=False, default=0.0)
     bid = Column(DECIMAL(10, 4), nullable=True)
     ask = Column(DECIMAL(10, 4), nullable=True)
-    timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Every query filters by symbol and orders by time; unique so replayed ticks are skipped
+    __table_args__ = (
+        Index("ix_market_data_symbol_timestamp", symbol, timestamp.desc(), unique=True),
+    )
+
+
+class MarketBar(Base):
+    """OHLCV bars aggregated from the real-time stream"""
+    __tablename__ = "market_bars"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    symbol = Column(String(10), nullable=False)
+    timeframe = Column(String(10), nullable=False)  # 1m, 5m, 15m, 1h
+    timestamp = Column(DateTime(timezone=True), nullable=False)  # bar open time
+    open_price = Column(DECIMAL(10, 4), nullable=False)
+    high = Column(DECIMAL(10, 4), nullable=False)
+    low = Column(DECIMAL(10, 4), nullable=False)
+    close = Column(DECIMAL(10, 4), nullable=False)
+    volume = Column(BigInteger, nullable=False, default=0)
+    vwap = Column(Float, nullable=True)
+    trade_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_market_bars_symbol_timeframe_timestamp", symbol, timeframe, timestamp.desc(), unique=True),
+    )
+
 
 class Strategy(Base):
     """Trading strategy configurations"""
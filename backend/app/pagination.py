@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination for time-ordered tables
+
+Pages are read newest first on `(timestamp, id)` and the next page starts
+strictly after the last row returned, so each request reads at most one page
+from the index no matter how deep the client has scrolled or how wide the
+time window is. Cursors are opaque to clients and scoped to one endpoint.
+"""
+
+import os
+import json
+import base64
+from datetime import datetime
+from typing import List, Any, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+
+# Load environment variables
+load_dotenv()
+
+# Hard cap on rows per page, whatever `limit` the client sends
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(scope: str, timestamp: datetime, row_id: int) -> str:
+    payload = json.dumps({"s": scope, "t": timestamp.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(scope: str, token: str) -> Tuple[datetime, int]:
+    """(timestamp, id) of the last row of the previous page"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if payload["s"] != scope:
+            raise InvalidCursor("Cursor belongs to a different listing")
+        return datetime.fromisoformat(payload["t"]), int(payload["i"])
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(conn, query: Select, scope: str, timestamp_col, id_col,
+                limit: int, cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    Run `query` newest first from `cursor`, returning (rows, next_cursor).
+    `query` must select `timestamp_col` and `id_col`; next_cursor is None on
+    the last page. Raises InvalidCursor for a bad token.
+    """
+    limit = page_size(limit)
+    if cursor:
+        timestamp, row_id = decode_cursor(scope, cursor)
+        # The leading range condition keeps the scan on the timestamp index
+        query = query.where(
+            timestamp_col <= timestamp,
+            or_(timestamp_col < timestamp, and_(timestamp_col == timestamp, id_col < row_id)),
+        )
+    query = query.order_by(timestamp_col.desc(), id_col.desc()).limit(limit + 1)
+    rows = conn.execute(query).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]._mapping
+    return rows, encode_cursor(scope, last[timestamp_col.key], last[id_col.key])
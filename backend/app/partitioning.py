@@ -0,0 +1,271 @@
+"""
+Time-series layout for the market_data table on PostgreSQL
+
+market_data is declaratively range-partitioned on `timestamp` (one partition per
+day or month, bounded at UTC midnight). Partitions are created ahead of time by a
+maintenance thread, and retention detaches and drops whole partitions instead of
+deleting rows. Rows outside every dated range land in the DEFAULT partition: they
+are moved into the dated partition when one is created for their range, and the
+expired ones are deleted by the retention pass.
+"""
+
+import os
+import re
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+from app.database import engine as default_engine
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MARKET_DATA_PARTITION_INTERVAL = os.getenv("MARKET_DATA_PARTITION_INTERVAL", "day")  # day | month
+MARKET_DATA_RETENTION_DAYS = int(os.getenv("MARKET_DATA_RETENTION_DAYS", "90"))
+MARKET_DATA_PARTITIONS_AHEAD = int(os.getenv("MARKET_DATA_PARTITIONS_AHEAD", "3"))
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+PARENT_TABLE = "market_data"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{8}})$")
+
+# Mirrors app.models.MarketData; the partition key must be part of the primary key
+CREATE_PARTITIONED_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {PARENT_TABLE} (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    symbol VARCHAR(10) NOT NULL,
+    price NUMERIC(10, 4) NOT NULL,
+    volume INTEGER NOT NULL DEFAULT 0,
+    high NUMERIC(10, 4) NOT NULL,
+    low NUMERIC(10, 4) NOT NULL,
+    open_price NUMERIC(10, 4) NOT NULL,
+    change NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    change_percent DOUBLE PRECISION NOT NULL DEFAULT 0,
+    bid NUMERIC(10, 4),
+    ask NUMERIC(10, 4),
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+CREATE_SUPPORTING_OBJECTS = [
+    # Unique (it includes the partition key), so replayed ticks are skipped by ON CONFLICT DO NOTHING
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ix_market_data_symbol_timestamp ON {PARENT_TABLE} (symbol, timestamp DESC)",
+    # Catches rows outside the pre-created range instead of failing the insert
+    f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT",
+]
+
+
+def _period_start(day: date, interval: str) -> date:
+    return day.replace(day=1) if interval == "month" else day
+
+
+def _next_period(start: date, interval: str) -> date:
+    if interval == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def partition_name(start: date) -> str:
+    return f"{PARENT_TABLE}_p{start:%Y%m%d}"
+
+
+def _bound(day: date) -> str:
+    """UTC midnight as a literal; a bare date would be read in the session time zone"""
+    return f"'{day:%Y-%m-%d} 00:00:00+00'"
+
+
+def has_default_partition(conn) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is not None
+
+
+def is_partitioned(conn) -> bool:
+    """Whether market_data exists as a partitioned table"""
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": PARENT_TABLE}).scalar())
+
+
+def create_partitioned_table(engine: Engine):
+    """Create the partitioned market_data table if it does not exist yet (PostgreSQL only)"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": PARENT_TABLE}).scalar()
+        if exists is None:
+            conn.execute(text(CREATE_PARTITIONED_TABLE))
+            for statement in CREATE_SUPPORTING_OBJECTS:
+                conn.execute(text(statement))
+            ensure_partitions(conn)
+            logger.info("🗂️ Created partitioned market_data table")
+        elif not is_partitioned(conn):
+            logger.warning(
+                "⚠️ market_data is not partitioned; apply "
+                "database/migrations/001_partition_market_data.sql to convert it"
+            )
+
+
+def list_partitions(conn) -> List[Tuple[str, date]]:
+    """(name, range start) of every dated market_data partition, oldest first"""
+    return [(name, start) for name, start, _ in _dated_partitions(conn)]
+
+
+def _dated_partitions(conn) -> List[Tuple[str, date, bool]]:
+    """(name, range start, detach pending) of every dated partition, oldest first"""
+    rows = conn.execute(text(
+        "SELECT c.relname, i.inhdetachpending FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": PARENT_TABLE}).all()
+    partitions = []
+    for name, pending in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, datetime.strptime(match.group(1), "%Y%m%d").date(), bool(pending)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_partition(conn, start: date, end: date) -> int:
+    """
+    Create the partition for [start, end). A partition cannot be created while the
+    DEFAULT partition holds rows in its range, so those rows are moved out first:
+    the new table is filled from DEFAULT and then attached. Returns the rows moved.
+    """
+    name = partition_name(start)
+    bounds = f"FOR VALUES FROM ({_bound(start)}) TO ({_bound(end)})"
+    moved = 0
+    if has_default_partition(conn):
+        in_range = f"timestamp >= {_bound(start)} AND timestamp < {_bound(end)}"
+        if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})")).scalar():
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+            moved = conn.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            )).rowcount
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+            logger.info(f"🗂️ Moved {moved} rows from {DEFAULT_PARTITION} into {name}")
+            return moved
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+    return moved
+
+
+def ensure_partitions(conn, ahead: int = MARKET_DATA_PARTITIONS_AHEAD,
+                      interval: str = MARKET_DATA_PARTITION_INTERVAL, today: Optional[date] = None) -> List[str]:
+    """Create partitions from the current period through `ahead` periods in the future"""
+    start = _period_start(today or datetime.now(timezone.utc).date(), interval)
+    created = []
+    for _ in range(ahead + 1):
+        end = _next_period(start, interval)
+        name = partition_name(start)
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists is None:
+            create_partition(conn, start, end)
+            created.append(name)
+        start = end
+    return created
+
+
+def drop_expired_partitions(engine: Engine, retention_days: int = MARKET_DATA_RETENTION_DAYS,
+                            interval: str = MARKET_DATA_PARTITION_INTERVAL, today: Optional[date] = None) -> List[str]:
+    """
+    Detach and drop partitions whose whole range is older than the retention window
+    (no row-by-row DELETE), then delete expired stray rows from the DEFAULT partition.
+
+    Each partition is detached in its own step before the DROP, so inserts into the
+    live partitions only wait for the detach. PostgreSQL allows DETACH ... CONCURRENTLY
+    only outside a transaction and without a DEFAULT partition; when a DEFAULT
+    partition exists the detach is a short transaction of its own. A concurrent
+    detach interrupted on an earlier run is finalized first.
+    """
+    cutoff = (today or datetime.now(timezone.utc).date()) - timedelta(days=retention_days)
+    with engine.connect() as conn:
+        partitions = _dated_partitions(conn)
+        has_default = has_default_partition(conn)
+    concurrently = not has_default
+    dropped = []
+    for name, start, pending in partitions:
+        if _next_period(start, interval) > cutoff:
+            continue
+        if pending:
+            detach = f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name} FINALIZE"
+        else:
+            detach = f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}{' CONCURRENTLY' if concurrently else ''}"
+        if concurrently or pending:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(detach))
+        else:
+            with engine.begin() as conn:
+                conn.execute(text(detach))
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        dropped.append(name)
+    if has_default:
+        with engine.begin() as conn:
+            expired = conn.execute(text(
+                f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < {_bound(cutoff)}"
+            )).rowcount
+        if expired:
+            logger.info(f"🗂️ Deleted {expired} expired rows from {DEFAULT_PARTITION}")
+    return dropped
+
+
+def run_maintenance(engine: Engine) -> Dict[str, Any]:
+    """Create upcoming partitions and apply the retention policy, each in its own transaction"""
+    if engine.dialect.name != "postgresql":
+        return {"partitioned": False}
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+        created = ensure_partitions(conn)
+    dropped = drop_expired_partitions(engine)
+    with engine.connect() as conn:
+        partitions = len(list_partitions(conn))
+    if created or dropped:
+        logger.info(f"🗂️ market_data partitions: created {created}, dropped {dropped}")
+    return {"partitioned": True, "created": created, "dropped": dropped, "partitions": partitions}
+
+
+class PartitionMaintenance:
+    """Background thread that runs partition maintenance periodically"""
+
+    def __init__(self, engine: Engine, interval: float = PARTITION_MAINTENANCE_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.last_result: Dict[str, Any] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.engine.dialect.name != "postgresql" or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.last_result = run_maintenance(self.engine)
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}")
+            self._stop_event.wait(self.interval)
+
+
+# Global maintenance runner for the application engine
+partition_maintenance = PartitionMaintenance(default_engine)
@@ -0,0 +1,227 @@
+"""
+Materialized portfolio snapshot served by GET /api/v1/portfolio
+
+The portfolio view is kept in memory as plain floats together with its
+encoded JSON body and a version ETag. Writers report what changed: the
+mark-to-market job passes the symbols it revalued, and ORM commits touching
+`Position`, `Trade` or `Portfolio` rows are picked up by a session hook. The
+next read reloads only the positions of the changed symbols plus the
+portfolio row, so unchanged polls (and `If-None-Match` revalidations) never
+reach the database.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Portfolio, Position, Trade
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTFOLIO = {
+    "total_value": 100000.00,
+    "cash_balance": 50000.00,
+    "invested_value": 50000.00,
+    "total_pnl": 0.0,
+    "daily_pnl": 0.0,
+}
+
+POSITION_COLUMNS = (
+    Position.id, Position.symbol, Position.shares, Position.avg_cost,
+    Position.current_price, Position.market_value, Position.unrealized_pnl,
+)
+
+
+def ensure_default_portfolio(db: Session) -> int:
+    """Create the default portfolio if none exists (run at startup, not per request)"""
+    portfolio_id = db.execute(select(Portfolio.id).order_by(Portfolio.id).limit(1)).scalar()
+    if portfolio_id is None:
+        portfolio = Portfolio(**DEFAULT_PORTFOLIO)
+        db.add(portfolio)
+        db.commit()
+        portfolio_id = portfolio.id
+        logger.info(f"💼 Created default portfolio {portfolio_id}")
+    return portfolio_id
+
+
+def _position_dict(row) -> Dict[str, Any]:
+    return {
+        "symbol": row.symbol,
+        "shares": float(row.shares),
+        "avg_cost": float(row.avg_cost),
+        "current_price": float(row.current_price),
+        "market_value": float(row.market_value),
+        "unrealized_pnl": float(row.unrealized_pnl),
+    }
+
+
+class PortfolioSnapshot:
+    """
+    In-memory view of the default portfolio. `invalidate` records changed
+    symbols; `get` applies them before returning (etag, body).
+    """
+
+    def __init__(self, bind=None):
+        self.bind = bind
+        # Distinguishes ETags across restarts, where versions start over
+        self._epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self.portfolio_id: Optional[int] = None
+        self._totals: Dict[str, float] = {}
+        # symbol -> (position id, position); ordered by id when encoded
+        self._positions: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._dirty_symbols: Set[str] = set()
+        self._dirty_all = True
+        self.version = 0
+        # (etag, body) is swapped as one tuple so readers never pair an ETag with another version's body
+        self.current: Tuple[str, bytes] = ("", b"")
+
+        # Stats
+        self.full_rebuilds = 0
+        self.incremental_rebuilds = 0
+        self.positions_reloaded = 0
+        self.not_modified = 0
+        self.served = 0
+        self.last_rebuild_ms = 0.0
+
+    def invalidate(self, symbols: Optional[Iterable[str]] = None):
+        """Mark symbols (or, with None, the whole portfolio) as changed"""
+        with self._lock:
+            if symbols is None:
+                self._dirty_all = True
+            else:
+                self._dirty_symbols.update(symbols)
+
+    @property
+    def is_dirty(self) -> bool:
+        return self._dirty_all or bool(self._dirty_symbols)
+
+    def _reload(self, db: Session, symbols: Optional[Set[str]]):
+        if symbols is None:
+            self.portfolio_id = db.execute(select(Portfolio.id).order_by(Portfolio.id).limit(1)).scalar()
+        if self.portfolio_id is None:
+            self._totals, self._positions = {}, {}
+            return
+        row = db.execute(
+            select(Portfolio.total_value, Portfolio.cash_balance, Portfolio.invested_value,
+                   Portfolio.total_pnl, Portfolio.daily_pnl)
+            .where(Portfolio.id == self.portfolio_id)
+        ).one()
+        self._totals = {key: float(value) for key, value in row._mapping.items()}
+
+        query = select(*POSITION_COLUMNS).where(Position.portfolio_id == self.portfolio_id)
+        if symbols is None:
+            positions = {}
+        else:
+            query = query.where(Position.symbol.in_(symbols))
+            positions = {s: p for s, p in self._positions.items() if s not in symbols}
+        rows = db.execute(query).all()
+        for row in rows:
+            positions[row.symbol] = (row.id, _position_dict(row))
+        self._positions = positions
+        self.positions_reloaded += len(rows)
+
+    def _encode(self):
+        totals = self._totals
+        total_value = totals["total_value"]
+        body = {
+            "total_value": total_value,
+            "cash_balance": totals["cash_balance"],
+            "invested_value": totals["invested_value"],
+            "positions": [p for _, p in sorted(self._positions.values(), key=lambda item: item[0])],
+            "performance": {
+                "daily_pnl": totals["daily_pnl"],
+                "daily_pnl_percent": totals["daily_pnl"] / total_value * 100 if total_value > 0 else 0,
+                "total_pnl": totals["total_pnl"],
+                "total_pnl_percent": totals["total_pnl"] / total_value * 100 if total_value > 0 else 0,
+            },
+        }
+        self.version += 1
+        self.current = (f'"{self._epoch}-{self.version}"', json.dumps(body, separators=(",", ":")).encode())
+
+    def rebuild(self):
+        """Apply pending changes: a full reload first time, then only the dirty symbols"""
+        with self._lock:
+            full = self._dirty_all
+            symbols = None if full else set(self._dirty_symbols)
+            self._dirty_all = False
+            self._dirty_symbols.clear()
+        started = time.perf_counter()
+        db = SessionLocal() if self.bind is None else SessionLocal(bind=self.bind)
+        try:
+            self._reload(db, symbols)
+        except Exception:
+            # Retry the same changes on the next read
+            self.invalidate(None if full else symbols)
+            raise
+        finally:
+            db.close()
+        if self._totals:
+            self._encode()
+        else:
+            self.current = ("", b"")
+        if full:
+            self.full_rebuilds += 1
+        else:
+            self.incremental_rebuilds += 1
+        self.last_rebuild_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def get(self) -> Tuple[str, bytes]:
+        """Current (etag, JSON body); empty if there is no portfolio"""
+        if self.is_dirty:
+            # Serialize rebuilds so concurrent pollers do not each reload
+            with self._rebuild_lock:
+                if self.is_dirty:
+                    self.rebuild()
+        self.served += 1
+        return self.current
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "portfolio_id": self.portfolio_id,
+            "version": self.version,
+            "etag": self.current[0],
+            "positions": len(self._positions),
+            "dirty_symbols": len(self._dirty_symbols),
+            "served": self.served,
+            "not_modified": self.not_modified,
+            "full_rebuilds": self.full_rebuilds,
+            "incremental_rebuilds": self.incremental_rebuilds,
+            "positions_reloaded": self.positions_reloaded,
+            "last_rebuild_ms": self.last_rebuild_ms,
+        }
+
+
+# Global snapshot of the default portfolio
+portfolio_snapshot = PortfolioSnapshot()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_portfolio_changes(session: Session, flush_context):
+    """Remember which symbols a flush touched until the transaction commits"""
+    changes = session.info.setdefault("portfolio_changes", set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, (Position, Trade)):
+            changes.add(instance.symbol)
+        elif isinstance(instance, Portfolio):
+            changes.add(None)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_portfolio_changes(session: Session):
+    changes = session.info.pop("portfolio_changes", None)
+    if changes:
+        portfolio_snapshot.invalidate(None if None in changes else changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_portfolio_changes(session: Session):
+    session.info.pop("portfolio_changes", None)
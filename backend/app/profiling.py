@@ -0,0 +1,460 @@
+"""
+On-demand sampling profiler and tracemalloc snapshots for the live server
+
+`SamplingProfiler` walks the stacks of running threads (`sys._current_frames`)
+from a background thread at a fixed interval, so the profiled code runs
+unmodified and nothing is paid when no profile is active. In wall mode every
+sample counts once; in cpu mode each sample is weighted by the CPU time the
+thread used since the previous sample (per-thread CPU clocks), so threads
+blocked on I/O or locks drop out. Results are emitted as folded stacks
+(`thread;outer;...;inner <weight>`), the input format of flamegraph.pl,
+speedscope and inferno.
+
+`RequestProfilerMiddleware` profiles a single request flagged with an
+`X-Profile` header or `profile` query parameter (admin token required). Only
+samples taken while that request's own coroutine is on the event loop, or a
+worker thread is running its endpoint, are kept, and the rest of the time is
+recorded as awaiting; other requests are not slowed down beyond the sampler's
+share of the GIL. Request profiles are wall-clock only: the event loop's CPU
+time between two samples may belong to other requests.
+
+`AllocationTracker` wraps tracemalloc: start tracing, take labelled
+snapshots and diff two of them to find allocation sites that keep growing.
+"""
+
+import os
+import sys
+import hmac
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Admin endpoints and per-request profiling are disabled unless a token is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "x-admin-token"
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", "128"))
+PROFILE_REQUEST_HISTORY = int(os.getenv("PROFILE_REQUEST_HISTORY", "20"))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+TRACEMALLOC_MAX_SNAPSHOTS = int(os.getenv("TRACEMALLOC_MAX_SNAPSHOTS", "10"))
+
+WALL = "wall"
+CPU = "cpu"
+MODES = (WALL, CPU)
+
+# Pseudo-frame for the time a profiled request spent awaiting (not on any thread)
+AWAITING = "<awaiting>"
+
+_PREFIXES = sorted({p for p in sys.path if p and os.path.isdir(p)} | {os.getcwd()}, key=len, reverse=True)
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """Constant-time check of an X-Admin-Token value; always False while ADMIN_TOKEN is unset"""
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def _thread_cpu_ns(ident: int) -> Optional[int]:
+    try:
+        return time.clock_gettime_ns(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+# (thread ident, innermost frame) pairs to sample, from sys._current_frames()
+FrameSelector = Callable[[Dict[int, Any]], Iterable[Tuple[int, Any]]]
+
+
+class SamplingProfiler:
+    """Background-thread stack sampler producing folded stacks"""
+
+    def __init__(self, mode: str = WALL, interval: float = PROFILE_INTERVAL,
+                 select: Optional[FrameSelector] = None, stop_at=None, idle_label: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {', '.join(MODES)}")
+        if mode == CPU and not hasattr(time, "pthread_getcpuclockid"):
+            raise ValueError("CPU profiling needs per-thread CPU clocks, which this platform lacks")
+        self.mode = mode
+        self.interval = max(interval, 0.0005)
+        self.select = select
+        # Frames at and below `stop_at` (event loop, middleware) are cut from every stack
+        self.stop_at = stop_at
+        # Recorded for wall samples in which `select` matched nothing
+        self.idle_label = idle_label
+        self._labels: Dict[Any, str] = {}
+        self._cpu: Dict[int, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Stats
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.seconds = 0.0
+        self.sampling_seconds = 0.0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # ';' separates frames in the folded format
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame) -> List[str]:
+        stack = []
+        while frame is not None and frame is not self.stop_at and len(stack) < PROFILE_MAX_DEPTH:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _weight(self, ident: int) -> float:
+        if self.mode == WALL:
+            return 1
+        now = _thread_cpu_ns(ident)
+        if now is None:
+            return 0
+        previous = self._cpu.get(ident)
+        self._cpu[ident] = now
+        # Microseconds of CPU since the previous sample; the first sample only sets the reference
+        return (now - previous) // 1000 if previous is not None else 0
+
+    def sample(self):
+        """Take one sample of the selected threads"""
+        own = threading.get_ident()
+        frames = sys._current_frames()
+        if self._stop_event.is_set():
+            # The profiled thread is already inside stop()
+            return
+        frames.pop(own, None)
+        names = {t.ident: t.name for t in threading.enumerate()}
+        selected = list(self.select(frames)) if self.select else list(frames.items())
+        self.samples += 1
+        if not selected and self.idle_label and self.mode == WALL:
+            self.stacks[(self.idle_label,)] += 1
+            return
+        for ident, frame in selected:
+            weight = self._weight(ident)
+            if weight <= 0:
+                continue
+            stack = self._stack(frame)
+            self.stacks[(names.get(ident, str(ident)), *stack)] += weight
+
+    def _run(self):
+        # The first sample is one interval in, not while start() is still returning
+        next_at = time.perf_counter() + self.interval
+        while not self._stop_event.wait(max(0.0, next_at - time.perf_counter())):
+            started = time.perf_counter()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Profiler sample failed: {e}")
+            self.sampling_seconds += time.perf_counter() - started
+            next_at += self.interval
+            if next_at < time.perf_counter():
+                # Fell behind (the GIL was busy); skip missed ticks instead of bursting
+                next_at = time.perf_counter()
+
+    def start(self) -> "SamplingProfiler":
+        if self.mode == CPU:
+            # Reference CPU times, so the first real sample already has a delta
+            for ident in sys._current_frames():
+                self._weight(ident)
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        if self.started_at is not None:
+            self.seconds = time.perf_counter() - self.started_at
+        return self
+
+    def folded(self) -> str:
+        """Folded stacks, heaviest first, one `frame;frame;... weight` per line"""
+        return "\n".join(f"{';'.join(stack)} {int(weight)}" for stack, weight in self.stacks.most_common()) + "\n"
+
+    def summary(self, top: int = 25) -> Dict[str, Any]:
+        """Totals plus the heaviest functions by self and inclusive weight"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, weight in self.stacks.items():
+            own[stack[-1]] += weight
+            for frame in set(stack[1:]):
+                inclusive[frame] += weight
+        total = sum(self.stacks.values())
+        return {
+            "mode": self.mode,
+            "unit": "samples" if self.mode == WALL else "cpu_us",
+            "interval": self.interval,
+            "seconds": round(self.seconds, 3),
+            "samples": self.samples,
+            "total": total,
+            # Share of the profiled interval spent inside the sampler itself
+            "overhead": round(self.sampling_seconds / self.seconds, 4) if self.seconds else 0.0,
+            "top_self": [{"frame": f, "weight": w, "share": round(w / total, 4)} for f, w in own.most_common(top)],
+            "top_total": [{"frame": f, "weight": w, "share": round(w / total, 4)}
+                          for f, w in inclusive.most_common(top)],
+        }
+
+
+async def profile_process(seconds: float, mode: str = WALL, interval: float = PROFILE_INTERVAL) -> SamplingProfiler:
+    """Sample every thread of the process for `seconds` without blocking the event loop"""
+    profiler = SamplingProfiler(mode, interval).start()
+    try:
+        await asyncio.sleep(min(seconds, PROFILE_MAX_SECONDS))
+    finally:
+        profiler.stop()
+    return profiler
+
+
+def _contains(frame, target) -> bool:
+    while frame is not None:
+        if frame is target:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _runs_code(frame, code) -> Optional[Any]:
+    """The frame executing `code` in this stack, if any"""
+    while frame is not None:
+        if frame.f_code is code:
+            return frame
+        frame = frame.f_back
+    return None
+
+
+class RequestProfiles:
+    """Recent per-request profiles, retrievable by id"""
+
+    def __init__(self, maxlen: int = PROFILE_REQUEST_HISTORY):
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._order = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, profile_id: str, entry: Dict[str, Any]):
+        with self._lock:
+            if len(self._order) == self._order.maxlen:
+                self._profiles.pop(self._order[0], None)
+            self._order.append(profile_id)
+            self._profiles[profile_id] = entry
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{k: v for k, v in entry.items() if k != "profiler"} for entry in reversed(self._profiles.values())]
+
+
+class RequestProfilerMiddleware:
+    """
+    ASGI middleware profiling single requests sent with `X-Profile: 1`
+    (or `?profile=1`) and a valid X-Admin-Token. The response carries an
+    X-Profile-Id header; the profile is fetched from the admin API.
+    """
+
+    def __init__(self, app, profiles: Optional[RequestProfiles] = None):
+        self.app = app
+        self.profiles = profiles if profiles is not None else request_profiles
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        headers = dict(scope.get("headers") or ())
+        mode = headers.get(b"x-profile", b"").decode().lower()
+        if not mode and b"profile=" in scope.get("query_string", b""):
+            mode = parse_qs(scope["query_string"].decode()).get("profile", [""])[0].lower()
+        if mode not in ("1", "true", WALL):
+            return False
+        return admin_token_valid(headers.get(ADMIN_TOKEN_HEADER.encode(), b"").decode() or None)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        marker = sys._getframe()
+        loop_thread = threading.get_ident()
+        status = 500
+
+        def select(frames):
+            frame = frames.get(loop_thread)
+            if frame is not None and _contains(frame, marker):
+                return [(loop_thread, frame)]
+            # Sync endpoints run on a worker thread; match it by the endpoint's code object
+            endpoint = getattr(scope.get("route"), "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is None:
+                return []
+            return [(ident, f) for ident, f in frames.items() if ident != loop_thread and _runs_code(f, code)]
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler(WALL, select=select, stop_at=marker, idle_label=AWAITING).start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            route = scope.get("route")
+            self.profiles.add(profile_id, {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status,
+                "mode": WALL,
+                "seconds": round(profiler.seconds, 4),
+                "samples": profiler.samples,
+                "created_at": datetime.utcnow().isoformat(),
+                "profiler": profiler,
+            })
+            logger.info(f"🔬 Profiled {scope['method']} {scope['path']} ({profiler.seconds * 1000:.1f} ms) "
+                        f"as {profile_id}")
+
+
+class AllocationTracker:
+    """tracemalloc start/stop, labelled snapshots and snapshot diffs"""
+
+    def __init__(self, max_snapshots: int = TRACEMALLOC_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[str, Tuple[tracemalloc.Snapshot, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES) -> bool:
+        """Start tracing; False if it was already on"""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        logger.info(f"🧠 tracemalloc started ({frames} frames per trace)")
+        return True
+
+    def stop(self):
+        """Stop tracing and drop the stored snapshots"""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+        logger.info("🧠 tracemalloc stopped")
+
+    def snapshot(self, label: Optional[str] = None) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        info = {
+            "id": uuid.uuid4().hex[:12],
+            "label": label,
+            "created_at": datetime.utcnow().isoformat(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "traces": len(snapshot.traces),
+        }
+        with self._lock:
+            if len(self._snapshots) >= self.max_snapshots:
+                self._snapshots.popitem(last=False)
+            self._snapshots[info["id"]] = (snapshot, info)
+        return info
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [info for _, info in self._snapshots.values()]
+
+    def _get(self, snapshot_id: str) -> tracemalloc.Snapshot:
+        entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(snapshot_id)
+        return entry[0]
+
+    @staticmethod
+    def _format(stat_traceback, key_type: str):
+        if key_type == "traceback":
+            return [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat_traceback]
+        frame = stat_traceback[0]
+        return f"{_short_path(frame.filename)}:{frame.lineno}" if key_type == "lineno" else _short_path(frame.filename)
+
+    def top(self, snapshot_id: str, key_type: str = "lineno", limit: int = 25) -> List[Dict[str, Any]]:
+        """Largest allocation sites of one snapshot"""
+        return [
+            {"site": self._format(stat.traceback, key_type), "size": stat.size, "count": stat.count}
+            for stat in self._get(snapshot_id).statistics(key_type)[:limit]
+        ]
+
+    def diff(self, base_id: str, current_id: str, key_type: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+        """Allocation sites ordered by growth from `base_id` to `current_id`"""
+        base, current = self._get(base_id), self._get(current_id)
+        stats = current.compare_to(base, key_type)
+        return {
+            "base": base_id,
+            "current": current_id,
+            "key_type": key_type,
+            "size_diff": sum(stat.size_diff for stat in stats),
+            "count_diff": sum(stat.count_diff for stat in stats),
+            "top": [
+                {
+                    "site": self._format(stat.traceback, key_type),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": len(self._snapshots),
+        }
+
+
+# Global per-request profile history and allocation tracker
+request_profiles = RequestProfiles()
+allocation_tracker = AllocationTracker()
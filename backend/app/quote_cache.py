@@ -0,0 +1,176 @@
+"""
+Per-symbol quote cache with request coalescing for the quotes endpoint
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "1.0"))
+
+# LEVELONE_EQUITIES field codes mapped onto the keys of a REST quote's `quote` block
+LEVELONE_EQUITY_QUOTE_FIELDS = {
+    "1": "bidPrice",
+    "2": "askPrice",
+    "3": "lastPrice",
+    "4": "bidSize",
+    "5": "askSize",
+    "8": "totalVolume",
+    "9": "lastSize",
+    "10": "highPrice",
+    "11": "lowPrice",
+    "12": "closePrice",
+    "17": "openPrice",
+    "18": "netChange",
+    "19": "52WeekHigh",
+    "20": "52WeekLow",
+}
+
+QuoteFetcher = Callable[[List[str]], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class QuoteCache:
+    """
+    Keeps the latest quote per symbol with a freshness window. Concurrent
+    requests for overlapping symbols share a single upstream fetch, and only
+    missing or stale symbols are requested from upstream.
+    """
+
+    def __init__(self, ttl: float = QUOTE_CACHE_TTL):
+        self.ttl = ttl
+        self._quotes: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_symbols = 0
+        self.stream_updates = 0
+
+    def get_fresh(self, symbol: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached quote if it is within the freshness window"""
+        return self.get_recent(symbol, self.ttl, now)
+
+    def get_recent(self, symbol: str, max_age: float, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached quote if it was stored or streamed within `max_age` seconds"""
+        entry = self._quotes.get(symbol)
+        if entry is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return entry[1] if now - entry[0] <= max_age else None
+
+    def put(self, symbol: str, quote: Dict[str, Any]):
+        """Store a full upstream quote"""
+        with self._lock:
+            self._quotes[symbol] = (time.monotonic(), quote)
+
+    def update_from_stream(self, symbol: str, fields: Dict[str, Any]):
+        """Merge a LEVELONE_EQUITIES update into the cached quote and mark it fresh"""
+        changes = {
+            name: fields[code]
+            for code, name in LEVELONE_EQUITY_QUOTE_FIELDS.items()
+            if code in fields
+        }
+        if not changes:
+            return
+        with self._lock:
+            entry = self._quotes.get(symbol)
+            quote = dict(entry[1]) if entry else {"symbol": symbol}
+            quote["quote"] = {**quote.get("quote", {}), **changes}
+            # Readers only ever see whole quote objects, never one being mutated
+            self._quotes[symbol] = (time.monotonic(), quote)
+            self.stream_updates += 1
+
+    async def get_quotes(self, symbols: List[str], fetcher: QuoteFetcher) -> Dict[str, Any]:
+        """
+        Serve quotes from cache, joining in-flight fetches and fetching only what
+        is left. Symbols that could not be fetched are reported under `errors`.
+        """
+        now = time.monotonic()
+        result: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        pending: Dict[str, "asyncio.Future"] = {}
+        to_fetch: List[str] = []
+
+        for symbol in dict.fromkeys(symbols):
+            quote = self.get_fresh(symbol, now)
+            if quote is not None:
+                self.hits += 1
+                result[symbol] = quote
+            elif symbol in self._inflight:
+                self.coalesced += 1
+                pending[symbol] = self._inflight[symbol]
+            else:
+                self.misses += 1
+                to_fetch.append(symbol)
+
+        if to_fetch:
+            future = asyncio.get_running_loop().create_future()
+            for symbol in to_fetch:
+                self._inflight[symbol] = future
+            self.upstream_calls += 1
+            self.upstream_symbols += len(to_fetch)
+
+            quotes: Dict[str, Any] = {}
+            try:
+                quotes = await fetcher(to_fetch) or {}
+                for symbol in to_fetch:
+                    if symbol in quotes:
+                        self.put(symbol, quotes[symbol])
+            finally:
+                # Waiters get whatever was fetched (nothing if the fetch failed)
+                if not future.done():
+                    future.set_result(quotes)
+                for symbol in to_fetch:
+                    if self._inflight.get(symbol) is future:
+                        del self._inflight[symbol]
+            self._collect(to_fetch, quotes, result, errors)
+
+        for symbol, future in pending.items():
+            self._collect([symbol], await asyncio.shield(future), result, errors)
+
+        if errors:
+            result["errors"] = errors
+        return result
+
+    @staticmethod
+    def _collect(symbols: List[str], quotes: Dict[str, Any], result: Dict[str, Any], errors: Dict[str, str]):
+        fetch_errors = quotes.get("errors") or {}
+        for symbol in symbols:
+            if symbol in quotes:
+                result[symbol] = quotes[symbol]
+            else:
+                errors[symbol] = fetch_errors.get(symbol, "not returned by upstream")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalesce counters for tuning the freshness window"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "ttl_seconds": self.ttl,
+            "cached_symbols": len(self._quotes),
+            "inflight_symbols": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "upstream_calls": self.upstream_calls,
+            "upstream_symbols": self.upstream_symbols,
+            "stream_updates": self.stream_updates,
+        }
+
+
+# Global quote cache shared by the REST endpoint and the stream handler
+quote_cache = QuoteCache()
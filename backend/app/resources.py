@@ -0,0 +1,144 @@
+"""
+Process-wide resources: the database engine and the market data client
+
+The app owns exactly one SQLAlchemy engine (app.database) and one
+SchwabAPIService (app.schwab_api); routers, background workers and the async
+facade all share them. `resources` opens both in the FastAPI lifespan,
+warming a few pooled connections so the first requests after a restart do
+not pay connection setup, initializing the client when that needs no
+interactive login, and closes them again on shutdown.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Any, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.database import engine
+from app.schwab_api import SchwabAPIService, schwab_service, SCHWAB_TOKENS_FILE
+from app.schwab_async import schwab_async, SchwabCallTimeout
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Pooled connections opened at startup (capped at the pool size)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "4"))
+# Initialize the market data client at startup instead of on the first request
+SCHWAB_CONNECT_ON_STARTUP = os.getenv("SCHWAB_CONNECT_ON_STARTUP", "true").lower() == "true"
+
+
+class ResourceRegistry:
+    """Owns the shared engine and upstream client: warmup, shutdown and stats"""
+
+    def __init__(self, engine: Engine, schwab: Optional[SchwabAPIService]):
+        self.engine = engine
+        self.schwab = schwab
+
+        # Stats
+        self.warmed_connections = 0
+        self.warmup_seconds = 0.0
+        self.client_ready = False
+        self.started_at: Optional[float] = None
+        self.closed = False
+
+    def warm_pool(self, connections: int = DB_POOL_WARMUP) -> int:
+        """Open `connections` pooled connections at once and return them to the pool"""
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            connections = min(connections, pool.size())
+        started = time.perf_counter()
+        opened = []
+        try:
+            for _ in range(max(0, connections)):
+                conn = self.engine.connect()
+                opened.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            for conn in opened:
+                conn.close()
+        self.warmed_connections = len(opened)
+        self.warmup_seconds = time.perf_counter() - started
+        return len(opened)
+
+    def open_client(self) -> bool:
+        """Initialize the market data client unless that would start the interactive OAuth flow"""
+        if not self.schwab or not self.schwab.is_configured():
+            return False
+        if self.schwab.client:
+            return True
+        if self.schwab.backend != "simulator" and not os.path.exists(SCHWAB_TOKENS_FILE):
+            logger.info("🔐 No Schwab tokens yet; the client is created after /api/auth/schwab/login")
+            return False
+        return bool(self.schwab.initialize_client())
+
+    async def startup(self):
+        """Warm the pool and connect upstream; failures are logged, not raised"""
+        from fastapi.concurrency import run_in_threadpool
+        self.started_at = time.time()
+        self.closed = False
+        try:
+            warmed = await run_in_threadpool(self.warm_pool)
+            logger.info(f"🔌 Warmed {warmed} database connections in {self.warmup_seconds * 1000:.1f} ms")
+        except Exception as e:
+            logger.error(f"Failed to warm database pool: {e}")
+        if SCHWAB_CONNECT_ON_STARTUP:
+            try:
+                self.client_ready = await schwab_async.call(self.open_client)
+            except SchwabCallTimeout:
+                logger.warning("Market data client did not initialize in time; retrying on first use")
+            except Exception as e:
+                logger.error(f"Failed to initialize market data client: {e}")
+
+    def shutdown(self):
+        """Close the upstream client and every pooled connection; call after writers have drained"""
+        if self.closed:
+            return
+        if self.schwab:
+            try:
+                self.schwab.close()
+            except Exception as e:
+                logger.error(f"Failed to close market data client: {e}")
+        self.client_ready = False
+        self.engine.dispose()
+        self.closed = True
+        logger.info("🔌 Database pool and market data client closed")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        stats: Dict[str, Any] = {"pool": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "database": {
+                **self.pool_stats(),
+                "warmed_connections": self.warmed_connections,
+                "warmup_ms": round(self.warmup_seconds * 1000, 2),
+            },
+            "market_data": {
+                "backend": self.schwab.backend if self.schwab else None,
+                "configured": bool(self.schwab and self.schwab.is_configured()),
+                "initialized": bool(self.schwab and self.schwab.client),
+                "tokens_file": SCHWAB_TOKENS_FILE,
+            },
+            "started_at": self.started_at,
+            "closed": self.closed,
+        }
+
+
+# Global registry of the app's shared engine and market data client
+resources = ResourceRegistry(engine, schwab_service)
@@ -3,18 +3,22 @@ Schwab API integration service for real-time market data
 """
 
 import os
+import json
 import logging
 import asyncio
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
-import json
 
+import httpx
 import schwabdev
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 
 from app.models import MarketData, TradingSignal, NewsEvent
-from app.database import get_db
+from app.bar_cache import bar_cache
+from app.metrics import timed_call
+from app.market_stream import parse_message, iter_stream_items
+from app.stream_decoder import stream_decoder, LEVELONE_EQUITY_SUBSCRIBE_FIELDS
 
 # Load environment variables
 load_dotenv()
@@ -23,14 +27,31 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Deadline for a single upstream call (also used as the HTTP timeout)
+SCHWAB_CALL_TIMEOUT = float(os.getenv("SCHWAB_CALL_TIMEOUT", "10"))
+# "schwab" for the live API, "simulator" for the local stand-in (app.market_simulator)
+MARKET_DATA_BACKEND = os.getenv("MARKET_DATA_BACKEND", "schwab").strip().lower()
+# Single token store shared by the client, the OAuth callback and logout
+SCHWAB_TOKENS_FILE = os.getenv("SCHWAB_TOKENS_FILE", "tokens.json")
+SCHWAB_TOKEN_URL = "https://api.schwabapi.com/v1/oauth/token"
+
 class SchwabAPIService:
     """
     Service for integrating with Charles Schwab API
     Provides automatic token management and real-time market data
     """
     
-    def __init__(self):
+    def __init__(self, backend: str = MARKET_DATA_BACKEND):
         """Initialize the Schwab API client with automatic token management"""
+        self.backend = backend
+        self.client = None
+        self.streamer = None
+        if self.backend == "simulator":
+            # No credentials needed: initialize_client() starts the local simulator
+            self.app_key = self.app_secret = None
+            self.callback_url = None
+            logger.info("🧪 Market data backend: local simulator")
+            return
         
         # Get credentials from environment
         self.app_key = os.getenv('APP_KEY')
@@ -58,14 +79,20 @@ class SchwabAPIService:
         
     def initialize_client(self):
         """Initialize the Schwab client (call this after setting up credentials)"""
+        if self.backend == "simulator":
+            from app.market_simulator import SimulatedClient
+            self.client = SimulatedClient()
+            self.streamer = self.client.stream
+            logger.info("✅ Market simulator client initialized")
+            return True
         try:
             # Create client with automatic callback capture for easier authentication
             self.client = schwabdev.Client(
                 app_key=self.app_key,
                 app_secret=self.app_secret,
                 callback_url=self.callback_url,
-                tokens_file="tokens.json",
-                timeout=30,
+                tokens_file=SCHWAB_TOKENS_FILE,
+                timeout=max(1, int(SCHWAB_CALL_TIMEOUT)),
                 capture_callback=True,  # Automatically captures OAuth callback
                 use_session=True
             )
@@ -94,7 +121,7 @@ class SchwabAPIService:
             return None
             
         try:
-            response = self.client.account_linked()
+            response = timed_call("account_linked", self.client.account_linked)
             if response.ok:
                 accounts = response.json()
                 logger.info(f"📊 Found {len(accounts)} linked accounts")
@@ -116,7 +143,7 @@ class SchwabAPIService:
             # Convert list to comma-separated string if needed
             symbol_string = ",".join(symbols) if isinstance(symbols, list) else symbols
             
-            response = self.client.quotes(symbols=symbol_string)
+            response = timed_call("quotes", self.client.quotes, symbols=symbol_string)
             if response.ok:
                 quotes = response.json()
                 logger.info(f"📈 Retrieved quotes for {len(quotes)} symbols")
@@ -137,13 +164,16 @@ class SchwabAPIService:
         try:
             # Define default response handler if none provided
             def default_handler(message):
-                """Default handler that saves data to database"""
+                """Default handler that decodes quotes and logs them at debug level"""
                 try:
-                    data = json.loads(message) if isinstance(message, str) else message
-                    logger.info(f"📊 Received streaming data: {data}")
-                    
-                    # Here you would save to your database
-                    # self.save_market_data_to_db(data)
+                    data = parse_message(message)
+                    if data is None:
+                        return
+                    for service, symbol, fields, timestamp_ms in iter_stream_items(data):
+                        record = stream_decoder.apply(symbol, fields, timestamp_ms)
+                        # Formatting every tick at INFO dominated the streamer thread
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"📊 {symbol}: {record.to_dict()}")
                     
                 except Exception as e:
                     logger.error(f"Error handling stream data: {e}")
@@ -157,7 +187,7 @@ class SchwabAPIService:
             symbol_string = ",".join(symbols) if isinstance(symbols, list) else symbols
             stream_request = self.streamer.level_one_equities(
                 keys=symbol_string,
-                fields="0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31"
+                fields=LEVELONE_EQUITY_SUBSCRIBE_FIELDS
             )
             
             self.streamer.send(stream_request)
@@ -168,6 +198,12 @@ class SchwabAPIService:
             logger.error(f"Error starting stream: {e}")
             return False
     
+    def create_stream(self):
+        """Open an additional streamer connection on the current client"""
+        if self.backend == "simulator":
+            return self.client.create_stream()
+        return schwabdev.Stream(self.client)
+
     def stop_stream(self):
         """Stop the real-time data stream"""
         if self.streamer:
@@ -178,70 +214,33 @@ class SchwabAPIService:
                 logger.error(f"Error stopping stream: {e}")
     
     def get_market_data_history(self, symbol: str, period_type: str = "day", period: int = 1) -> Optional[Dict[str, Any]]:
-        """Get historical market data"""
+        """Get historical market data (served from the local bar cache when possible)"""
         if not self.client:
             logger.error("Client not initialized. Call initialize_client() first.")
             return None
             
         try:
-            response = self.client.price_history(
-                symbol=symbol,
-                periodType=period_type,
-                period=period,
-                frequencyType="minute",
-                frequency=1
-            )
-            
-            if response.ok:
-                data = response.json()
+            data = bar_cache.get_history(symbol, period_type, period, self._fetch_price_history)
+            if data is not None:
                 logger.info(f"📊 Retrieved historical data for {symbol}")
-                return data
-            else:
-                logger.error(f"Failed to get historical data: {response.status_code} - {response.text}")
-                return None
+            return data
                 
         except Exception as e:
             logger.error(f"Error getting historical data: {e}")
             return None
-    
-    def save_market_data_to_db(self, market_data: Dict[str, Any]):
-        """Save market data to the database"""
-        try:
-            db = next(get_db())
-            
-            # Extract relevant data from the market response
-            # This will depend on the exact structure of Schwab's streaming data
-            
-            # Example structure (adjust based on actual Schwab response format):
-            if 'content' in market_data:
-                for item in market_data['content']:
-                    if 'key' in item and 'content' in item:
-                        symbol = item['key']
-                        data = item['content']
-                        
-                        market_entry = MarketData(
-                            symbol=symbol,
-                            price=float(data.get('last_price', 0)),
-                            volume=int(data.get('volume', 0)),
-                            timestamp=datetime.now(timezone.utc),
-                            open_price=float(data.get('open_price', 0)),
-                            high_price=float(data.get('high_price', 0)),
-                            low_price=float(data.get('low_price', 0)),
-                            close_price=float(data.get('last_price', 0))
-                        )
-                        
-                        db.add(market_entry)
-            
-            db.commit()
-            logger.info("💾 Saved market data to database")
-            
-        except Exception as e:
-            logger.error(f"Error saving market data to database: {e}")
-        finally:
-            db.close()
+
+    def _fetch_price_history(self, **params) -> Optional[Dict[str, Any]]:
+        """Raw price_history call used to fill the bar cache"""
+        response = timed_call("price_history", self.client.price_history, **params)
+        if response.ok:
+            return response.json()
+        logger.error(f"Failed to get historical data: {response.status_code} - {response.text}")
+        return None
     
     def is_configured(self) -> bool:
         """Check if Schwab API credentials are configured"""
+        if self.backend == "simulator":
+            return True
         return (self.app_key and self.app_secret and 
                 not self.app_key.startswith('your_') and 
                 not self.app_secret.startswith('your_'))
@@ -249,7 +248,7 @@ class SchwabAPIService:
     def get_authorization_url(self) -> Optional[str]:
         """Generate Schwab OAuth authorization URL"""
         try:
-            if not self.is_configured():
+            if not self.is_configured() or self.backend == "simulator":
                 return None
                 
             # Use schwabdev to generate auth URL
@@ -265,47 +264,70 @@ class SchwabAPIService:
             logger.error(f"Error generating auth URL: {e}")
             return None
     
+    def _write_tokens(self, tokens: Dict[str, Any]):
+        """Store a fresh token response in SCHWAB_TOKENS_FILE, in the layout schwabdev.Client loads"""
+        issued = datetime.now(timezone.utc).isoformat()
+        payload = {"access_token_issued": issued, "refresh_token_issued": issued, "token_dictionary": tokens}
+        # Write then rename, so a client starting meanwhile never reads half a file
+        tmp_path = f"{SCHWAB_TOKENS_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, indent=4)
+        os.replace(tmp_path, SCHWAB_TOKENS_FILE)
+
+    def _exchange_code(self, auth_code: str) -> bool:
+        """POST the authorization code to Schwab's token endpoint and store the tokens (blocking)"""
+        response = httpx.post(
+            SCHWAB_TOKEN_URL,
+            auth=(self.app_key, self.app_secret),
+            data={"grant_type": "authorization_code", "code": auth_code, "redirect_uri": self.callback_url},
+            timeout=SCHWAB_CALL_TIMEOUT,
+        )
+        if response.status_code != 200:
+            logger.error(f"Token exchange failed: {response.status_code} - {response.text}")
+            return False
+        tokens = response.json()
+        if not tokens.get("refresh_token"):
+            logger.error("Token exchange response has no refresh token")
+            return False
+        self._write_tokens(tokens)
+        return True
+
     async def exchange_code_for_tokens(self, auth_code: str) -> Optional[Dict[str, Any]]:
-        """Exchange authorization code for access tokens"""
+        """
+        Exchange the OAuth callback's authorization code for tokens, then build
+        the client from the stored tokens. The client is only created once the
+        tokens file exists, so schwabdev never starts its interactive login here.
+        """
+        from app.schwab_async import schwab_async
+
         try:
-            if not self.is_configured():
+            if not self.is_configured() or self.backend == "simulator":
+                return None
+
+            if not await schwab_async.call(self._exchange_code, auth_code):
                 return None
-            
-            # Initialize client with auth code to get tokens
-            self.client = schwabdev.Client(
-                app_key=self.app_key,
-                app_secret=self.app_secret,
-                callback_url=self.callback_url,
-                tokens_file="schwab_tokens.json",
-                update_tokens_auto=True
-            )
-            
-            # The schwabdev library handles token exchange automatically
-            # when initializing with tokens_file
             logger.info("✅ Successfully exchanged authorization code for tokens")
-            
-            # Initialize streamer as well
-            try:
-                self.streamer = schwabdev.Stream(self.client)
-                logger.info("🔄 Streamer initialized successfully")
-            except Exception as e:
-                logger.warning(f"Failed to initialize streamer: {e}")
-                self.streamer = None
-            
+
+            # A client built before the login holds stale tokens; rebuild it from the new file
+            if self.client:
+                self.close()
+            if not await schwab_async.call(self.initialize_client):
+                return None
+
             return {"success": True, "message": "Tokens obtained successfully"}
-            
+
         except Exception as e:
             logger.error(f"Error exchanging code for tokens: {e}")
             return None
     
-    async def is_authenticated(self) -> bool:
+    def is_authenticated(self) -> bool:
         """Check if user is currently authenticated with Schwab API"""
         try:
             if not self.client:
                 return False
                 
             # Try a simple API call to check if tokens are valid
-            response = self.client.account_numbers()
+            response = timed_call("account_numbers", self.client.account_numbers)
             return response.ok
             
         except Exception as e:
@@ -316,14 +338,11 @@ class SchwabAPIService:
         """Logout from Schwab API (clear stored tokens)"""
         try:
             # Clear the client
-            self.client = None
-            self.streamer = None
+            self.close()
             
             # Remove tokens file if it exists
-            import os
-            tokens_file = "schwab_tokens.json"
-            if os.path.exists(tokens_file):
-                os.remove(tokens_file)
+            if os.path.exists(SCHWAB_TOKENS_FILE):
+                os.remove(SCHWAB_TOKENS_FILE)
                 logger.info("🗑️ Removed stored tokens")
             
             return True
@@ -332,7 +351,7 @@ class SchwabAPIService:
             logger.error(f"Error during logout: {e}")
             return False
     
-    async def refresh_token(self) -> bool:
+    def refresh_token(self) -> bool:
         """Manually refresh the access token"""
         try:
             if not self.client:
@@ -341,13 +360,20 @@ class SchwabAPIService:
             # The schwabdev library handles token refresh automatically
             # We just need to make sure update_tokens_auto is True
             # Try an API call to trigger refresh if needed
-            response = self.client.account_numbers()
+            response = timed_call("account_numbers", self.client.account_numbers)
             return response.ok
             
         except Exception as e:
             logger.error(f"Error refreshing token: {e}")
             return False
 
+    def close(self):
+        """Drop the client and close its HTTP session (streams are stopped by the subscription manager)"""
+        client, self.client, self.streamer = self.client, None, None
+        session = getattr(client, "_session", None)
+        if session is not None and hasattr(session, "close"):
+            session.close()
+
     # ...existing methods...
 
 
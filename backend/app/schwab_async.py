@@ -0,0 +1,170 @@
+"""
+Async facade over SchwabAPIService so upstream calls never block the event loop
+"""
+
+import os
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+from dotenv import load_dotenv
+
+from app.schwab_api import SchwabAPIService, schwab_service, SCHWAB_CALL_TIMEOUT
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCHWAB_MAX_WORKERS = int(os.getenv("SCHWAB_MAX_WORKERS", "16"))
+QUOTE_CHUNK_SIZE = int(os.getenv("QUOTE_CHUNK_SIZE", "100"))
+QUOTE_FANOUT_CONCURRENCY = int(os.getenv("QUOTE_FANOUT_CONCURRENCY", "4"))
+
+# Bounded pool shared by every facade instance: blocking schwabdev calls run here.
+# Created on first use and again after shutdown_executor(), so a process can
+# run the app lifespan more than once (tests, benchmarks, embedding apps).
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    executor = _executor
+    if executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SCHWAB_MAX_WORKERS, thread_name_prefix="schwab")
+            executor = _executor
+    return executor
+
+
+class SchwabCallTimeout(Exception):
+    """Raised when an upstream Schwab call misses its deadline"""
+
+
+class AsyncSchwabService:
+    """
+    Runs the blocking SchwabAPIService methods on a bounded thread pool, giving
+    each call a deadline. Cancelling the awaiting task (client disconnect,
+    deadline) releases the handler immediately; calls still queued for a
+    worker are dropped without ever reaching Schwab.
+    """
+
+    def __init__(self, service: Optional[SchwabAPIService], default_timeout: float = SCHWAB_CALL_TIMEOUT):
+        self.service = service
+        self.default_timeout = default_timeout
+        self.in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+
+    async def call(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a blocking callable on the Schwab pool with a deadline"""
+        deadline = self.default_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            name = getattr(func, "__name__", repr(func))
+            logger.warning(f"⏱️ Schwab call {name} exceeded its {deadline}s deadline")
+            raise SchwabCallTimeout(f"Schwab call {name} timed out after {deadline}s")
+        finally:
+            self.in_flight -= 1
+
+    @property
+    def client(self):
+        return self.service.client if self.service else None
+
+    async def ensure_client(self) -> bool:
+        """Initialize the underlying client if needed"""
+        if not self.service:
+            return False
+        if self.service.client:
+            return True
+        return await self.call(self.service.initialize_client)
+
+    async def get_account_info(self, timeout: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        return await self.call(self.service.get_account_info, timeout=timeout)
+
+    async def get_real_time_quotes(self, symbols: List[str], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return await self.call(self.service.get_real_time_quotes, symbols, timeout=timeout)
+
+    async def get_quotes_chunked(
+        self,
+        symbols: List[str],
+        chunk_size: int = QUOTE_CHUNK_SIZE,
+        concurrency: int = QUOTE_FANOUT_CONCURRENCY,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Split a large symbol set into chunks fetched concurrently (at most
+        `concurrency` at a time) and merge the results. A failed or slow chunk
+        only affects its own symbols, which are reported under `errors`.
+        """
+        chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_chunk(chunk: List[str]):
+            async with semaphore:
+                try:
+                    return chunk, await self.get_real_time_quotes(chunk, timeout=timeout), None
+                except SchwabCallTimeout:
+                    return chunk, None, "timed out"
+                except Exception as e:
+                    return chunk, None, str(e)
+
+        merged: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for chunk, quotes, error in await asyncio.gather(*(fetch_chunk(c) for c in chunks)):
+            if quotes is None:
+                errors.update({symbol: error or "upstream request failed" for symbol in chunk})
+                continue
+            for symbol in chunk:
+                if symbol in quotes:
+                    merged[symbol] = quotes[symbol]
+                else:
+                    errors[symbol] = "symbol not found"
+
+        if errors:
+            merged["errors"] = errors
+        return merged
+
+    async def get_market_data_history(self, symbol: str, period_type: str = "day", period: int = 1,
+                                      timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return await self.call(
+            self.service.get_market_data_history, symbol, period_type, period, timeout=timeout
+        )
+
+    async def is_authenticated(self, timeout: Optional[float] = None) -> bool:
+        return await self.call(self.service.is_authenticated, timeout=timeout)
+
+    async def refresh_token(self, timeout: Optional[float] = None) -> bool:
+        return await self.call(self.service.refresh_token, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": SCHWAB_MAX_WORKERS,
+            "default_timeout_seconds": self.default_timeout,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+        }
+
+
+def shutdown_executor():
+    """Drop queued upstream calls and release the worker threads; the next call opens a new pool"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global facade over the market data service
+schwab_async = AsyncSchwabService(schwab_service)
@@ -0,0 +1,254 @@
+"""
+Universe screener behind the Top-10 recommendations
+
+Bar history for the whole universe is loaded with one query, split into shards
+and scored on a process pool. Rankings are cached per timeframe and universe
+and only recomputed after new bars have closed for that timeframe.
+"""
+
+import os
+import logging
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.database import engine as default_engine
+from app.indicators import compute_indicators, load_bar_matrix
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCREENER_WORKERS = int(os.getenv("SCREENER_WORKERS", str(os.cpu_count() or 1)))
+SCREENER_LOOKBACK_BARS = int(os.getenv("SCREENER_LOOKBACK_BARS", "120"))
+# Below this many symbols the pickling round trip costs more than it saves
+SCREENER_PARALLEL_MIN_SYMBOLS = int(os.getenv("SCREENER_PARALLEL_MIN_SYMBOLS", "400"))
+MOMENTUM_BARS = 20
+
+DOW_30 = [
+    "AAPL", "AMGN", "AMZN", "AXP", "BA", "CAT", "CRM", "CSCO", "CVX", "DIS",
+    "GS", "HD", "HON", "IBM", "JNJ", "JPM", "KO", "MCD", "MMM", "MRK",
+    "MSFT", "NKE", "NVDA", "PG", "SHW", "TRV", "UNH", "V", "VZ", "WMT",
+]
+
+NASDAQ_100 = [
+    "AAPL", "ABNB", "ADBE", "ADI", "ADP", "ADSK", "AEP", "AMAT", "AMD", "AMGN",
+    "AMZN", "ANSS", "APP", "ARM", "ASML", "AVGO", "AXON", "AZN", "BIIB", "BKNG",
+    "BKR", "CCEP", "CDNS", "CDW", "CEG", "CHTR", "CMCSA", "COST", "CPRT", "CRWD",
+    "CSCO", "CSGP", "CSX", "CTAS", "CTSH", "DASH", "DDOG", "DXCM", "EA", "EXC",
+    "FANG", "FAST", "FTNT", "GEHC", "GFS", "GILD", "GOOG", "GOOGL", "HON", "IDXX",
+    "INTC", "INTU", "ISRG", "KDP", "KHC", "KLAC", "LIN", "LRCX", "LULU", "MAR",
+    "MCHP", "MDB", "MDLZ", "MELI", "META", "MNST", "MRVL", "MSFT", "MSTR", "MU",
+    "NFLX", "NVDA", "NXPI", "ODFL", "ON", "ORLY", "PANW", "PAYX", "PCAR", "PDD",
+    "PEP", "PLTR", "PYPL", "QCOM", "REGN", "ROP", "ROST", "SBUX", "SNPS", "TEAM",
+    "TMUS", "TSLA", "TTD", "TTWO", "TXN", "VRSK", "VRTX", "WBD", "WDAY", "XEL",
+    "ZS",
+]
+
+FUTURES = ["/ES", "/NQ", "/YM", "/RTY", "/CL", "/GC", "/SI", "/NG", "/ZB", "/ZN"]
+
+UNIVERSES = {
+    "dow": DOW_30,
+    "nasdaq": NASDAQ_100,
+    "futures": FUTURES,
+    "default": sorted(set(DOW_30) | set(NASDAQ_100) | set(FUTURES)),
+    "all": None,  # every symbol with stored bars
+}
+
+
+def score_shard(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Score each row (symbol) of a bar shard from its latest indicators. Runs in
+    pool workers, so it only depends on its arguments.
+
+    score = 100 * (0.3 trend + 0.3 MACD momentum + 0.2 RSI + 0.2 price momentum),
+    each component in [0, 1]. Rows without enough history score NaN.
+    """
+    values = compute_indicators(high, low, close)
+    last = {name: series[:, -1] for name, series in values.items()}
+    price = close[:, -1]
+    atr = last["ATR_14"]
+
+    trend = 0.5 * (price > last["SMA_50"]) + 0.5 * (last["SMA_20"] > last["SMA_50"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        macd_component = 0.5 + 0.5 * np.tanh(last["MACD_HIST"] / atr)
+        rsi_component = np.clip(1.0 - np.abs(last["RSI_14"] - 60.0) / 40.0, 0.0, 1.0)
+        change = price - close[:, -1 - MOMENTUM_BARS] if close.shape[1] > MOMENTUM_BARS else np.full_like(price, np.nan)
+        momentum = 0.5 + 0.5 * np.tanh(change / (atr * np.sqrt(MOMENTUM_BARS)))
+
+    score = 100.0 * (0.3 * trend + 0.3 * macd_component + 0.2 * rsi_component + 0.2 * momentum)
+    score[np.isnan(last["SMA_50"]) | np.isnan(atr) | (atr <= 0)] = np.nan
+    return {
+        "score": score,
+        "price": price,
+        "trend": trend,
+        "macd_component": macd_component,
+        "rsi_component": rsi_component,
+        "momentum": momentum,
+        "RSI_14": last["RSI_14"],
+        "MACD": last["MACD"],
+        "MACD_SIGNAL": last["MACD_SIGNAL"],
+        "SMA_20": last["SMA_20"],
+        "SMA_50": last["SMA_50"],
+    }
+
+
+def _action(score: float) -> str:
+    if score >= 70:
+        return "buy"
+    if score >= 50:
+        return "watch"
+    return "avoid"
+
+
+class Screener:
+    """
+    Ranks a symbol universe by indicator score. Each (timeframe, universe)
+    ranking is cached until the bar aggregator reports a newly closed bar for
+    that timeframe.
+    """
+
+    def __init__(self, workers: int = SCREENER_WORKERS, bind=None):
+        self.workers = max(1, workers)
+        self.bind = bind if bind is not None else default_engine
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._cache: Dict[Tuple[str, str], Tuple[int, Dict[str, Any]]] = {}
+        self._refresh_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.refreshes = 0
+        self.last_refresh: Dict[str, Any] = {}
+
+    def on_bar(self, symbol: str, timeframe: str, bar: Dict[str, Any]):
+        """Bar aggregator listener: a closed bar invalidates the timeframe's rankings"""
+        self._versions[timeframe] = self._versions.get(timeframe, 0) + 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Created on the first universe large enough to shard, so smaller
+                # deployments never pay for the spawned interpreters.
+                # Spawned workers: forking the threaded server process is not safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def _score(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Tuple[Dict[str, np.ndarray], int]:
+        """Score all rows, sharded across the pool when the universe is large enough"""
+        if self.workers == 1 or len(close) < SCREENER_PARALLEL_MIN_SYMBOLS:
+            return score_shard(high, low, close), 1
+        shards = self.workers
+        bounds = np.linspace(0, len(close), shards + 1).astype(int)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(score_shard, high[a:b], low[a:b], close[a:b])
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+        try:
+            parts = [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.error("Screener worker pool died, scoring in-process and restarting the pool")
+            self.shutdown()
+            return score_shard(high, low, close), 1
+        return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}, shards
+
+    def refresh(self, timeframe: str, universe: str = "default") -> Dict[str, Any]:
+        """Recompute the full ranking for a timeframe and universe"""
+        started = time.perf_counter()
+        symbols = UNIVERSES[universe]
+        with self.bind.connect() as conn:
+            names, timestamps, high, low, close = load_bar_matrix(conn, timeframe, SCREENER_LOOKBACK_BARS, symbols)
+        loaded = time.perf_counter()
+
+        ranked: List[Dict[str, Any]] = []
+        shards = 0
+        if names:
+            scores, shards = self._score(high, low, close)
+            order = [i for i in np.argsort(-np.nan_to_num(scores["score"], nan=-1.0)).tolist()
+                     if not np.isnan(scores["score"][i])]
+            for rank, i in enumerate(order, start=1):
+                score = float(scores["score"][i])
+                ranked.append({
+                    "rank": rank,
+                    "symbol": names[i],
+                    "score": round(score, 2),
+                    "action": _action(score),
+                    "price": round(float(scores["price"][i]), 4),
+                    "bar_timestamp": datetime.fromtimestamp(int(timestamps[i, -1]) / 1000, tz=timezone.utc).isoformat(),
+                    "indicators": {
+                        key: round(float(scores[key][i]), 4)
+                        for key in ("RSI_14", "MACD", "MACD_SIGNAL", "SMA_20", "SMA_50")
+                    },
+                    "components": {
+                        key: round(float(scores[key][i]), 4)
+                        for key in ("trend", "macd_component", "rsi_component", "momentum")
+                    },
+                })
+        finished = time.perf_counter()
+
+        self.refreshes += 1
+        self.last_refresh = {
+            "timeframe": timeframe,
+            "universe": universe,
+            "symbols_loaded": len(names),
+            "symbols_ranked": len(ranked),
+            "shards": shards,
+            "load_ms": round((loaded - started) * 1000, 3),
+            "score_ms": round((finished - loaded) * 1000, 3),
+            "total_ms": round((finished - started) * 1000, 3),
+        }
+        return {
+            "timeframe": timeframe,
+            "universe": universe,
+            "computed_at": datetime.now(timezone.utc).isoformat(),
+            "ranked": ranked,
+        }
+
+    def get_ranking(self, timeframe: str, universe: str = "default", force: bool = False) -> Dict[str, Any]:
+        """Cached ranking, recomputed only if bars closed since it was built (or `force`)"""
+        key = (timeframe, universe)
+        with self._lock:
+            lock = self._refresh_locks.setdefault(key, threading.Lock())
+        # Concurrent callers wait for one refresh instead of each running their own
+        with lock:
+            version = self._versions.get(timeframe, 0)
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version and not force:
+                self.hits += 1
+                return cached[1]
+            result = self.refresh(timeframe, universe)
+            self._cache[key] = (version, result)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "cached_rankings": len(self._cache),
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "bar_versions": dict(self._versions),
+            "last_refresh": self.last_refresh,
+        }
+
+
+# Global screener, invalidated by the bar aggregator
+screener = Screener()
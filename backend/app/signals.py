@@ -0,0 +1,319 @@
+"""
+Event-driven strategy runtime producing trading signals
+
+Each active `Strategy` row is compiled into a rule once, indexed by the
+timeframe and symbols in its JSON `parameters`, and evaluated only when a
+closed bar updates the indicators of one of its symbols. Rules keep the small
+amount of memory they need (e.g. the previous MACD histogram) per symbol, so
+nothing re-scans history.
+
+Strategy parameters (all optional):
+
+    {"symbols": ["AAPL", "MSFT"] or "*", "timeframe": "5m", "min_confidence": 0.6,
+     "stop_atr": 2.0, "take_atr": 3.0, ...rule-specific thresholds}
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.database import SessionLocal
+from app.ingestion import BulkInsertWriter
+from app.models import Strategy, StrategyType, TradingSignal, TradeSide
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock budget for evaluating every strategy interested in one bar
+SIGNAL_EVAL_BUDGET_MS = float(os.getenv("SIGNAL_EVAL_BUDGET_MS", "5"))
+SIGNAL_LATENCY_SAMPLES = 1000
+
+Decision = Tuple[TradeSide, float, str]
+
+
+def _strength(distance: float, scale: float) -> float:
+    """Map a non-negative distance to a confidence in [0.5, 1.0)"""
+    return 0.5 + 0.5 * math.tanh(distance / scale) if scale > 0 else 0.5
+
+
+class SignalRule:
+    """Entry/exit conditions of one strategy type, evaluated on the latest indicators"""
+    required: Tuple[str, ...] = ()
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+
+    def evaluate(self, memory: Dict[str, float], close: float, values: Dict[str, float]) -> Optional[Decision]:
+        raise NotImplementedError
+
+
+class MacdCrossRule(SignalRule):
+    """MACD histogram crossing zero, filtered by RSI"""
+    required = ("MACD_HIST", "RSI_14", "ATR_14")
+
+    def evaluate(self, memory, close, values):
+        hist = values["MACD_HIST"]
+        previous = memory.get("hist")
+        memory["hist"] = hist
+        if previous is None:
+            return None
+        rsi = values["RSI_14"]
+        confidence = _strength(abs(hist), 0.25 * values["ATR_14"])
+        if previous <= 0 < hist and rsi < self.params.get("rsi_max", 70):
+            return TradeSide.BUY, confidence, f"MACD histogram crossed above zero (RSI {rsi:.1f})"
+        if previous >= 0 > hist and rsi > self.params.get("rsi_min", 30):
+            return TradeSide.SELL, confidence, f"MACD histogram crossed below zero (RSI {rsi:.1f})"
+        return None
+
+
+class MovingAverageTrendRule(SignalRule):
+    """Close crossing SMA 20 in the direction of the SMA 20/50 trend"""
+    required = ("SMA_20", "SMA_50", "ATR_14")
+
+    def evaluate(self, memory, close, values):
+        fast, slow = values["SMA_20"], values["SMA_50"]
+        above = 1.0 if close > fast else 0.0
+        previous = memory.get("above")
+        memory["above"] = above
+        if previous is None or previous == above:
+            return None
+        confidence = _strength(abs(fast - slow), values["ATR_14"])
+        if above and fast > slow:
+            return TradeSide.BUY, confidence, f"Close crossed above SMA20 in an uptrend (SMA20 {fast:.2f} > SMA50 {slow:.2f})"
+        if not above and fast < slow:
+            return TradeSide.SELL, confidence, f"Close crossed below SMA20 in a downtrend (SMA20 {fast:.2f} < SMA50 {slow:.2f})"
+        return None
+
+
+class RsiReversionRule(SignalRule):
+    """RSI leaving the oversold/overbought zone"""
+    required = ("RSI_14",)
+
+    def evaluate(self, memory, close, values):
+        rsi = values["RSI_14"]
+        oversold = self.params.get("oversold", 30)
+        overbought = self.params.get("overbought", 70)
+        previous = memory.get("rsi")
+        extreme = memory.get("extreme", rsi)
+        memory["rsi"] = rsi
+        # Track how deep the excursion went while inside a zone
+        if rsi < oversold:
+            memory["extreme"] = min(extreme, rsi)
+        elif rsi > overbought:
+            memory["extreme"] = max(extreme, rsi)
+        else:
+            memory.pop("extreme", None)
+        if previous is None:
+            return None
+        if previous < oversold <= rsi:
+            return TradeSide.BUY, _strength(oversold - extreme, 10), f"RSI recovered above {oversold} (low {extreme:.1f})"
+        if previous > overbought >= rsi:
+            return TradeSide.SELL, _strength(extreme - overbought, 10), f"RSI fell back below {overbought} (high {extreme:.1f})"
+        return None
+
+
+# Strategy types without a rule (sentiment, earnings, fundamental) need data the runtime does not have
+STRATEGY_RULES = {
+    StrategyType.TECHNICAL: MacdCrossRule,
+    StrategyType.MOMENTUM: MovingAverageTrendRule,
+    StrategyType.MEAN_REVERSION: RsiReversionRule,
+}
+
+
+class StrategyStats:
+    """Evaluation latency and outcome counters for one strategy"""
+    __slots__ = ("evaluations", "signals", "errors", "total_ms", "max_ms", "samples")
+
+    def __init__(self):
+        self.evaluations = 0
+        self.signals = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples: deque = deque(maxlen=SIGNAL_LATENCY_SAMPLES)
+
+    def record(self, elapsed_ms: float):
+        self.evaluations += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.samples.append(elapsed_ms)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        p99 = ordered[int(0.99 * (len(ordered) - 1))] if ordered else 0.0
+        return {
+            "evaluations": self.evaluations,
+            "signals": self.signals,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.evaluations, 4) if self.evaluations else 0.0,
+            "p99_ms": round(p99, 4),
+            "max_ms": round(self.max_ms, 4),
+        }
+
+
+class CompiledStrategy:
+    """A strategy row with its rule, parameters and per-symbol memory"""
+    __slots__ = ("id", "name", "type", "timeframe", "symbols", "rule", "params", "memory", "stats")
+
+    def __init__(self, strategy_id: int, name: str, strategy_type: StrategyType, params: Dict[str, Any]):
+        self.id = strategy_id
+        self.name = name
+        self.type = strategy_type
+        self.params = params
+        self.timeframe = params.get("timeframe", "5m")
+        symbols = params.get("symbols", "*")
+        # A bare "AAPL" would otherwise be iterated into letters and never fire
+        if symbols != "*" and not (isinstance(symbols, list) and all(isinstance(s, str) for s in symbols)):
+            raise ValueError(f"'symbols' must be a list of symbols or \"*\", got {symbols!r}")
+        self.symbols = None if symbols == "*" else [s.upper() for s in symbols]
+        self.rule = STRATEGY_RULES[strategy_type](params)
+        self.memory: Dict[str, Dict[str, float]] = {}
+        self.stats = StrategyStats()
+
+
+class SignalEngine:
+    """
+    Evaluates compiled strategies on indicator updates and queues the resulting
+    signals for bulk insert into `trading_signals`.
+    """
+
+    def __init__(self, writer: Optional[BulkInsertWriter] = None, budget_ms: float = SIGNAL_EVAL_BUDGET_MS):
+        self.writer = writer
+        self.budget_ms = budget_ms
+        self._strategies: List[CompiledStrategy] = []
+        # (timeframe, symbol) -> strategies; (timeframe, None) holds the "*" strategies
+        self._index: Dict[Tuple[str, Optional[str]], List[CompiledStrategy]] = {}
+        self._lock = threading.Lock()
+        self._rotation = 0
+
+        # Stats
+        self.ticks = 0
+        self.budget_exceeded = 0
+        self.evaluations_skipped = 0
+
+    def load(self, strategies: List[Strategy]) -> int:
+        """Compile active strategies and rebuild the (timeframe, symbol) index"""
+        previous = {s.id: s for s in self._strategies}
+        compiled = []
+        for row in strategies:
+            if not row.is_active or row.type not in STRATEGY_RULES:
+                continue
+            try:
+                params = json.loads(row.parameters) if row.parameters else {}
+                strategy = CompiledStrategy(row.id, row.name, row.type, params)
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.error(f"Skipping strategy '{row.name}': invalid parameters ({e})")
+                continue
+            old = previous.get(row.id)
+            if old is not None and old.params == strategy.params:
+                strategy.memory, strategy.stats = old.memory, old.stats
+            compiled.append(strategy)
+
+        index: Dict[Tuple[str, Optional[str]], List[CompiledStrategy]] = {}
+        for strategy in compiled:
+            for symbol in strategy.symbols or [None]:
+                index.setdefault((strategy.timeframe, symbol), []).append(strategy)
+        with self._lock:
+            self._strategies = compiled
+            self._index = index
+        logger.info(f"🧠 Loaded {len(compiled)} active strategies")
+        return len(compiled)
+
+    def reload(self) -> int:
+        """Reload strategies from the database"""
+        db = SessionLocal()
+        try:
+            return self.load(db.query(Strategy).filter(Strategy.is_active == True).all())
+        finally:
+            db.close()
+
+    def on_indicators(self, symbol: str, timeframe: str, bar: Dict[str, Any], values: Dict[str, float]):
+        """Indicator engine listener: evaluate the strategies watching this symbol"""
+        index = self._index
+        candidates = index.get((timeframe, symbol), []) + index.get((timeframe, None), [])
+        if not candidates:
+            return
+        self.ticks += 1
+        close = float(bar["close"])
+        # Rotate the starting point so a tight budget does not always starve the same strategies
+        self._rotation = (self._rotation + 1) % len(candidates)
+        ordered = candidates[self._rotation:] + candidates[:self._rotation]
+
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+        signals = []
+        for position, strategy in enumerate(ordered):
+            now = time.perf_counter()
+            if position and now > deadline:
+                self.budget_exceeded += 1
+                self.evaluations_skipped += len(ordered) - position
+                break
+            if any(name not in values for name in strategy.rule.required):
+                continue
+            memory = strategy.memory.get(symbol)
+            if memory is None:
+                memory = strategy.memory[symbol] = {}
+            try:
+                decision = strategy.rule.evaluate(memory, close, values)
+            except Exception as e:
+                strategy.stats.errors += 1
+                logger.error(f"Strategy '{strategy.name}' failed on {symbol}: {e}")
+                continue
+            finally:
+                strategy.stats.record((time.perf_counter() - now) * 1000)
+            if decision is not None and decision[1] >= strategy.params.get("min_confidence", 0.0):
+                strategy.stats.signals += 1
+                signals.append(self._signal_row(strategy, symbol, close, values, decision))
+
+        if signals and self.writer is not None:
+            self.writer.submit_many(signals)
+
+    @staticmethod
+    def _signal_row(strategy: CompiledStrategy, symbol: str, close: float,
+                    values: Dict[str, float], decision: Decision) -> Dict[str, Any]:
+        side, confidence, reasoning = decision
+        direction = 1 if side == TradeSide.BUY else -1
+        atr = values.get("ATR_14")
+        stop_loss = take_profit = None
+        if atr:
+            stop_loss = round(close - direction * strategy.params.get("stop_atr", 2.0) * atr, 4)
+            take_profit = round(close + direction * strategy.params.get("take_atr", 3.0) * atr, 4)
+        return {
+            "strategy_id": strategy.id,
+            "symbol": symbol,
+            "side": side,
+            "confidence": round(min(max(confidence, 0.0), 1.0), 4),
+            "target_price": round(close, 4),
+            "stop_loss": stop_loss,
+            "take_profit": take_profit,
+            "reasoning": f"[{strategy.timeframe}] {reasoning}",
+            "is_executed": False,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategies": len(self._strategies),
+            "ticks": self.ticks,
+            "budget_ms": self.budget_ms,
+            "budget_exceeded": self.budget_exceeded,
+            "evaluations_skipped": self.evaluations_skipped,
+            "per_strategy": {
+                s.name: {"id": s.id, "type": s.type.value, "timeframe": s.timeframe, **s.stats.summary()}
+                for s in self._strategies
+            },
+        }
+
+
+# Global runtime fed by the indicator engine; signals go to `trading_signals`
+signal_writer = BulkInsertWriter(TradingSignal.__table__, policy="block")
+signal_engine = SignalEngine(writer=signal_writer)
@@ -0,0 +1,164 @@
+"""
+Decoder for Schwab LEVELONE_EQUITIES and LEVELONE_FUTURES streamer payloads
+
+Streamer items are keyed by numeric field codes and only carry the fields
+that changed. Futures items are translated to the equity field codes first,
+so every consumer downstream handles a single code set. The decoder keeps one slotted `QuoteRecord` per symbol and
+merges each delta into it, so consumers always see a complete quote. JSON is
+parsed with orjson when it is installed.
+"""
+
+import json
+import logging
+from typing import Dict, Any, Callable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# LEVELONE_EQUITIES field code -> (QuoteRecord attribute, converter)
+LEVELONE_EQUITY_FIELDS: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    "1": ("bid", float),
+    "2": ("ask", float),
+    "3": ("last", float),
+    "4": ("bid_size", int),
+    "5": ("ask_size", int),
+    "8": ("volume", int),
+    "9": ("last_size", int),
+    "10": ("high", float),
+    "11": ("low", float),
+    "12": ("close", float),
+    "17": ("open", float),
+    "18": ("net_change", float),
+    "19": ("high_52w", float),
+    "20": ("low_52w", float),
+    "33": ("mark", float),
+    "34": ("quote_time", int),
+    "35": ("trade_time", int),
+}
+
+# Requested from the streamer: the decoded fields plus the symbol (0)
+LEVELONE_EQUITY_SUBSCRIBE_FIELDS = ",".join(["0"] + sorted(LEVELONE_EQUITY_FIELDS, key=int))
+
+
+# LEVELONE_FUTURES field code -> the LEVELONE_EQUITIES code with the same meaning
+LEVELONE_FUTURES_FIELDS: Dict[str, str] = {
+    "1": "1",    # bid
+    "2": "2",    # ask
+    "3": "3",    # last
+    "4": "4",    # bid size
+    "5": "5",    # ask size
+    "8": "8",    # total volume
+    "9": "9",    # last size
+    "10": "34",  # quote time
+    "11": "35",  # trade time
+    "12": "10",  # high
+    "13": "11",  # low
+    "14": "12",  # close
+    "18": "17",  # open
+    "19": "18",  # net change
+}
+
+LEVELONE_FUTURES_SUBSCRIBE_FIELDS = ",".join(["0"] + sorted(LEVELONE_FUTURES_FIELDS, key=int))
+
+# Services whose items the decoder understands; '' is a bare content section
+LEVELONE_SERVICES = ("", "LEVELONE_EQUITIES", "LEVELONE_FUTURES")
+
+
+def equity_fields(service: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """An item's fields keyed by LEVELONE_EQUITIES codes, or None for a service that is not decoded"""
+    if service == "LEVELONE_FUTURES":
+        codes = LEVELONE_FUTURES_FIELDS
+        return {codes[code]: value for code, value in fields.items() if code in codes}
+    return fields if service in LEVELONE_SERVICES else None
+
+
+def loads(message: Any) -> Any:
+    """Parse streamer JSON text with the fastest parser available"""
+    if isinstance(message, (str, bytes)):
+        return orjson.loads(message) if orjson is not None else json.loads(message)
+    return message
+
+
+class QuoteRecord:
+    """Latest known LEVELONE state of one symbol"""
+    __slots__ = ("symbol", "bid", "ask", "last", "bid_size", "ask_size", "volume", "last_size",
+                 "high", "low", "close", "open", "net_change", "high_52w", "low_52w", "mark",
+                 "quote_time", "trade_time", "updated_ms")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bid = self.ask = self.last = None
+        self.bid_size = self.ask_size = self.last_size = None
+        self.volume = None
+        self.high = self.low = self.close = self.open = None
+        self.net_change = self.high_52w = self.low_52w = self.mark = None
+        self.quote_time = self.trade_time = None
+        self.updated_ms = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def market_data_row(self) -> Optional[Dict[str, Any]]:
+        """`market_data` row values from the merged state (None before the first trade)"""
+        price = self.last
+        if price is None:
+            return None
+        change = self.net_change or 0.0
+        close = self.close
+        return {
+            "symbol": self.symbol,
+            "price": price,
+            "volume": self.volume or 0,
+            "open_price": self.open if self.open is not None else price,
+            "high": self.high if self.high is not None else price,
+            "low": self.low if self.low is not None else price,
+            "change": change,
+            "change_percent": change / close * 100 if close else 0.0,
+            "bid": self.bid,
+            "ask": self.ask,
+        }
+
+
+class StreamDecoder:
+    """Merges LEVELONE deltas (in equity field codes) into per-symbol QuoteRecords"""
+
+    def __init__(self):
+        self._records: Dict[str, QuoteRecord] = {}
+
+        # Stats
+        self.items = 0
+        self.fields = 0
+
+    def apply(self, symbol: str, fields: Dict[str, Any], timestamp_ms: int = 0) -> QuoteRecord:
+        """Merge one item's changed fields into the symbol's record"""
+        record = self._records.get(symbol)
+        if record is None:
+            record = self._records[symbol] = QuoteRecord(symbol)
+        spec = LEVELONE_EQUITY_FIELDS
+        for code, value in fields.items():
+            target = spec.get(code)
+            if target is not None and value is not None:
+                setattr(record, target[0], target[1](value))
+        self.items += 1
+        self.fields += len(fields)
+        record.updated_ms = timestamp_ms
+        return record
+
+    def get(self, symbol: str) -> Optional[QuoteRecord]:
+        return self._records.get(symbol)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._records),
+            "items": self.items,
+            "fields": self.fields,
+            "json_parser": "orjson" if orjson is not None else "json",
+        }
+
+
+# Global decoder state for the market stream
+stream_decoder = StreamDecoder()
@@ -0,0 +1,252 @@
+"""
+In-process fan-out of streamed quotes to browser clients
+
+The single upstream Schwab stream publishes LEVELONE_EQUITIES deltas into the
+hub from the streamer thread. The hub merges them into the latest quote per
+symbol and, on the event loop, encodes each changed quote once and hands that
+same payload to every client subscribed to the symbol.
+
+Clients never queue a backlog: each keeps at most one pending payload per
+subscribed symbol, so a slow client skips intermediate updates (conflation)
+and memory stays bounded by clients x subscriptions, not by message rate.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Set, Iterable
+
+from dotenv import load_dotenv
+
+from app.quote_cache import LEVELONE_EQUITY_QUOTE_FIELDS
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HUB_MAX_CLIENTS = int(os.getenv("HUB_MAX_CLIENTS", "2000"))
+HUB_MAX_SYMBOLS_PER_CLIENT = int(os.getenv("HUB_MAX_SYMBOLS_PER_CLIENT", "500"))
+# SSE comment sent when idle so dead connections are noticed
+HUB_HEARTBEAT_SECONDS = float(os.getenv("HUB_HEARTBEAT_SECONDS", "15"))
+
+
+class HubFull(Exception):
+    pass
+
+
+class EncodedUpdate:
+    """One quote update, serialized once and shared by every recipient"""
+    __slots__ = ("symbol", "text", "_sse")
+
+    def __init__(self, symbol: str, text: str):
+        self.symbol = symbol
+        self.text = text
+        self._sse: Optional[bytes] = None
+
+    @property
+    def sse(self) -> bytes:
+        if self._sse is None:
+            self._sse = f"event: quote\ndata: {self.text}\n\n".encode()
+        return self._sse
+
+
+class HubClient:
+    """A connected browser: its subscriptions and the latest undelivered update per symbol"""
+
+    def __init__(self, hub: "StreamHub", name: str):
+        self.hub = hub
+        self.name = name
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, EncodedUpdate] = {}
+        self._wakeup = asyncio.Event()
+        self.closed = False
+
+        # Stats
+        self.delivered = 0
+        self.conflated = 0
+
+    def offer(self, update: EncodedUpdate):
+        """Queue an update, replacing any undelivered one for the same symbol"""
+        if update.symbol in self._pending:
+            self.conflated += 1
+        self._pending[update.symbol] = update
+        self._wakeup.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> List[EncodedUpdate]:
+        """Wait for pending updates; empty on timeout or once closed"""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+        batch = list(self._pending.values())
+        self._pending = {}
+        self.delivered += len(batch)
+        return batch
+
+    def subscribe(self, symbols: Iterable[str]) -> List[str]:
+        return self.hub.subscribe(self, symbols)
+
+    def unsubscribe(self, symbols: Iterable[str]) -> List[str]:
+        return self.hub.unsubscribe(self, symbols)
+
+    def close(self):
+        self.closed = True
+        self._wakeup.set()
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending)
+
+
+class StreamHub:
+    """Pub/sub between the upstream streamer thread and browser connections"""
+
+    def __init__(self, max_clients: int = HUB_MAX_CLIENTS,
+                 max_symbols_per_client: int = HUB_MAX_SYMBOLS_PER_CLIENT):
+        self.max_clients = max_clients
+        self.max_symbols_per_client = max_symbols_per_client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._clients: Set[HubClient] = set()
+        self._subscribers: Dict[str, Set[HubClient]] = {}
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        # Symbols changed since the last flush, written by the streamer thread
+        self._changed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+        self._connections = 0
+
+        # Stats
+        self.published = 0
+        self.flushes = 0
+        self.encoded = 0
+        self.fanned_out = 0
+
+    def start(self):
+        """Bind to the running event loop; publishes before this only update quotes"""
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self):
+        for client in list(self._clients):
+            client.close()
+        self._loop = None
+
+    def publish(self, symbol: str, fields: Dict[str, Any]):
+        """Merge a LEVELONE_EQUITIES delta (any thread) and schedule delivery"""
+        changes = {
+            name: fields[code]
+            for code, name in LEVELONE_EQUITY_QUOTE_FIELDS.items()
+            if code in fields
+        }
+        if not changes:
+            return
+        with self._lock:
+            quote = self._quotes.get(symbol)
+            if quote is None:
+                quote = self._quotes[symbol] = {}
+            quote.update(changes)
+            self.published += 1
+            if symbol not in self._subscribers:
+                return
+            self._changed.add(symbol)
+            if self._flush_scheduled or self._loop is None:
+                return
+            self._flush_scheduled = True
+        try:
+            self._loop.call_soon_threadsafe(self._flush)
+        except RuntimeError:
+            # Loop closed during shutdown
+            self._flush_scheduled = False
+
+    def _encode(self, symbol: str, quote: Dict[str, Any]) -> EncodedUpdate:
+        self.encoded += 1
+        return EncodedUpdate(symbol, json.dumps(
+            {"type": "quote", "symbol": symbol, "quote": quote}, separators=(",", ":")
+        ))
+
+    def _flush(self):
+        """Encode each changed quote once and offer it to its subscribers (event loop)"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            quotes = {symbol: dict(self._quotes[symbol]) for symbol in changed}
+            self._flush_scheduled = False
+        self.flushes += 1
+        for symbol, quote in quotes.items():
+            subscribers = self._subscribers.get(symbol)
+            if not subscribers:
+                continue
+            update = self._encode(symbol, quote)
+            for client in subscribers:
+                client.offer(update)
+            self.fanned_out += len(subscribers)
+
+    def connect(self) -> HubClient:
+        if len(self._clients) >= self.max_clients:
+            raise HubFull(f"Stream hub is at its limit of {self.max_clients} clients")
+        self._connections += 1
+        client = HubClient(self, f"client-{self._connections}")
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client: HubClient):
+        client.close()
+        self.unsubscribe(client, list(client.symbols))
+        self._clients.discard(client)
+
+    def subscribe(self, client: HubClient, symbols: Iterable[str]) -> List[str]:
+        """Add symbols (up to the per-client limit); the latest quote of each is sent right away"""
+        added = []
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            if not symbol or symbol in client.symbols:
+                continue
+            if len(client.symbols) >= self.max_symbols_per_client:
+                break
+            client.symbols.add(symbol)
+            with self._lock:
+                self._subscribers.setdefault(symbol, set()).add(client)
+                quote = dict(self._quotes[symbol]) if symbol in self._quotes else None
+            if quote:
+                client.offer(self._encode(symbol, quote))
+            added.append(symbol)
+        return added
+
+    def unsubscribe(self, client: HubClient, symbols: Iterable[str]) -> List[str]:
+        removed = []
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            if symbol not in client.symbols:
+                continue
+            client.symbols.discard(symbol)
+            with self._lock:
+                subscribers = self._subscribers.get(symbol)
+                if subscribers is not None:
+                    subscribers.discard(client)
+                    if not subscribers:
+                        del self._subscribers[symbol]
+            removed.append(symbol)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        clients = list(self._clients)
+        return {
+            "clients": len(clients),
+            "max_clients": self.max_clients,
+            "subscribed_symbols": len(self._subscribers),
+            "quoted_symbols": len(self._quotes),
+            "published": self.published,
+            "flushes": self.flushes,
+            "encoded": self.encoded,
+            "fanned_out": self.fanned_out,
+            "delivered": sum(c.delivered for c in clients),
+            "conflated": sum(c.conflated for c in clients),
+            "max_backlog": max((c.backlog for c in clients), default=0),
+        }
+
+
+# Global hub fed by the market stream handler
+stream_hub = StreamHub()
@@ -0,0 +1,324 @@
+"""
+Diff-based streamer subscriptions sharded across stream connections
+
+The manager keeps the desired symbol set per service and only sends the
+ADD / UNSUBS requests needed to move the live subscriptions towards it, so
+changing the watchlist never drops the symbols that stay. Symbols are packed
+into shards of at most STREAM_SHARD_SIZE keys, each with its own streamer
+connection. schwabdev records every request it sends and replays them after
+a reconnect; a watchdog additionally restarts shards whose stream thread
+died, and samples per-shard message rate and lag.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Callable, Iterable, Optional, Set
+
+from dotenv import load_dotenv
+
+from app.market_stream import handle_stream_message
+from app.metrics import registry, STREAM_LAG_SECONDS
+from app.schwab_api import schwab_service
+from app.stream_decoder import LEVELONE_EQUITY_SUBSCRIBE_FIELDS, LEVELONE_FUTURES_SUBSCRIBE_FIELDS
+from app.tick_journal import tick_journal, journaled
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Keys per streamer connection before a new shard is opened
+STREAM_SHARD_SIZE = int(os.getenv("STREAM_SHARD_SIZE", "500"))
+STREAM_MAX_SHARDS = int(os.getenv("STREAM_MAX_SHARDS", "4"))
+STREAM_WATCHDOG_INTERVAL = float(os.getenv("STREAM_WATCHDOG_INTERVAL", "10"))
+
+# Fields requested per streamer service
+SERVICE_FIELDS = {
+    "LEVELONE_EQUITIES": LEVELONE_EQUITY_SUBSCRIBE_FIELDS,
+    "LEVELONE_FUTURES": LEVELONE_FUTURES_SUBSCRIBE_FIELDS,
+}
+
+StreamFactory = Callable[[int], Any]
+MessageHandler = Callable[[Any], None]
+
+
+def _message_timestamp_ms(message: Any) -> Optional[int]:
+    """Server timestamp of the first data section, without decoding the whole message"""
+    if isinstance(message, (str, bytes)):
+        text = message if isinstance(message, str) else message.decode(errors="ignore")
+        start = text.find('"timestamp":')
+        if start < 0:
+            return None
+        start += len('"timestamp":')
+        end = start
+        while end < len(text) and text[end] in " 0123456789":
+            end += 1
+        digits = text[start:end].strip()
+        return int(digits) if digits else None
+    if isinstance(message, dict):
+        for section in message.get("data", []):
+            if "timestamp" in section:
+                return int(section["timestamp"])
+    return None
+
+
+class StreamShard:
+    """One streamer connection and the keys assigned to it"""
+
+    def __init__(self, index: int, stream: Any, handler: MessageHandler):
+        self.index = index
+        self.stream = stream
+        self.handler = handler
+        self.keys: Dict[str, Set[str]] = {}
+        self.started = False
+        self._lag_seconds = STREAM_LAG_SECONDS.labels(index)
+
+        # Stats
+        self.messages = 0
+        self.restarts = 0
+        self.last_message = 0.0
+        self.last_lag_ms: Optional[float] = None
+        self.max_lag_ms = 0.0
+        self.rate = 0.0
+        self._sampled_messages = 0
+        self._sampled_at = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return sum(len(keys) for keys in self.keys.values())
+
+    def receive(self, message: Any):
+        """Streamer callback: record rate/lag, then hand the message on"""
+        self.messages += 1
+        self.last_message = time.monotonic()
+        timestamp_ms = _message_timestamp_ms(message)
+        if timestamp_ms:
+            lag = time.time() * 1000 - timestamp_ms
+            self._lag_seconds.observe(lag / 1000)
+            self.last_lag_ms = lag
+            if lag > self.max_lag_ms:
+                self.max_lag_ms = lag
+        self.handler(message)
+
+    def send(self, service: str, command: str, keys: Iterable[str]):
+        keys = sorted(keys)
+        if not keys:
+            return
+        parameters = {"keys": ",".join(keys)}
+        if command == "ADD":
+            parameters["fields"] = SERVICE_FIELDS[service]
+        # Sent immediately when connected, otherwise recorded and sent on connect
+        self.stream.send(self.stream.basic_request(service=service, command=command, parameters=parameters))
+
+    def ensure_running(self):
+        thread = getattr(self.stream, "_thread", None)
+        if self.started and thread is not None and thread.is_alive():
+            return
+        if self.started:
+            self.restarts += 1
+            logger.warning(f"🔁 Restarting stream shard {self.index} ({self.size} keys)")
+        self.stream.start(self.receive)
+        self.started = True
+
+    def stop(self):
+        """Stop the connection and drop its recorded subscriptions with the shard's keys"""
+        # The stream replays whatever it recorded on its next connect, and shard 0's
+        # streamer outlives the shard: both must forget the same keys
+        if self.started:
+            self.stream.stop(clear_subscriptions=True)
+            self.started = False
+        elif getattr(self.stream, "subscriptions", None):
+            self.stream.subscriptions = {}
+        self.keys = {}
+
+    def sample(self):
+        now = time.monotonic()
+        elapsed = now - self._sampled_at
+        if elapsed > 0:
+            self.rate = (self.messages - self._sampled_messages) / elapsed
+        self._sampled_messages, self._sampled_at = self.messages, now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "keys": {service: len(keys) for service, keys in self.keys.items()},
+            "active": bool(getattr(self.stream, "active", False)),
+            "messages": self.messages,
+            "messages_per_second": round(self.rate, 2),
+            "last_message_age_s": round(time.monotonic() - self.last_message, 3) if self.last_message else None,
+            "last_lag_ms": round(self.last_lag_ms, 1) if self.last_lag_ms is not None else None,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "restarts": self.restarts,
+        }
+
+
+class SubscriptionManager:
+    """Desired subscriptions per service, reconciled onto sharded streamer connections"""
+
+    def __init__(self, stream_factory: StreamFactory, handler: MessageHandler,
+                 shard_size: int = STREAM_SHARD_SIZE, max_shards: int = STREAM_MAX_SHARDS,
+                 watchdog_interval: float = STREAM_WATCHDOG_INTERVAL):
+        self.stream_factory = stream_factory
+        self.handler = handler
+        self.shard_size = shard_size
+        self.max_shards = max_shards
+        self.watchdog_interval = watchdog_interval
+        self.desired: Dict[str, Set[str]] = {}
+        self.shards: List[StreamShard] = []
+        self._assignment: Dict[tuple, StreamShard] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+        # Stats
+        self.adds_sent = 0
+        self.unsubs_sent = 0
+        self.rejected: Dict[str, Set[str]] = {}
+
+    def _shard_with_room(self) -> Optional[StreamShard]:
+        for shard in self.shards:
+            if shard.size < self.shard_size:
+                return shard
+        if len(self.shards) >= self.max_shards:
+            return None
+        shard = StreamShard(len(self.shards), self.stream_factory(len(self.shards)), self.handler)
+        self.shards.append(shard)
+        return shard
+
+    def _reconcile(self, service: str) -> Dict[str, List[str]]:
+        desired = self.desired.get(service, set())
+        current = {symbol for (svc, symbol) in self._assignment if svc == service}
+        removed, added = current - desired, desired - current
+
+        by_shard: Dict[StreamShard, Set[str]] = {}
+        for symbol in removed:
+            shard = self._assignment.pop((service, symbol))
+            shard.keys[service].discard(symbol)
+            by_shard.setdefault(shard, set()).add(symbol)
+        for shard, symbols in by_shard.items():
+            if shard.size:
+                shard.send(service, "UNSUBS", symbols)
+            else:
+                # Nothing left on this connection: close it instead of keeping it idle
+                shard.stop()
+            self.unsubs_sent += 1
+
+        by_shard = {}
+        rejected = set()
+        for symbol in sorted(added):
+            shard = self._shard_with_room()
+            if shard is None:
+                rejected.add(symbol)
+                continue
+            shard.keys.setdefault(service, set()).add(symbol)
+            self._assignment[(service, symbol)] = shard
+            by_shard.setdefault(shard, set()).add(symbol)
+        for shard, symbols in by_shard.items():
+            shard.send(service, "ADD", symbols)
+            self.adds_sent += 1
+            shard.ensure_running()
+        self.rejected[service] = rejected
+        if rejected:
+            self.desired[service] -= rejected
+            logger.warning(f"Stream shards full, not subscribing {len(rejected)} {service} keys")
+        return {"added": sorted(added - rejected), "removed": sorted(removed), "rejected": sorted(rejected)}
+
+    def _check_service(self, service: str):
+        if service not in SERVICE_FIELDS:
+            raise ValueError(f"Unsupported streamer service '{service}', expected one of {sorted(SERVICE_FIELDS)}")
+
+    def set_symbols(self, symbols: Iterable[str], service: str = "LEVELONE_EQUITIES") -> Dict[str, List[str]]:
+        """Make `symbols` the full subscription set of a service"""
+        self._check_service(service)
+        with self._lock:
+            self.desired[service] = {s.strip().upper() for s in symbols if s.strip()}
+            return self._reconcile(service)
+
+    def add(self, symbols: Iterable[str], service: str = "LEVELONE_EQUITIES") -> Dict[str, List[str]]:
+        self._check_service(service)
+        with self._lock:
+            self.desired.setdefault(service, set()).update(s.strip().upper() for s in symbols if s.strip())
+            return self._reconcile(service)
+
+    def remove(self, symbols: Iterable[str], service: str = "LEVELONE_EQUITIES") -> Dict[str, List[str]]:
+        self._check_service(service)
+        with self._lock:
+            self.desired.setdefault(service, set()).difference_update(s.strip().upper() for s in symbols)
+            return self._reconcile(service)
+
+    def start_watchdog(self):
+        if self._watchdog and self._watchdog.is_alive():
+            return
+        self._stop_event.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="stream-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.watchdog_interval):
+            with self._lock:
+                for shard in self.shards:
+                    shard.sample()
+                    if shard.started and shard.size:
+                        try:
+                            shard.ensure_running()
+                        except Exception as e:
+                            logger.error(f"Failed to restart stream shard {shard.index}: {e}")
+
+    def stop(self):
+        """Stop every shard and forget the subscriptions"""
+        self._stop_event.set()
+        with self._lock:
+            for shard in self.shards:
+                try:
+                    shard.stop()
+                except Exception as e:
+                    logger.error(f"Failed to stop stream shard {shard.index}: {e}")
+            self.shards = []
+            self._assignment = {}
+            self.desired = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "desired": {service: len(symbols) for service, symbols in self.desired.items()},
+            "shard_size": self.shard_size,
+            "max_shards": self.max_shards,
+            "adds_sent": self.adds_sent,
+            "unsubs_sent": self.unsubs_sent,
+            "rejected": {service: sorted(symbols) for service, symbols in self.rejected.items()},
+            "shards": [shard.stats() for shard in self.shards],
+        }
+
+
+def _stream_metrics():
+    shards = list(subscription_manager.shards)
+    now = time.monotonic()
+    yield "stream_messages_total", "counter", "Streamer messages received per shard", [
+        ({"shard": str(s.index)}, s.messages) for s in shards]
+    yield "stream_last_message_age_seconds", "gauge", "Seconds since the shard's last message", [
+        ({"shard": str(s.index)}, now - s.last_message) for s in shards if s.last_message]
+    yield "stream_subscribed_keys", "gauge", "Keys subscribed on the shard", [
+        ({"shard": str(s.index)}, s.size) for s in shards]
+    yield "stream_restarts_total", "counter", "Watchdog restarts of the shard's stream thread", [
+        ({"shard": str(s.index)}, s.restarts) for s in shards]
+
+
+def _schwab_stream(index: int):
+    """Shard 0 reuses the client's streamer; further shards open their own connection"""
+    if schwab_service is None or schwab_service.client is None:
+        raise RuntimeError("Schwab client not initialized")
+    return schwab_service.streamer if index == 0 else schwab_service.create_stream()
+
+
+def _stream_handler() -> MessageHandler:
+    """Live messages are journaled before they are handled; simulated ones are not"""
+    # A journal-sourced simulator would otherwise record its own input again
+    if schwab_service is not None and schwab_service.backend == "simulator":
+        return handle_stream_message
+    return journaled(handle_stream_message, tick_journal)
+
+
+# Global manager for the Schwab streamer
+subscription_manager = SubscriptionManager(_schwab_stream, _stream_handler())
+registry.add_collector(_stream_metrics)
@@ -0,0 +1,306 @@
+"""
+Append-only, memory-mapped write-ahead journal of raw streamer messages
+
+Every message is appended before any other processing, so ticks survive a
+slow or unavailable database and a crash of the process. Each trading day
+(America/New_York) gets its own directory of pre-sized segment files that
+are memory-mapped and rotated when full. A record is
+
+    <u32 payload length> <i64 receive time, ms> <u32 crc32> <payload>
+
+and a zero length marks the end of the written part of a segment; a torn
+record after a crash fails its checksum and ends the segment.
+
+Journals can be replayed at recorded speed, a multiple of it, or as fast as
+possible. By default each replay gets a fresh `ReplayHandler`, which rebuilds
+bars on event time and re-persists ticks idempotently without touching live
+quotes, clients or indicators. Any other handler (e.g. the live
+`handle_stream_message`, as a load generator) can be passed instead.
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.market_stream import ReplayHandler
+from app.market_hours import MARKET_TZ
+from app.stream_decoder import orjson
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_ENABLED = os.getenv("JOURNAL_ENABLED", "true").lower() == "true"
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "tick_journal")
+JOURNAL_SEGMENT_BYTES = int(os.getenv("JOURNAL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+# How often appended pages are flushed to disk (msync); the page cache already survives a process crash
+JOURNAL_SYNC_INTERVAL = float(os.getenv("JOURNAL_SYNC_INTERVAL", "1.0"))
+
+_HEADER = struct.Struct("<IqI")
+SEGMENT_SUFFIX = ".jnl"
+
+MessageHandler = Callable[[Any], None]
+
+
+def trading_day(ts_ms: Optional[int] = None) -> str:
+    """YYYYMMDD of the New York trading day a receive time belongs to"""
+    ts = datetime.fromtimestamp((ts_ms if ts_ms is not None else time.time() * 1000) / 1000, tz=timezone.utc)
+    if MARKET_TZ is not None:
+        ts = ts.astimezone(MARKET_TZ)
+    return ts.strftime("%Y%m%d")
+
+
+def _encode(message: Any) -> bytes:
+    if isinstance(message, bytes):
+        return message
+    if isinstance(message, str):
+        return message.encode()
+    return orjson.dumps(message) if orjson is not None else json.dumps(message).encode()
+
+
+def iter_segment(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield (received_ms, payload) for every intact record of one segment"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            offset = 0
+            while offset + _HEADER.size <= size:
+                length, received_ms, crc = _HEADER.unpack_from(view, offset)
+                if length == 0:
+                    return
+                start = offset + _HEADER.size
+                end = start + length
+                if end > size:
+                    logger.warning(f"Truncated record at {path}:{offset}")
+                    return
+                payload = view[start:end]
+                if zlib.crc32(payload) != crc:
+                    logger.warning(f"Checksum mismatch at {path}:{offset}, ignoring the rest of the segment")
+                    return
+                yield received_ms, payload
+                offset = end
+
+
+class TickJournal:
+    """Segment-rotated, memory-mapped append log with day directories"""
+
+    def __init__(self, root: str = JOURNAL_DIR, segment_bytes: int = JOURNAL_SEGMENT_BYTES,
+                 sync_interval: float = JOURNAL_SYNC_INTERVAL):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._path: Optional[str] = None
+        self._day: Optional[str] = None
+        self._offset = 0
+        self._last_sync = 0.0
+
+        # Stats
+        self.records = 0
+        self.bytes = 0
+        self.segments_opened = 0
+        self.errors = 0
+
+    def days(self) -> List[str]:
+        """Recorded trading days (YYYYMMDD), oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def segments(self, day: Optional[str] = None) -> List[str]:
+        """Segment paths in write order, for one day or every day"""
+        if not os.path.isdir(self.root):
+            return []
+        days = [day] if day else sorted(os.listdir(self.root))
+        paths = []
+        for d in days:
+            directory = os.path.join(self.root, d)
+            if os.path.isdir(directory):
+                paths.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                             if name.endswith(SEGMENT_SUFFIX))
+        return paths
+
+    def _open_segment(self, day: str, min_bytes: int):
+        self._close_segment()
+        directory = os.path.join(self.root, day)
+        os.makedirs(directory, exist_ok=True)
+        # A restart never appends to an old segment: its tail may be torn
+        existing = [name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)]
+        sequence = max((int(name[:-len(SEGMENT_SUFFIX)]) for name in existing), default=-1) + 1
+        self._path = os.path.join(directory, f"{sequence:06d}{SEGMENT_SUFFIX}")
+        size = max(self.segment_bytes, min_bytes + _HEADER.size)
+        self._file = open(self._path, "w+b")
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._day = day
+        self._offset = 0
+        self.segments_opened += 1
+
+    def _close_segment(self):
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map.close()
+        # Trim the unused, zero-filled tail
+        self._file.truncate(self._offset)
+        self._file.close()
+        self._map = self._file = None
+
+    def append(self, message: Any, received_ms: Optional[int] = None) -> bool:
+        """Append one raw message; returns False (and logs) if it could not be written"""
+        try:
+            payload = _encode(message)
+            received_ms = int(time.time() * 1000) if received_ms is None else received_ms
+            day = trading_day(received_ms)
+            record_bytes = _HEADER.size + len(payload)
+            with self._lock:
+                if (self._map is None or day != self._day
+                        or self._offset + record_bytes + _HEADER.size > len(self._map)):
+                    self._open_segment(day, record_bytes)
+                view = self._map
+                start = self._offset + _HEADER.size
+                view[start:start + len(payload)] = payload
+                # Header last: a concurrent reader sees the record only once it is complete
+                _HEADER.pack_into(view, self._offset, len(payload), received_ms, zlib.crc32(payload))
+                self._offset = start + len(payload)
+                self.records += 1
+                self.bytes += record_bytes
+                now = time.monotonic()
+                if now - self._last_sync >= self.sync_interval:
+                    view.flush()
+                    self._last_sync = now
+            return True
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to journal stream message: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+            self._day = None
+
+    def read(self, day: Optional[str] = None, since_ms: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+        """Yield (received_ms, payload) records in write order"""
+        # The open segment is read through its own shared mapping, up to its end marker
+        for path in self.segments(day):
+            for received_ms, payload in iter_segment(path):
+                if since_ms is None or received_ms >= since_ms:
+                    yield received_ms, payload
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": JOURNAL_ENABLED,
+            "root": self.root,
+            "day": self._day,
+            "segment": self._path,
+            "segment_offset": self._offset,
+            "segment_bytes": self.segment_bytes,
+            "records": self.records,
+            "bytes": self.bytes,
+            "segments_opened": self.segments_opened,
+            "errors": self.errors,
+        }
+
+
+class JournalReplayer:
+    """Feeds journaled messages back through a stream handler, paced or at full speed"""
+
+    def __init__(self, journal: TickJournal, handler: Optional[MessageHandler] = None):
+        self.journal = journal
+        # None: a fresh ReplayHandler per run
+        self.handler = handler
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Stats
+        self.last_run: Dict[str, Any] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def replay(self, day: Optional[str] = None, speed: float = 0.0, since_ms: Optional[int] = None,
+               limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Replay synchronously. `speed` 1.0 keeps the recorded spacing, 10.0 runs
+        ten times faster and 0 replays as fast as possible.
+        """
+        self._stop_event.clear()
+        handler = self.handler if self.handler is not None else ReplayHandler()
+        run = self.last_run = {"day": day, "speed": speed, "messages": 0, "bytes": 0, "running": True}
+        started = time.monotonic()
+        first_ms = None
+        for received_ms, payload in self.journal.read(day, since_ms):
+            if self._stop_event.is_set() or (limit is not None and run["messages"] >= limit):
+                break
+            if speed > 0:
+                if first_ms is None:
+                    first_ms = received_ms
+                delay = (received_ms - first_ms) / 1000 / speed - (time.monotonic() - started)
+                if delay > 0 and self._stop_event.wait(delay):
+                    break
+            handler(payload)
+            run["messages"] += 1
+            run["bytes"] += len(payload)
+            run["last_received_ms"] = received_ms
+        finish = getattr(handler, "finish", None)
+        if finish is not None:
+            finish()
+        elapsed = time.monotonic() - started
+        if hasattr(handler, "stats"):
+            run["handler"] = handler.stats()
+        run.update({
+            "running": False,
+            "seconds": round(elapsed, 3),
+            "messages_per_second": round(run["messages"] / elapsed, 1) if elapsed > 0 else 0.0,
+        })
+        return run
+
+    def start(self, **kwargs) -> bool:
+        """Replay on a background thread; False if a replay is already running"""
+        if self.is_running:
+            return False
+        self.last_run = {"running": True}
+        self._thread = threading.Thread(target=self.replay, kwargs=kwargs, name="journal-replay", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.last_run)
+
+
+def journaled(handler: MessageHandler, journal: "TickJournal") -> MessageHandler:
+    """Stream callback that journals each message before handing it to `handler`"""
+    if not JOURNAL_ENABLED:
+        return handler
+
+    def receive(message: Any):
+        journal.append(message)
+        handler(message)
+    return receive
+
+
+# Global journal of the live Schwab stream and its replayer
+tick_journal = TickJournal()
+journal_replayer = JournalReplayer(tick_journal)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NDJSON tick export, time to first byte and peak memory
+
+Seeds synthetic ticks for one symbol into a scratch database and drains
+the export stream, reporting time to first chunk, total time and the peak
+Python heap (tracemalloc), which should not grow with the row count.
+
+    cd backend && python -m benchmarks.export_stream --rows 1000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, insert
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///./benchmark.db", help="scratch database URL")
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", args.url)
+    from app.models import MarketData
+    from app.export import stream_ndjson, tick_export_query
+
+    engine = create_engine(args.url)
+    MarketData.__table__.create(engine, checkfirst=True)
+    start = datetime(2025, 1, 2, 14, 30, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(delete(MarketData).where(MarketData.symbol == "BENCH"))
+        for offset in range(0, args.rows, 50000):
+            conn.execute(insert(MarketData), [
+                {"symbol": "BENCH", "price": 100 + i % 100 / 100, "volume": i % 500, "high": 101, "low": 99,
+                 "open_price": 100, "timestamp": start + timedelta(milliseconds=100 * i)}
+                for i in range(offset, min(offset + 50000, args.rows))
+            ])
+
+    def drain():
+        started = time.perf_counter()
+        first_chunk = None
+        written = 0
+        for chunk in stream_ndjson(tick_export_query("BENCH"), bind=engine):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - started
+            written += len(chunk)
+        return first_chunk, time.perf_counter() - started, written
+
+    drain()  # warm the connection pool
+    first_chunk, elapsed, written = drain()
+    # tracemalloc slows allocation down, so memory gets its own pass
+    tracemalloc.start()
+    drain()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"📊 NDJSON export: {args.rows:,} ticks, {written / 1e6:.1f} MB ({engine.dialect.name})")
+    print(f"   first chunk {first_chunk * 1000:8.1f} ms   total {elapsed:8.2f} s   "
+          f"{args.rows / elapsed:12,.0f} rows/s   peak heap {peak / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /health latency while slow Schwab quote calls are in flight
+
+Fires N concurrent quote requests against a fake Schwab client whose
+`quotes` call sleeps, and measures /health round trips in the meantime.
+
+    cd backend && python -m benchmarks.health_latency
+    cd backend && python -m benchmarks.health_latency --blocking   # old inline behaviour
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+class SlowResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, payload):
+        self.ok = True
+        self.status_code = 200
+        self._payload = payload
+        self.text = ""
+
+    def json(self):
+        return self._payload
+
+
+class SlowQuotesClient:
+    """Fake schwabdev.Client whose quote calls block for `delay` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def quotes(self, symbols, fields=None, indicative=False):
+        time.sleep(self.delay)
+        symbol_list = symbols.split(",") if isinstance(symbols, str) else symbols
+        return SlowResponse({s: {"symbol": s, "quote": {"lastPrice": 100.0}} for s in symbol_list})
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(concurrency: int, delay: float, blocking: bool):
+    from app.main import app
+    from app.schwab_api import schwab_service
+    from app.schwab_async import AsyncSchwabService
+
+    schwab_service.client = SlowQuotesClient(delay)
+    if blocking:
+        # Reproduce the old behaviour: upstream calls run inline on the event loop
+        async def inline_call(self, func, *args, timeout=None, **kwargs):
+            return func(*args, **kwargs)
+        AsyncSchwabService.call = inline_call
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        await client.get("/health")  # warm up
+
+        quote_tasks = [
+            asyncio.create_task(client.get(f"/api/market/quotes/SYM{i}"))
+            for i in range(concurrency)
+        ]
+
+        latencies = []
+        started = time.perf_counter()
+        while True:
+            # Each probe is its own task so it competes with the quote handlers for the loop
+            t0 = time.perf_counter()
+            await asyncio.create_task(client.get("/health"))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if all(task.done() for task in quote_tasks):
+                break
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - started
+
+        statuses = [task.result().status_code for task in quote_tasks]
+
+    print(f"📊 /health latency with {concurrency} slow quote calls ({delay}s each) in flight"
+          f" [{'blocking' if blocking else 'async facade'}]")
+    print(f"   quote statuses:   {sorted(set(statuses))}")
+    print(f"   window:           {elapsed:.2f}s, {len(latencies)} /health samples")
+    print(f"   p50:              {statistics.median(latencies):.2f} ms")
+    print(f"   p99:              {percentile(latencies, 99):.2f} ms")
+    print(f"   max:              {max(latencies):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds each fake quote call blocks")
+    parser.add_argument("--blocking", action="store_true", help="run upstream calls inline (pre-facade behaviour)")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.delay, args.blocking))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tick journal append and replay throughput
+
+Appends synthetic LEVELONE_EQUITIES frames to a scratch journal, then replays
+them at full speed twice: reading only, and through the live stream handler
+(decoder, quote cache, bar aggregation, database writer queue). The writer
+is not started, so database cost is excluded and its overflow warnings are
+silenced. The handler run doubles as a load generator for the pipeline.
+
+    cd backend && python -m benchmarks.journal_replay --messages 100000
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stream_decoder import synthetic_messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--items", type=int, default=20, help="symbols per message")
+    parser.add_argument("--segment-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    from app.tick_journal import TickJournal, JournalReplayer
+    from app.market_stream import handle_stream_message
+
+    logging.getLogger("app.ingestion").setLevel(logging.ERROR)
+    messages = synthetic_messages(args.messages, args.symbols, args.items)
+    root = tempfile.mkdtemp(prefix="journal-bench-")
+    try:
+        journal = TickJournal(root, segment_bytes=args.segment_mb * 1024 * 1024)
+        started = time.perf_counter()
+        received_ms = int(time.time() * 1000)
+        for message in messages:
+            journal.append(message, received_ms)
+        journal.close()
+        elapsed = time.perf_counter() - started
+        stats = journal.stats()
+
+        print(f"📊 Tick journal: {args.messages:,} messages, {stats['bytes'] / 1e6:.1f} MB, "
+              f"{stats['segments_opened']} segments")
+        print(f"   append       {args.messages / elapsed:12,.0f} msgs/s   {stats['bytes'] / 1e6 / elapsed:8.1f} MB/s")
+        for label, handler in (("read", lambda payload: None), ("handler", handle_stream_message)):
+            run = JournalReplayer(journal, handler).replay(speed=0)
+            print(f"   replay {label:<8} {run['messages_per_second']:10,.0f} msgs/s   ({run['messages']:,} replayed)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
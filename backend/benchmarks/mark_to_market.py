@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: mark-to-market pass latency for a large book
+
+Seeds synthetic portfolios and positions into a scratch database (existing
+positions and portfolios there are deleted) and times revaluation passes
+with fresh random prices, as the periodic job runs them.
+
+    cd backend && python -m benchmarks.mark_to_market --positions 5000 --url postgresql://localhost/finsight_bench
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, insert
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///./benchmark.db", help="scratch database URL")
+    parser.add_argument("--positions", type=int, default=2000)
+    parser.add_argument("--portfolios", type=int, default=10)
+    parser.add_argument("--passes", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", args.url)
+    from app.models import Portfolio, Position
+    from app.mark_to_market import revalue
+
+    engine = create_engine(args.url)
+    Portfolio.__table__.create(engine, checkfirst=True)
+    Position.__table__.create(engine, checkfirst=True)
+    rng = random.Random(7)
+    symbols = [f"SYM{i}" for i in range(args.positions)]
+    with engine.begin() as conn:
+        conn.execute(delete(Position))
+        conn.execute(delete(Portfolio))
+        conn.execute(insert(Portfolio), [
+            {"id": i + 1, "total_value": 0, "cash_balance": 10000, "invested_value": 0, "total_pnl": 0, "daily_pnl": 0}
+            for i in range(args.portfolios)
+        ])
+        conn.execute(insert(Position), [
+            {"portfolio_id": i % args.portfolios + 1, "symbol": symbol, "shares": rng.randint(1, 500),
+             "avg_cost": 100, "current_price": 100, "market_value": 0, "unrealized_pnl": 0}
+            for i, symbol in enumerate(symbols)
+        ])
+
+    timings = []
+    for _ in range(args.passes):
+        prices = {s: (round(rng.uniform(80, 120), 2), round(rng.uniform(-2, 2), 2)) for s in symbols}
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            updated, portfolios = revalue(conn, prices)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(f"📊 Mark-to-market: {updated:,} positions in {portfolios} portfolios ({engine.dialect.name})")
+    print(f"   median {statistics.median(timings):8.1f} ms   max {max(timings):8.1f} ms   "
+          f"{updated / (statistics.median(timings) / 1000):12,.0f} positions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark: market_data query latency, plain table vs partitioned time-series layout
+
+Loads the same synthetic tick dataset into two scratch schemas on PostgreSQL:
+
+  bench_plain        the original layout (separate symbol and timestamp indexes)
+  bench_partitioned  daily range partitions + (symbol, timestamp DESC) index
+
+then times the queries the market endpoints run, plus one day of retention
+(DELETE versus DROP of a partition).
+
+    cd backend && python -m benchmarks.market_data_queries --rows 50000000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+COLUMNS = """
+    symbol VARCHAR(10) NOT NULL,
+    price NUMERIC(10, 4) NOT NULL,
+    volume INTEGER NOT NULL DEFAULT 0,
+    high NUMERIC(10, 4) NOT NULL,
+    low NUMERIC(10, 4) NOT NULL,
+    open_price NUMERIC(10, 4) NOT NULL,
+    change NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    change_percent DOUBLE PRECISION NOT NULL DEFAULT 0,
+    bid NUMERIC(10, 4),
+    ask NUMERIC(10, 4),
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+"""
+
+QUERIES = {
+    "history (latest 100)": (
+        "SELECT * FROM market_data WHERE symbol = :symbol ORDER BY timestamp DESC LIMIT 100"
+    ),
+    "recent (last 24h)": (
+        "SELECT * FROM market_data WHERE symbol = :symbol AND timestamp >= :since ORDER BY timestamp DESC"
+    ),
+}
+
+
+def load(conn, schema: str, partitioned: bool, rows: int, symbols: int, start: datetime, days: int):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {schema}"))
+    conn.execute(text(f"SET search_path TO {schema}"))
+    if partitioned:
+        conn.execute(text(
+            f"CREATE TABLE market_data (id BIGINT GENERATED BY DEFAULT AS IDENTITY, {COLUMNS}, "
+            f"PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)"
+        ))
+        for d in range(days + 1):
+            day = (start + timedelta(days=d)).date()
+            conn.execute(text(
+                f"CREATE TABLE market_data_p{day:%Y%m%d} PARTITION OF market_data "
+                f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+            ))
+    else:
+        conn.execute(text(f"CREATE TABLE market_data (id BIGSERIAL PRIMARY KEY, {COLUMNS})"))
+
+    step_ms = days * 86400 * 1000 / rows
+    started = time.perf_counter()
+    conn.execute(text(f"""
+        INSERT INTO market_data (symbol, price, volume, high, low, open_price, timestamp)
+        SELECT 'S' || (g % {symbols}), 100 + (g % 997) / 100.0, g % 10000,
+               101, 99, 100, :start + (g * {step_ms}) * interval '1 millisecond'
+        FROM generate_series(1, {rows}) AS g
+    """), {"start": start})
+    load_seconds = time.perf_counter() - started
+
+    if partitioned:
+        conn.execute(text("CREATE INDEX ix_market_data_symbol_timestamp ON market_data (symbol, timestamp DESC)"))
+    else:
+        conn.execute(text("CREATE INDEX ix_market_data_symbol ON market_data (symbol)"))
+        conn.execute(text("CREATE INDEX ix_market_data_timestamp ON market_data (timestamp)"))
+    conn.execute(text("ANALYZE market_data"))
+    return load_seconds
+
+
+def time_queries(conn, schema: str, symbols: int, since: datetime, iterations: int):
+    conn.execute(text(f"SET search_path TO {schema}"))
+    results = {}
+    for name, sql in QUERIES.items():
+        latencies = []
+        for _ in range(iterations):
+            params = {"symbol": f"S{random.randrange(symbols)}", "since": since}
+            t0 = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        latencies.sort()
+        results[name] = (statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))])
+    return results
+
+
+def time_retention(conn, schema: str, partitioned: bool, start: datetime):
+    conn.execute(text(f"SET search_path TO {schema}"))
+    day = start.date()
+    t0 = time.perf_counter()
+    if partitioned:
+        conn.execute(text(f"DROP TABLE market_data_p{day:%Y%m%d}"))
+    else:
+        conn.execute(text("DELETE FROM market_data WHERE timestamp < :cutoff"),
+                     {"cutoff": datetime.combine(day + timedelta(days=1), datetime.min.time(), timezone.utc)})
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", "postgresql://christian@localhost:5432/finsight"))
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schemas afterwards")
+    args = parser.parse_args()
+
+    engine = create_engine(args.dsn)
+    if engine.dialect.name != "postgresql":
+        sys.exit("This benchmark needs PostgreSQL (partitioning is PostgreSQL-specific)")
+
+    start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=args.days)
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+
+    print(f"📊 market_data layouts: {args.rows:,} rows, {args.symbols} symbols, {args.days} days")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for schema, partitioned in (("bench_plain", False), ("bench_partitioned", True)):
+            load_seconds = load(conn, schema, partitioned, args.rows, args.symbols, start, args.days)
+            results = time_queries(conn, schema, args.symbols, since, args.iterations)
+            retention_ms = time_retention(conn, schema, partitioned, start)
+
+            print(f"\n   {schema} (loaded in {load_seconds:.1f}s)")
+            for name, (p50, p99) in results.items():
+                print(f"   {name:<22} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+            print(f"   {'drop one day':<22} {retention_ms:8.2f} ms")
+
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
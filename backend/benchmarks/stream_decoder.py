@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LEVELONE_EQUITIES messages decoded per second
+
+Replays synthetic streamer frames (one full snapshot per symbol, then small
+deltas) through
+
+  legacy      json.loads + logging the decoded message at INFO (the old default handler)
+  json        the delta-merging decoder with the standard library parser
+  orjson      the same decoder with orjson, if installed
+
+    cd backend && python -m benchmarks.stream_decoder --messages 20000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_messages(count: int, symbols: int, items: int):
+    rng = random.Random(3)
+    names = [f"SYM{i}" for i in range(symbols)]
+    price = {s: 100.0 for s in names}
+    messages = []
+    for n in range(count):
+        content = []
+        for s in rng.sample(names, items):
+            price[s] = round(price[s] + rng.uniform(-0.05, 0.05), 2)
+            item = {"key": s, "delayed": False, "assetMainType": "EQUITY", "3": price[s],
+                    "9": rng.randint(1, 500), "8": rng.randint(1, 10 ** 7), "35": 1735830000000 + n}
+            if n < symbols:
+                item.update({"1": price[s] - 0.01, "2": price[s] + 0.01, "10": price[s] + 1, "11": price[s] - 1,
+                             "12": 100.0, "17": 100.0, "18": price[s] - 100.0})
+            content.append(item)
+        messages.append(json.dumps({"data": [{"service": "LEVELONE_EQUITIES", "timestamp": 1735830000000 + n,
+                                              "command": "SUBS", "content": content}]}))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--items", type=int, default=20, help="symbols per message")
+    args = parser.parse_args()
+
+    import app.stream_decoder as decoder_module
+    from app.market_stream import iter_stream_items
+    from app.stream_decoder import StreamDecoder, loads
+
+    messages = synthetic_messages(args.messages, args.symbols, args.items)
+    legacy_logger = logging.getLogger("benchmark.legacy")
+    legacy_logger.addHandler(logging.StreamHandler(open(os.devnull, "w")))
+    legacy_logger.setLevel(logging.INFO)
+    legacy_logger.propagate = False
+
+    def legacy(message):
+        data = json.loads(message) if isinstance(message, str) else message
+        legacy_logger.info(f"📊 Received streaming data: {data}")
+
+    def decoder_handler():
+        decoder = StreamDecoder()
+
+        def handle(message):
+            for service, symbol, fields, timestamp_ms in iter_stream_items(loads(message)):
+                decoder.apply(symbol, fields, timestamp_ms)
+        return handle
+
+    orjson = decoder_module.orjson
+    runs = [("legacy", None, legacy), ("json", None, None)]
+    if orjson is not None:
+        runs.append(("orjson", orjson, None))
+
+    print(f"📊 Stream decode: {args.messages:,} messages x {args.items} items, {args.symbols} symbols")
+    for label, parser_module, handler in runs:
+        decoder_module.orjson = parser_module
+        handler = handler or decoder_handler()
+        started = time.perf_counter()
+        for message in messages:
+            handler(message)
+        elapsed = time.perf_counter() - started
+        print(f"   {label:<8} {args.messages / elapsed:12,.0f} msgs/s   {args.messages * args.items / elapsed:14,.0f} items/s")
+    decoder_module.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+End-to-end performance suite with JSON baselines and regression thresholds
+
+Runs the FastAPI app in-process over an ASGI transport against a scratch
+SQLite database (seeded with a portfolio, trades and ticks) and the local
+market simulator as the Schwab backend, then measures
+
+  portfolio, trades, quotes, history, recent   requests/s, p50 and p99 latency
+  stream_ingest                                LEVELONE items/s through the stream handler
+
+Results are compared with a stored baseline. A metric regresses when it is
+worse than the baseline by more than its threshold (`--threshold`, or a
+per-metric override under "thresholds" in the baseline file); latency
+changes smaller than `--latency-slack-ms` are ignored as noise. Failed
+requests are counted per endpoint as `<name>.errors`; an endpoint with errors
+records no throughput or latency. Any regression or any failed request makes
+the run exit with status 1, and such a run is never stored as the baseline.
+
+    cd backend && python -m benchmarks.suite                       # compare with benchmarks/baselines/suite.json
+    cd backend && python -m benchmarks.suite --update-baseline     # record a new baseline on this machine
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+_SCRATCH = tempfile.mkdtemp(prefix="finsight-bench-")
+SCRATCH_DATABASE_URL = "sqlite:///./benchmark_suite.db"
+os.environ.setdefault("DATABASE_URL", SCRATCH_DATABASE_URL)
+os.environ["MARKET_DATA_BACKEND"] = "simulator"
+os.environ.setdefault("BAR_CACHE_DIR", os.path.join(_SCRATCH, "bar_cache"))
+os.environ.setdefault("JOURNAL_DIR", os.path.join(_SCRATCH, "journal"))
+os.environ.setdefault("SCREENER_WORKERS", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "suite.json")
+SYMBOLS = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "AMD", "NFLX", "AVGO"]
+
+# name -> (path, description)
+SCENARIOS = {
+    "portfolio": ("/api/v1/portfolio", "portfolio snapshot"),
+    "trades": ("/api/v1/trades?limit=100", "first page of trades"),
+    "quotes": ("/api/market/quotes/" + ",".join(SYMBOLS), "10-symbol quote batch"),
+    "history": ("/api/market/history/AAPL?period_type=day&period=1", "1 day of minute bars"),
+    "recent": ("/api/market/data/recent/AAPL?hours=24&limit=500", "500 most recent ticks"),
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_database(trades: int, ticks: int):
+    """Default portfolio with positions, a trade history and recent ticks for AAPL"""
+    from sqlalchemy import delete, insert, select
+    from app.database import engine
+    from app.models import Portfolio, Position, Trade, MarketData, TradeSide, TradeStatus
+
+    rng = random.Random(11)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        portfolio_id = conn.execute(select(Portfolio.id).order_by(Portfolio.id)).scalar()
+        conn.execute(delete(Position))
+        conn.execute(delete(Trade))
+        conn.execute(delete(MarketData).where(MarketData.symbol == "AAPL"))
+        conn.execute(insert(Position), [
+            {"portfolio_id": portfolio_id, "symbol": symbol, "shares": rng.randint(10, 500), "avg_cost": 100,
+             "current_price": 100, "market_value": 0, "unrealized_pnl": 0}
+            for symbol in SYMBOLS
+        ])
+        conn.execute(insert(Trade), [
+            {"portfolio_id": portfolio_id, "symbol": rng.choice(SYMBOLS), "side": TradeSide.BUY,
+             "quantity": 10, "price": 100, "total_amount": 1000, "status": TradeStatus.FILLED,
+             "executed_at": now - timedelta(seconds=i), "created_at": now - timedelta(seconds=i)}
+            for i in range(trades)
+        ])
+        conn.execute(insert(MarketData), [
+            {"symbol": "AAPL", "price": 190 + rng.random(), "volume": i, "high": 191, "low": 189,
+             "open_price": 190, "timestamp": now - timedelta(milliseconds=100 * i)}
+            for i in range(ticks)
+        ])
+
+
+async def measure_endpoint(client: httpx.AsyncClient, path: str, requests: int, concurrency: int):
+    """Issue `requests` GETs from `concurrency` workers; returns (rps, p50 ms, p99 ms, errors)"""
+    for _ in range(min(10, requests)):
+        await client.get(path)  # warm caches and connections
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, percentile(latencies, 50), percentile(latencies, 99), errors
+
+
+def measure_stream_ingest(messages: int, items: int, symbols: int) -> float:
+    """LEVELONE items per second through the live stream handler"""
+    from app.market_simulator import SimulatedMarket
+    from app.market_stream import handle_stream_message
+
+    market = SimulatedMarket()
+    names = [f"SIM{i}" for i in range(symbols)]
+    now_ms = int(time.time() * 1000)
+    frames = []
+    for n in range(messages):
+        content = [market.item(names[(n * items + i) % symbols], now_ms + n) for i in range(items)]
+        frames.append(json.dumps({"data": [{"service": "LEVELONE_EQUITIES", "timestamp": now_ms + n,
+                                            "command": "SUBS", "content": content}]}))
+    for frame in frames[:100]:
+        handle_stream_message(frame)
+    started = time.perf_counter()
+    for frame in frames:
+        handle_stream_message(frame)
+    return messages * items / (time.perf_counter() - started)
+
+
+async def run_suite(args) -> dict:
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        seed_database(args.trades, args.ticks)
+        metrics = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name, (path, _) in SCENARIOS.items():
+                if args.only and name not in args.only:
+                    continue
+                rps, p50, p99, errors = await measure_endpoint(client, path, args.requests, args.concurrency)
+                # Any failed request fails the run, whatever the baseline says
+                metrics[f"{name}.errors"] = {"value": errors, "unit": "errors", "better": "lower", "max": 0}
+                if errors:
+                    # Error responses are usually fast; their timings would only mask a regression
+                    print(f"⚠️ {name}: {errors} of {args.requests} requests failed")
+                    continue
+                metrics[f"{name}.rps"] = {"value": round(rps, 1), "unit": "req/s", "better": "higher"}
+                metrics[f"{name}.p50_ms"] = {"value": round(p50, 3), "unit": "ms", "better": "lower"}
+                metrics[f"{name}.p99_ms"] = {"value": round(p99, 3), "unit": "ms", "better": "lower"}
+        if not args.only or "stream_ingest" in args.only:
+            ticks = await asyncio.get_running_loop().run_in_executor(
+                None, measure_stream_ingest, args.stream_messages, 10, 500
+            )
+            metrics["stream_ingest.ticks_per_s"] = {"value": round(ticks, 1), "unit": "ticks/s", "better": "higher"}
+        return metrics
+
+
+def compare(metrics: dict, baseline: dict, threshold: float, latency_slack_ms: float):
+    """Rows of (name, value, baseline value, change, regressed) for every measured metric"""
+    overrides = baseline.get("thresholds", {})
+    rows = []
+    for name, metric in metrics.items():
+        base = baseline.get("metrics", {}).get(name)
+        if "max" in metric:
+            rows.append((name, metric, base["value"] if base else None, None, metric["value"] > metric["max"]))
+            continue
+        if base is None or not base["value"]:
+            rows.append((name, metric, None, None, False))
+            continue
+        change = (metric["value"] - base["value"]) / base["value"]
+        limit = overrides.get(name, threshold)
+        if metric["better"] == "higher":
+            regressed = change < -limit
+        else:
+            regressed = change > limit and metric["value"] - base["value"] > latency_slack_ms
+        rows.append((name, metric, base["value"], change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--stream-messages", type=int, default=5000)
+    parser.add_argument("--only", type=lambda s: set(s.split(",")), default=None,
+                        help=f"comma-separated subset of {','.join(list(SCENARIOS) + ['stream_ingest'])}")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.25")),
+                        help="allowed relative regression, e.g. 0.25 for 25%%")
+    parser.add_argument("--latency-slack-ms", type=float, default=1.0)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", help="also write this run's metrics to a JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    scratch_db = os.environ["DATABASE_URL"] == SCRATCH_DATABASE_URL
+    if scratch_db and os.path.exists("benchmark_suite.db"):
+        os.remove("benchmark_suite.db")
+    try:
+        metrics = asyncio.run(run_suite(args))
+    finally:
+        shutil.rmtree(_SCRATCH, ignore_errors=True)
+        if scratch_db and os.path.exists("benchmark_suite.db"):
+            os.remove("benchmark_suite.db")
+
+    run = {
+        "created": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    rows = compare(metrics, baseline, args.threshold, args.latency_slack_ms)
+    print(f"📊 Performance suite ({args.requests} requests x {args.concurrency} concurrent per endpoint)")
+    for name, metric, base, change, regressed in rows:
+        if change is not None:
+            reference = f"baseline {base:>12,.3f}  {change:+7.1%}"
+        else:
+            reference = f"max {metric['max']}" if "max" in metric else "no baseline"
+        flag = ("  ❌ failed requests" if "max" in metric else "  ❌ regression") if regressed else ""
+        print(f"   {name:<28} {metric['value']:>12,.3f} {metric['unit']:<8} {reference}{flag}")
+
+    failed = [row[0] for row in rows if row[4] and "max" in row[1]]
+    if failed:
+        print(f"❌ Requests failed on {len(failed)} endpoint(s): {', '.join(failed)}")
+        if args.update_baseline:
+            print("💾 Baseline not updated")
+        return 1
+
+    if args.update_baseline:
+        # Keep hand-tuned per-metric thresholds and metrics not measured in this run
+        run["thresholds"] = baseline.get("thresholds", {})
+        run["metrics"] = {**baseline.get("metrics", {}), **metrics}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+            f.write("\n")
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed by more than the threshold: {', '.join(regressions)}")
+        return 1
+    if not baseline:
+        print("ℹ️ No baseline to compare with; run with --update-baseline to record one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
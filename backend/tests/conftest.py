@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The app modules create their engine at import time; point them at a scratch SQLite file
+_DB_DIR = tempfile.mkdtemp(prefix="finsight-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("JOURNAL_DIR", os.path.join(_DB_DIR, "journal"))
+os.environ.setdefault("BAR_CACHE_DIR", os.path.join(_DB_DIR, "bar_cache"))
+os.environ.setdefault("MARKET_DATA_BACKEND", "simulator")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
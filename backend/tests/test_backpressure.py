@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from app.backpressure import BoundedBuffer, BufferedConsumer, BLOCK, DROP_OLDEST, CONFLATE
+from app.indicators import IndicatorEngine, indicator_feed
+from app.models import MarketBar
+
+
+def test_drop_oldest_evicts_the_oldest_item():
+    lost = []
+    buffer = BoundedBuffer("test-drop-oldest", 3, DROP_OLDEST, on_drop=lost.append)
+    for i in range(5):
+        assert buffer.put(i)
+
+    assert buffer.get_batch(10, timeout=0) == [2, 3, 4]
+    assert lost == [0, 1]
+    assert buffer.dropped == 2
+
+
+def test_conflate_keeps_the_latest_item_per_key():
+    lost = []
+    buffer = BoundedBuffer("test-conflate", 2, CONFLATE, on_drop=lost.append)
+    buffer.put("AAPL 1", "AAPL")
+    buffer.put("MSFT 1", "MSFT")
+    buffer.put("AAPL 2", "AAPL")  # replaces in place, keeps its turn
+    buffer.put("TSLA 1", "TSLA")  # a new key on a full buffer evicts the oldest key
+
+    assert buffer.get_batch(10, timeout=0) == ["MSFT 1", "TSLA 1"]
+    assert lost == ["AAPL 1", "AAPL 2"]
+    assert (buffer.conflated, buffer.dropped) == (1, 1)
+
+
+def test_block_waits_for_room_then_drops_the_new_item():
+    lost = []
+    buffer = BoundedBuffer("test-block", 1, BLOCK, block_timeout=0.05, on_drop=lost.append)
+    assert buffer.put("first")
+
+    started = time.monotonic()
+    assert not buffer.put("second")
+    assert time.monotonic() - started >= 0.05
+    assert lost == ["second"]
+    assert (buffer.blocked, buffer.dropped) == (1, 1)
+
+
+def test_block_resumes_when_the_consumer_makes_room():
+    buffer = BoundedBuffer("test-block-resume", 1, BLOCK, block_timeout=5.0)
+    buffer.put("first")
+    threading.Timer(0.05, buffer.get_batch, args=(1, 0)).start()
+
+    assert buffer.put("second")
+    assert buffer.get_batch(10, timeout=0) == ["second"]
+
+
+def test_closed_buffer_rejects_items():
+    buffer = BoundedBuffer("test-closed", 10, DROP_OLDEST)
+    buffer.close()
+    assert not buffer.put("late")
+    assert buffer.dropped == 1
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedBuffer("test-bad-policy", 10, "spill")
+
+
+def test_consumer_reports_dropped_call_arguments():
+    lost = []
+    consumer = BufferedConsumer("test-consumer", lambda *args: None, policy=DROP_OLDEST, capacity=1,
+                                on_drop=lambda *args: lost.append(args))
+    consumer("AAPL", "1m", 1)
+    consumer("AAPL", "1m", 2)
+    assert lost == [("AAPL", "1m", 1)]
+
+
+def test_indicator_feed_never_blocks_the_producer():
+    assert indicator_feed.buffer.policy != BLOCK
+
+
+def synthetic_bars(count: int):
+    start = datetime(2024, 1, 10, 15, 0, tzinfo=timezone.utc)
+    bars = []
+    for i in range(count):
+        close = 100 + 5 * math.sin(i / 7) + i * 0.05
+        bars.append({
+            "symbol": "AAPL", "timeframe": "1m", "timestamp": start + timedelta(minutes=i),
+            "open_price": close - 0.2, "high": close + 0.5, "low": close - 0.5, "close": close,
+            "volume": 1000, "trade_count": 10,
+        })
+    return bars
+
+
+def test_dropped_bar_is_recovered_from_stored_bars(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bars.db'}")
+    MarketBar.__table__.create(engine)
+    bars = synthetic_bars(80)
+    with engine.begin() as conn:
+        conn.execute(insert(MarketBar.__table__), bars)
+
+    reference = IndicatorEngine(bind=engine)
+    for bar in bars:
+        reference.on_bar("AAPL", "1m", bar)
+
+    indicators = IndicatorEngine(bind=engine)
+    for i, bar in enumerate(bars):
+        if i == 60:
+            indicators.mark_stale("AAPL", "1m", bar)  # the feed dropped this bar
+            continue
+        indicators.on_bar("AAPL", "1m", bar)
+
+    assert indicators.resyncs == 1
+    expected = reference.latest("AAPL", "1m")
+    actual = indicators.latest("AAPL", "1m")
+    assert actual.keys() == expected.keys()
+    for name, value in expected.items():
+        assert actual[name] == pytest.approx(value, rel=1e-9), name
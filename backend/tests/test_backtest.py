@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from app.backtest import BarArrays, simulate_event_loop, simulate_vectorized, summarize
+
+
+def random_bars(symbols: int, width: int, seed: int = 11) -> BarArrays:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, (symbols, width)), axis=1)
+    open_ = np.empty_like(close)
+    open_[:, 0] = 100
+    open_[:, 1:] = close[:, :-1] + rng.normal(0, 0.3, (symbols, width - 1))
+    high = np.maximum(open_, close) + rng.uniform(0, 1, (symbols, width))
+    low = np.minimum(open_, close) - rng.uniform(0, 1, (symbols, width))
+    timestamps = np.tile(np.arange(width, dtype=np.int64) * 60000, (symbols, 1))
+    return BarArrays([f"S{i}" for i in range(symbols)], "1m", timestamps, open_, high, low, close)
+
+
+def single_bar_series(opens, closes) -> BarArrays:
+    open_, close = np.array([opens], dtype=float), np.array([closes], dtype=float)
+    timestamps = np.arange(len(opens), dtype=np.int64)[None, :] * 60000
+    return BarArrays(["AAPL"], "1m", timestamps, open_, np.maximum(open_, close) + 1, np.minimum(open_, close) - 1, close)
+
+
+@pytest.mark.parametrize("allow_short", [False, True])
+def test_event_loop_matches_vectorized_when_stops_are_unreachable(allow_short):
+    bars = random_bars(8, 300)
+    rng = np.random.default_rng(5)
+    events = rng.choice(np.array([-1, 0, 1], dtype=np.int8), size=bars.close.shape, p=[0.05, 0.9, 0.05])
+    params = {"allow_short": allow_short, "commission_per_trade": 1.0, "stop_atr": 1e9, "take_atr": 1e9}
+    atr = np.ones_like(bars.close)
+
+    vectorized = simulate_vectorized(bars, events, params)
+    event_loop = simulate_event_loop(bars, events, atr, params)
+
+    assert len(vectorized["trade_pnl"]) > 50
+    np.testing.assert_array_equal(event_loop["trade_row"], vectorized["trade_row"])
+    np.testing.assert_array_equal(event_loop["exposure"], vectorized["exposure"])
+    np.testing.assert_allclose(event_loop["trade_pnl"], vectorized["trade_pnl"], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(np.cumsum(event_loop["pnl"], axis=1), np.cumsum(vectorized["pnl"], axis=1),
+                               rtol=0, atol=1e-8)
+
+    expected, actual = summarize(bars, vectorized), summarize(bars, event_loop)
+    for key in ("total_trades", "winning_trades", "total_pnl", "max_drawdown"):
+        assert actual[key] == expected[key], key
+    assert actual["per_symbol"] == expected["per_symbol"]
+
+
+@pytest.mark.parametrize("simulate", ["vectorized", "event_loop"])
+def test_single_long_trade_by_hand(simulate):
+    # Buy signal on bar 1's close fills at bar 2's open (100), the sell on bar 3
+    # fills at bar 4's open (110): 100 shares, 1000 gross, 2 x 1 per trade plus
+    # 10 bps of 10000 in and 11000 out in commissions
+    bars = single_bar_series(opens=[100, 100, 100, 100, 110, 110], closes=[100, 100, 95, 105, 110, 110])
+    events = np.array([[0, 1, 0, -1, 0, 0]], dtype=np.int8)
+    params = {"slippage_bps": 0.0, "commission_bps": 10.0, "commission_per_trade": 1.0,
+              "trade_notional": 10000.0, "stop_atr": 1e9, "take_atr": 1e9}
+
+    if simulate == "vectorized":
+        result = simulate_vectorized(bars, events, params)
+    else:
+        result = simulate_event_loop(bars, events, np.ones_like(bars.close), params)
+
+    assert result["trade_pnl"].tolist() == pytest.approx([1000 - 2 - 10 - 11])
+    # Entry costs 11 and the close drops 5 on 100 shares, then recovers to 105 and exits at 110
+    assert np.cumsum(result["pnl"][0]).tolist() == pytest.approx([0, 0, -511, 489, 977, 977])
+    summary = summarize(bars, result)
+    assert (summary["total_trades"], summary["winning_trades"]) == (1, 1)
+    assert (summary["total_pnl"], summary["max_drawdown"]) == (977.0, 511.0)
+    assert summary["per_symbol"][0]["exposure"] == round(2 / 6, 4)
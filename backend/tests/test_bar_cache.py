@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.bar_cache import BarCache, tail_is_current
+
+MINUTE_MS = 60_000
+
+
+def ms(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+# Wednesday 2024-01-10, 10:00 New York time
+NOW = ms(2024, 1, 10, 15, 0)
+SESSION_START = ms(2024, 1, 10, 9, 0)
+
+
+class FakeUpstream:
+    """price_history stand-in: one minute bar per minute from the session start until `now`"""
+
+    def __init__(self):
+        self.now = NOW
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        start = kwargs.get("startDate", SESSION_START)
+        first = start - start % MINUTE_MS
+        return {"candles": [
+            {"datetime": t, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10}
+            for t in range(first, self.now + 1, MINUTE_MS)
+        ]}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BarCache(root=str(tmp_path), refresh_seconds=60)
+
+
+def test_repeated_loads_are_served_without_upstream_calls(cache):
+    upstream = FakeUpstream()
+    results = [cache.get_history("AAPL", "day", 1, upstream, now_ms=NOW + i * 1000) for i in range(4)]
+
+    assert len(upstream.calls) == 1
+    assert cache.hits == 3
+    assert cache.full_fetches == 1 and cache.tail_fetches == 0
+    assert all(r["candles"] == results[0]["candles"] for r in results)
+
+
+def test_stale_tail_is_refetched_and_not_counted_as_hit(cache):
+    upstream = FakeUpstream()
+    cache.get_history("AAPL", "day", 1, upstream, now_ms=NOW)
+    upstream.now = NOW + 5 * MINUTE_MS
+    result = cache.get_history("AAPL", "day", 1, upstream, now_ms=upstream.now)
+
+    assert len(upstream.calls) == 2
+    assert upstream.calls[1]["startDate"] == NOW
+    assert cache.hits == 0 and cache.tail_fetches == 1
+    assert result["candles"][-1]["datetime"] == upstream.now
+
+    # The refetch itself refreshed the tail, so an immediate reload stays local
+    cache.get_history("AAPL", "day", 1, upstream, now_ms=upstream.now + 1000)
+    assert len(upstream.calls) == 2
+    assert cache.hits == 1
+
+
+def test_tail_is_current_while_the_market_stays_closed():
+    friday_evening = ms(2024, 1, 12, 23, 0)   # 18:00 New York, after the regular session
+    saturday = ms(2024, 1, 13, 15, 0)
+    monday_open = ms(2024, 1, 15, 9, 0)      # 04:00 New York
+
+    assert tail_is_current(saturday, ms(2024, 1, 14, 20, 0), refresh_seconds=60)
+    assert not tail_is_current(saturday, monday_open, refresh_seconds=60)
+    # Friday 18:00 New York is still inside the extended session
+    assert not tail_is_current(friday_evening, saturday, refresh_seconds=60)
+    assert tail_is_current(ms(2024, 1, 13, 2, 0), saturday, refresh_seconds=60)
+    assert not tail_is_current(None, NOW)
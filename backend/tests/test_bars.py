@@ -0,0 +1,80 @@
+from app.bars import BarAggregator, BAR_CLOSE_GRACE
+
+T0 = 1_700_000_040_000  # a minute boundary
+
+
+def collecting_aggregator(**kwargs):
+    aggregator = BarAggregator(["1m"], **kwargs)
+    bars = []
+    aggregator.add_listener(lambda symbol, timeframe, bar: bars.append(bar))
+    return aggregator, bars
+
+
+def test_bar_closes_on_next_period_tick():
+    aggregator, bars = collecting_aggregator()
+    aggregator.on_tick("AAPL", 10.0, 100, T0 + 1000)
+    aggregator.on_tick("AAPL", 12.0, 150, T0 + 20_000)
+    aggregator.on_tick("AAPL", 9.0, 160, T0 + 40_000)
+    aggregator.on_tick("AAPL", 11.0, 200, T0 + 61_000)
+
+    assert len(bars) == 1
+    bar = bars[0]
+    assert (bar["open_price"], bar["high"], bar["low"], bar["close"]) == (10.0, 12.0, 9.0, 9.0)
+    assert bar["volume"] == 60  # the first tick only sets the cumulative volume reference
+    assert bar["trade_count"] == 3
+    assert bar["vwap"] == (12.0 * 50 + 9.0 * 10) / 60
+
+
+def test_late_tick_after_timer_close_does_not_reopen_bar():
+    aggregator, bars = collecting_aggregator()
+    aggregator.on_tick("AAPL", 10.0, 100, T0 + 1000)
+    aggregator.on_tick("AAPL", 11.0, 110, T0 + 30_000)
+    assert aggregator.close_expired(T0 + 63_000) == 1
+
+    aggregator.on_tick("AAPL", 12.0, 120, T0 + 59_500)
+    aggregator.close_expired(T0 + 200_000)
+
+    assert len(bars) == 1
+    assert bars[0]["close"] == 11.0
+    assert aggregator.late_ticks == 1
+
+
+def test_late_tick_for_older_period_than_open_bar_is_dropped():
+    aggregator, bars = collecting_aggregator()
+    aggregator.on_tick("AAPL", 10.0, 100, T0 + 61_000)
+    aggregator.on_tick("AAPL", 99.0, 110, T0 + 5_000)
+    aggregator.close_all()
+
+    assert [bar["close"] for bar in bars] == [10.0]
+    assert aggregator.late_ticks == 1
+
+
+def test_replayed_ticks_are_not_emitted_twice():
+    aggregator, bars = collecting_aggregator()
+    ticks = [(10.0 + i, 100 + i, T0 + i * 15_000) for i in range(8)]  # two minutes
+    for price, volume, ts in ticks:
+        aggregator.on_tick("AAPL", price, volume, ts)
+    aggregator.close_all()
+    emitted = len(bars)
+
+    for price, volume, ts in ticks:
+        aggregator.on_tick("AAPL", price, volume, ts)
+    aggregator.close_all()
+
+    assert emitted == 2
+    assert len(bars) == emitted
+
+
+def test_event_time_closes_on_tick_timestamps_not_wall_clock():
+    aggregator, bars = collecting_aggregator(event_time=True)
+    aggregator.on_tick("AAPL", 10.0, 100, T0 + 1000)
+    aggregator.on_tick("MSFT", 20.0, 100, T0 + 2000)
+
+    # Wall clock is far past the period, event time is not
+    assert aggregator.close_expired() == 0
+    assert bars == []
+
+    # MSFT keeps trading; AAPL's quiet bar closes once event time passes its period plus grace
+    aggregator.on_tick("MSFT", 21.0, 110, T0 + 60_000 + int(BAR_CLOSE_GRACE * 1000) + 1000)
+    closed = {(bar["symbol"], bar["close"]) for bar in bars}
+    assert closed == {("AAPL", 10.0), ("MSFT", 20.0)}
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.indicators import (
+    INDICATOR_NAMES, IndicatorState, WARMUP_BARS, _compute, compute_indicators,
+)
+
+
+def random_walks(lengths, seed=3):
+    """(high, low, close) matrices right-aligned on the latest bar, NaN-padded on the left"""
+    rng = np.random.default_rng(seed)
+    width = max(lengths)
+    high, low, close = (np.full((len(lengths), width), np.nan) for _ in range(3))
+    for row, length in enumerate(lengths):
+        closes = 100 + np.cumsum(rng.normal(0, 1, length))
+        close[row, -length:] = closes
+        high[row, -length:] = closes + rng.uniform(0, 1, length)
+        low[row, -length:] = closes - rng.uniform(0, 1, length)
+    return high, low, close
+
+
+def assert_matches_batch(state_values, batch, row, column):
+    expected = {name: batch[name][row, column] for name in INDICATOR_NAMES
+                if not math.isnan(batch[name][row, column])}
+    assert state_values.keys() == expected.keys()
+    for name, value in expected.items():
+        assert state_values[name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+
+def test_incremental_updates_match_the_batch_computation():
+    lengths = [120, 75, 30]
+    high, low, close = random_walks(lengths)
+    batch = compute_indicators(high, low, close)
+    width = close.shape[1]
+
+    for row, length in enumerate(lengths):
+        state = IndicatorState()
+        for column in range(width - length, width):
+            values = state.update(high[row, column], low[row, column], close[row, column])
+            assert_matches_batch(values, batch, row, column)
+
+
+def test_state_seeded_from_a_batch_continues_incrementally():
+    high, low, close = random_walks([150, 90])
+    batch = compute_indicators(high, low, close)
+    seed_bars = 100
+    _, state = _compute(high[:, :seed_bars], low[:, :seed_bars], close[:, :seed_bars])
+
+    for row in range(2):
+        incremental = IndicatorState.from_batch(state, row)
+        for column in range(seed_bars, close.shape[1]):
+            values = incremental.update(high[row, column], low[row, column], close[row, column])
+            assert_matches_batch(values, batch, row, column)
+
+
+def test_indicators_are_reported_only_once_warmed_up():
+    high, low, close = random_walks([60])
+    state = IndicatorState()
+    for column in range(60):
+        values = state.update(high[0, column], low[0, column], close[0, column])
+        bars = column + 1
+        assert set(values) == {name for name, warmup in WARMUP_BARS.items() if bars >= warmup}
+    assert values["SMA_20"] == pytest.approx(close[0, -20:].mean())
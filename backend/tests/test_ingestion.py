@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, func, select
+
+from app.ingestion import BulkInsertWriter
+from app.models import MarketData
+
+
+def tick(symbol: str, second: int, price: float = 10.0):
+    return {
+        "symbol": symbol, "price": price, "volume": 100, "high": price, "low": price, "open_price": price,
+        "change": 0.0, "change_percent": 0.0,
+        "timestamp": datetime(2024, 1, 10, 15, 0, second, tzinfo=timezone.utc),
+    }
+
+
+def count_rows(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(MarketData.__table__)).scalar()
+
+
+def test_rows_that_already_exist_are_skipped(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ticks.db'}")
+    MarketData.__table__.create(engine)
+    writer = BulkInsertWriter(MarketData.__table__, bind=engine, conflict_columns=("symbol", "timestamp"))
+
+    writer.flush([tick("AAPL", s) for s in range(5)])
+    # A replay overlapping what is stored: 3 existing ticks, 2 new ones
+    writer.flush([tick("AAPL", s, price=99.0) for s in range(2, 7)])
+
+    assert count_rows(engine) == 7
+    assert writer.rows_failed == 0
+
+
+def test_without_unique_key_the_writer_inserts_plainly(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ticks.db'}")
+    table = MarketData.__table__
+    table.create(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_market_data_symbol_timestamp")
+    writer = BulkInsertWriter(table, bind=engine, conflict_columns=("symbol", "timestamp"))
+
+    writer.flush([tick("AAPL", 0)])
+    writer.flush([tick("AAPL", 0)])
+
+    assert count_rows(engine) == 2
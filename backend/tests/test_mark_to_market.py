@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from app.mark_to_market import MarkToMarket, revalue
+from app.market_hours import is_market_open
+from app.models import Portfolio, Position
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'portfolio.db'}")
+    Portfolio.__table__.create(engine)
+    Position.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Portfolio), [{"id": 1, "cash_balance": 1000}])
+        conn.execute(insert(Position), [
+            {"portfolio_id": 1, "symbol": "AAA", "shares": 10, "avg_cost": 100},
+            {"portfolio_id": 1, "symbol": "BBB", "shares": 10, "avg_cost": 50},
+        ])
+    return engine
+
+
+def portfolio(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Portfolio).where(Portfolio.id == 1)).one()
+
+
+def test_revalue_rolls_positions_up_into_the_portfolio(engine):
+    with engine.begin() as conn:
+        assert revalue(conn, {"AAA": (105.0, 5.0), "BBB": (48.0, -2.0)}) == (2, 1)
+
+    row = portfolio(engine)
+    assert row.invested_value == Decimal("1530.00")
+    assert row.total_value == Decimal("2530.00")
+    assert row.total_pnl == Decimal("30.00")  # +50 on AAA, -20 on BBB
+    assert row.daily_pnl == Decimal("30.00")
+
+
+def test_daily_pnl_is_kept_while_a_held_symbol_is_unpriced(engine):
+    with engine.begin() as conn:
+        revalue(conn, {"AAA": (105.0, 5.0), "BBB": (48.0, -2.0)})
+    with engine.begin() as conn:
+        revalue(conn, {"AAA": (106.0, 6.0)})
+
+    row = portfolio(engine)
+    assert row.daily_pnl == Decimal("30.00")
+    assert row.total_pnl == Decimal("40.00")  # prices still update
+
+    with engine.begin() as conn:
+        revalue(conn, {"AAA": (106.0, 6.0), "BBB": (48.0, -2.0)})
+    assert portfolio(engine).daily_pnl == Decimal("40.00")
+
+
+def test_run_once_prices_only_held_symbols(engine):
+    result = asyncio.run(MarkToMarket(engine).run_once({"AAA": (101.0, 1.0), "BBB": (50.0, 0.0), "ZZZ": (1.0, 0.0)}))
+
+    assert (result["symbols_held"], result["symbols_priced"], result["unpriced"]) == (2, 2, 0)
+    assert result["positions_updated"] == 2
+    assert portfolio(engine).daily_pnl == Decimal("10.00")
+
+
+def test_market_hours_follow_new_york_time():
+    # 2024-01-10 is a Wednesday; New York is UTC-5 in January
+    assert not is_market_open(datetime(2024, 1, 10, 14, 29, tzinfo=timezone.utc))
+    assert is_market_open(datetime(2024, 1, 10, 14, 30, tzinfo=timezone.utc))
+    assert not is_market_open(datetime(2024, 1, 10, 21, 0, tzinfo=timezone.utc))
+    assert not is_market_open(datetime(2024, 1, 13, 15, 0, tzinfo=timezone.utc))  # Saturday
@@ -0,0 +1,31 @@
+import json
+
+from app.bars import bar_aggregator
+from app.ingestion import market_data_writer
+from app.market_stream import handle_stream_message
+from app.quote_cache import quote_cache
+from app.stream_decoder import equity_fields
+
+T0 = 1_700_000_040_000
+
+
+def futures_frame(symbol: str, last: float, volume: int, high: float, ts_ms: int) -> str:
+    return json.dumps({"data": [{"service": "LEVELONE_FUTURES", "timestamp": ts_ms, "command": "SUBS",
+                                 "content": [{"key": symbol, "3": last, "8": volume, "12": high, "14": 4490.0}]}]})
+
+
+def test_futures_fields_are_translated_to_equity_codes():
+    fields = equity_fields("LEVELONE_FUTURES", {"3": 4500.25, "12": 4510.0, "13": 4480.0, "18": 4495.0, "16": "E-mini"})
+    assert fields == {"3": 4500.25, "10": 4510.0, "11": 4480.0, "17": 4495.0}
+    assert equity_fields("CHART_EQUITY", {"3": 1.0}) is None
+
+
+def test_futures_ticks_reach_quotes_bars_and_the_writer():
+    queued = market_data_writer.stats()["queue_depth"]
+    handle_stream_message(futures_frame("/ES", 4500.25, 1000, 4510.0, T0 + 1000))
+    handle_stream_message(futures_frame("/ES", 4501.00, 1200, 4510.0, T0 + 2000))
+
+    quote = quote_cache.get_fresh("/ES")
+    assert quote is not None and quote["quote"]["lastPrice"] == 4501.00
+    assert bar_aggregator.current_bars("/ES")["1m"]["close"] == 4501.00
+    assert market_data_writer.stats()["queue_depth"] == queued + 2
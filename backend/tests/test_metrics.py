@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.metrics import Registry
+
+
+def test_text_exposition_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests served", ("path",))
+    requests.labels('/a"b\\c\n').inc()
+    requests.labels("/x").inc(2)
+    registry.gauge("queue_depth", "Items waiting").set(7)
+
+    def broken():
+        raise RuntimeError("component gone")
+
+    registry.add_collector(broken)
+    registry.add_collector(lambda: [("pool_size", "gauge", "Pool connections", [({"pool": "main"}, 5), ({}, 1.5)])])
+    text = registry.render()
+
+    assert text.endswith("\n") and not text.endswith("\n\n")
+    assert text.splitlines() == [
+        "# HELP requests_total Requests served",
+        "# TYPE requests_total counter",
+        'requests_total{path="/a\\"b\\\\c\\n"} 1.0',
+        'requests_total{path="/x"} 2.0',
+        "# HELP queue_depth Items waiting",
+        "# TYPE queue_depth gauge",
+        "queue_depth 7",
+        "# HELP pool_size Pool connections",
+        "# TYPE pool_size gauge",
+        'pool_size{pool="main"} 5',
+        "pool_size 1.5",
+    ]
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Operation latency", ("op",), buckets=(1.0, 0.1, 0.5))
+    child = latency.labels("read")
+    for value in (0.05, 0.1, 0.3, 0.5, 2.0):
+        child.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'op_seconds_bucket{op="read",le="0.1"} 2',  # a value on a bound counts in that bucket
+        'op_seconds_bucket{op="read",le="0.5"} 4',
+        'op_seconds_bucket{op="read",le="1.0"} 4',
+        'op_seconds_bucket{op="read",le="+Inf"} 5',
+        'op_seconds_sum{op="read"} 2.95',
+        'op_seconds_count{op="read"} 5',
+    ]
+    with pytest.raises(ValueError):
+        latency.labels("read", "extra")
+    assert registry.histogram("op_seconds", "Registered again") is latency
+
+
+def test_requests_are_labelled_by_route_template():
+    from app.main import app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for symbols in ("AAPL,MSFT", "TSLA", "NVDA"):
+                assert (await client.get(f"/api/market/quotes/{symbols}")).status_code == 200
+            await client.get("/no/such/route")
+            return await client.get("/metrics")
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    count = 'http_request_duration_seconds_count{method="GET",route="/api/market/quotes/{symbols}",status="200"}'
+    assert any(line.startswith(count) and float(line.split()[-1]) >= 3 for line in lines)
+    assert any('route="unmatched",status="404"' in line for line in lines)
+    assert not any("TSLA" in line or "/no/such/route" in line for line in lines)
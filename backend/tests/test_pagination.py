@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from app import pagination
+from app.models import MarketData
+from app.pagination import InvalidCursor, encode_cursor, keyset_page
+
+T0 = datetime(2024, 1, 10, 15, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ticks.db'}")
+    table = MarketData.__table__
+    table.create(engine)
+    with engine.begin() as conn:
+        # Five symbols share every timestamp, so pages split runs of equal timestamps
+        conn.execute(insert(table), [
+            {"symbol": symbol, "price": 10, "volume": 0, "high": 10, "low": 10, "open_price": 10,
+             "timestamp": T0 + timedelta(seconds=second)}
+            for second in range(10) for symbol in ("A", "B", "C", "D", "E")
+        ])
+    return engine
+
+
+def query():
+    return select(MarketData.id, MarketData.symbol, MarketData.timestamp)
+
+
+def read_all(engine, limit):
+    pages, cursor = [], None
+    with engine.connect() as conn:
+        while True:
+            rows, cursor = keyset_page(conn, query(), "ticks", MarketData.timestamp, MarketData.id, limit, cursor)
+            pages.append(rows)
+            if cursor is None:
+                return pages
+
+
+def test_pages_cover_every_row_once_newest_first(engine):
+    pages = read_all(engine, limit=7)
+    rows = [row for page in pages for row in page]
+
+    assert [len(page) for page in pages] == [7] * 7 + [1]
+    assert len({row.id for row in rows}) == 50
+    keys = [(row.timestamp, row.id) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_last_full_page_has_no_next_cursor(engine):
+    pages = read_all(engine, limit=10)
+    assert [len(page) for page in pages] == [10] * 5
+
+
+def test_rows_inserted_after_the_first_page_do_not_shift_later_pages(engine):
+    with engine.connect() as conn:
+        first, cursor = keyset_page(conn, query(), "ticks", MarketData.timestamp, MarketData.id, 5)
+    with engine.begin() as conn:
+        conn.execute(insert(MarketData.__table__), [{"symbol": "NEW", "price": 10, "volume": 0, "high": 10,
+                                                     "low": 10, "open_price": 10, "timestamp": T0 + timedelta(hours=1)}])
+    with engine.connect() as conn:
+        second, _ = keyset_page(conn, query(), "ticks", MarketData.timestamp, MarketData.id, 5, cursor)
+
+    assert "NEW" not in {row.symbol for row in second}
+    assert (second[0].timestamp, second[0].id) < (first[-1].timestamp, first[-1].id)
+
+
+def test_cursor_from_another_listing_is_rejected(engine):
+    token = encode_cursor("trades", T0, 1)
+    with engine.connect() as conn, pytest.raises(InvalidCursor):
+        keyset_page(conn, query(), "ticks", MarketData.timestamp, MarketData.id, 5, token)
+    with pytest.raises(InvalidCursor):
+        pagination.decode_cursor("ticks", "not-a-cursor")
+
+
+def test_page_size_is_capped(monkeypatch):
+    monkeypatch.setattr(pagination, "MAX_PAGE_SIZE", 100)
+    assert pagination.page_size(10_000) == 100
+    assert pagination.page_size(0) == 1
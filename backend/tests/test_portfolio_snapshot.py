@@ -0,0 +1,107 @@
+import asyncio
+import json
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import Session
+
+from app import portfolio_snapshot as snapshot_module
+from app.api import portfolio as portfolio_api
+from app.models import Portfolio, Position, Trade, TradeSide
+from app.portfolio_snapshot import PortfolioSnapshot
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'portfolio.db'}")
+    for model in (Portfolio, Position, Trade):
+        model.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Portfolio), [{"id": 1, "total_value": 2000, "cash_balance": 1000,
+                                          "invested_value": 1000, "total_pnl": 0, "daily_pnl": 0}])
+        conn.execute(insert(Position), [
+            {"portfolio_id": 1, "symbol": "AAA", "shares": 5, "avg_cost": 100, "current_price": 100, "market_value": 500},
+            {"portfolio_id": 1, "symbol": "BBB", "shares": 10, "avg_cost": 50, "current_price": 50, "market_value": 500},
+        ])
+    return engine
+
+
+@pytest.fixture
+def snapshot(engine, monkeypatch):
+    snapshot = PortfolioSnapshot(bind=engine)
+    # The session hooks publish to the module's global snapshot
+    monkeypatch.setattr(snapshot_module, "portfolio_snapshot", snapshot)
+    return snapshot
+
+
+def positions(body):
+    return {p["symbol"]: p for p in json.loads(body)["positions"]}
+
+
+def test_incremental_rebuild_reloads_only_dirty_symbols(engine, snapshot):
+    etag, body = snapshot.get()
+    assert snapshot.full_rebuilds == 1 and snapshot.positions_reloaded == 2
+    assert snapshot.get() == (etag, body)  # clean reads do not rebuild
+
+    with engine.begin() as conn:
+        conn.execute(update(Position).where(Position.symbol == "AAA").values(current_price=110, market_value=550))
+        conn.execute(update(Position).where(Position.symbol == "BBB").values(current_price=40))
+        conn.execute(insert(Position), [{"portfolio_id": 1, "symbol": "CCC", "shares": 1, "avg_cost": 7}])
+    snapshot.invalidate(["AAA", "CCC"])
+    new_etag, new_body = snapshot.get()
+
+    assert new_etag != etag
+    assert (snapshot.full_rebuilds, snapshot.incremental_rebuilds, snapshot.positions_reloaded) == (1, 1, 4)
+    current = positions(new_body)
+    assert current["AAA"]["current_price"] == 110.0
+    # BBB was not invalidated, so its cached row is served as before
+    assert current["BBB"]["current_price"] == 50.0
+    assert list(current) == ["AAA", "BBB", "CCC"]
+
+
+def test_session_hooks_invalidate_committed_changes_only(engine, snapshot):
+    snapshot.get()
+    with Session(engine) as session:
+        session.add(Trade(portfolio_id=1, symbol="MSFT", side=TradeSide.BUY, quantity=1, price=10, total_amount=10))
+        session.flush()
+        session.rollback()
+    assert not snapshot.is_dirty
+
+    with Session(engine) as session:
+        session.add(Trade(portfolio_id=1, symbol="MSFT", side=TradeSide.BUY, quantity=1, price=10, total_amount=10))
+        session.get(Position, 1).shares = Decimal("6")
+        session.commit()
+    assert snapshot._dirty_symbols == {"MSFT", "AAA"} and not snapshot._dirty_all
+
+    snapshot.get()
+    with Session(engine) as session:
+        session.get(Portfolio, 1).cash_balance = Decimal("900")
+        session.commit()
+    assert snapshot._dirty_all
+    assert json.loads(snapshot.get()[1])["cash_balance"] == 900.0
+
+
+def test_if_none_match_returns_304_until_the_portfolio_changes(engine, snapshot, monkeypatch):
+    monkeypatch.setattr(portfolio_api, "portfolio_snapshot", snapshot)
+    app = FastAPI()
+    app.include_router(portfolio_api.router)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = await client.get("/api/v1/portfolio")
+            etag = first.headers["etag"]
+            revalidated = await client.get("/api/v1/portfolio", headers={"If-None-Match": f'"other", {etag}'})
+            snapshot.invalidate(["AAA"])
+            changed = await client.get("/api/v1/portfolio", headers={"If-None-Match": etag})
+            return first, revalidated, changed
+
+    first, revalidated, changed = asyncio.run(scenario())
+
+    assert first.status_code == 200 and first.json()["total_value"] == 2000.0
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert changed.status_code == 200 and changed.headers["etag"] != first.headers["etag"]
+    assert snapshot.not_modified == 1
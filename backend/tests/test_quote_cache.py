@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from app.quote_cache import QuoteCache
+
+
+def quote(symbol: str, price: float = 10.0):
+    return {"symbol": symbol, "quote": {"lastPrice": price}}
+
+
+class RecordingFetcher:
+    """Upstream stand-in that records each call and can be held open"""
+
+    def __init__(self, missing=()):
+        self.calls = []
+        self.missing = set(missing)
+        self.release = asyncio.Event()
+
+    async def __call__(self, symbols):
+        self.calls.append(list(symbols))
+        await self.release.wait()
+        return {symbol: quote(symbol) for symbol in symbols if symbol not in self.missing}
+
+
+def test_fresh_quotes_expire_after_the_ttl():
+    cache = QuoteCache(ttl=2.0)
+    cache.put("AAPL", quote("AAPL"))
+    stored_at = time.monotonic()
+
+    assert cache.get_fresh("AAPL", stored_at + 1.9) == quote("AAPL")
+    assert cache.get_fresh("AAPL", stored_at + 2.1) is None
+    assert cache.get_recent("AAPL", 10.0, stored_at + 5.0) == quote("AAPL")
+    assert cache.get_fresh("MSFT") is None
+
+
+def test_concurrent_requests_share_one_upstream_fetch():
+    async def scenario():
+        cache = QuoteCache(ttl=60)
+        fetcher = RecordingFetcher()
+        first = asyncio.create_task(cache.get_quotes(["AAPL", "MSFT"], fetcher))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_quotes(["MSFT", "AAPL"], fetcher))
+        await asyncio.sleep(0)
+        fetcher.release.set()
+        return cache, fetcher, await first, await second
+
+    cache, fetcher, first, second = asyncio.run(scenario())
+    assert fetcher.calls == [["AAPL", "MSFT"]]
+    assert first == second == {"AAPL": quote("AAPL"), "MSFT": quote("MSFT")}
+    assert (cache.misses, cache.coalesced, cache.upstream_calls) == (2, 2, 1)
+
+
+def test_only_missing_or_stale_symbols_are_fetched():
+    async def scenario():
+        cache = QuoteCache(ttl=60)
+        cache.put("AAPL", quote("AAPL", 1.0))
+        fetcher = RecordingFetcher()
+        fetcher.release.set()
+        return cache, fetcher, await cache.get_quotes(["AAPL", "TSLA"], fetcher)
+
+    cache, fetcher, result = asyncio.run(scenario())
+    assert fetcher.calls == [["TSLA"]]
+    assert result["AAPL"] == quote("AAPL", 1.0)
+    assert cache.hits == 1
+
+
+def test_symbols_upstream_did_not_return_are_reported_and_not_cached():
+    async def scenario():
+        cache = QuoteCache(ttl=60)
+        fetcher = RecordingFetcher(missing={"BAD"})
+        fetcher.release.set()
+        return cache, await cache.get_quotes(["AAPL", "BAD"], fetcher)
+
+    cache, result = asyncio.run(scenario())
+    assert result["errors"] == {"BAD": "not returned by upstream"}
+    assert cache.get_fresh("BAD") is None
+    assert cache.stats()["inflight_symbols"] == 0
+
+
+def test_stream_updates_merge_into_the_cached_quote():
+    cache = QuoteCache(ttl=60)
+    cache.put("AAPL", {"symbol": "AAPL", "quote": {"lastPrice": 10.0, "bidPrice": 9.9}})
+    cache.update_from_stream("AAPL", {"3": 10.5})
+
+    assert cache.get_fresh("AAPL")["quote"] == {"lastPrice": 10.5, "bidPrice": 9.9}
+    assert cache.stream_updates == 1
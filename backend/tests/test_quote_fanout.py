@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+from app.schwab_async import AsyncSchwabService
+
+
+class FakeService:
+    """Blocking quote endpoint that fails one chunk and omits one symbol"""
+
+    def __init__(self, fail_on=None, omit=None, delay=0.02):
+        self.fail_on = fail_on
+        self.omit = omit
+        self.delay = delay
+        self.chunks = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_real_time_quotes(self, symbols):
+        with self._lock:
+            self.chunks.append(list(symbols))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.fail_on in symbols:
+                raise RuntimeError("upstream 500")
+            return {symbol: {"symbol": symbol} for symbol in symbols if symbol != self.omit}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_chunks_are_fetched_concurrently_and_merged():
+    service = FakeService()
+    symbols = [f"S{i}" for i in range(25)]
+    result = asyncio.run(AsyncSchwabService(service).get_quotes_chunked(symbols, chunk_size=10, concurrency=2))
+
+    assert sorted(len(chunk) for chunk in service.chunks) == [5, 10, 10]
+    assert service.max_active == 2
+    assert set(result) == set(symbols)
+
+
+def test_failed_chunk_and_unknown_symbol_are_reported_per_symbol():
+    service = FakeService(fail_on="S12", omit="S3")
+    symbols = [f"S{i}" for i in range(20)]
+    result = asyncio.run(AsyncSchwabService(service).get_quotes_chunked(symbols, chunk_size=10, concurrency=4))
+    errors = result.pop("errors")
+
+    assert set(result) == {f"S{i}" for i in range(10)} - {"S3"}
+    assert errors["S3"] == "symbol not found"
+    assert {errors[f"S{i}"] for i in range(10, 20)} == {"upstream 500"}
+
+
+def test_slow_chunk_times_out_without_failing_the_others():
+    class SlowChunk(FakeService):
+        def get_real_time_quotes(self, symbols):
+            if "S0" in symbols:
+                time.sleep(0.5)
+            return super().get_real_time_quotes(symbols)
+
+    result = asyncio.run(AsyncSchwabService(SlowChunk()).get_quotes_chunked(
+        ["S0", "S1"], chunk_size=1, concurrency=2, timeout=0.2
+    ))
+    assert result["errors"] == {"S0": "timed out"}
+    assert "S1" in result
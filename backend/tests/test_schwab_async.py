@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import pytest
+
+from app.schwab_async import AsyncSchwabService, SchwabCallTimeout, shutdown_executor
+
+
+def test_call_returns_the_result_within_the_deadline():
+    facade = AsyncSchwabService(None, default_timeout=1.0)
+    assert asyncio.run(facade.call(lambda a, b: a + b, 2, 3)) == 5
+    assert (facade.calls, facade.timeouts, facade.in_flight) == (1, 0, 0)
+
+
+def test_call_past_its_deadline_raises_and_frees_the_caller():
+    facade = AsyncSchwabService(None, default_timeout=5.0)
+
+    async def scenario():
+        started = time.perf_counter()
+        with pytest.raises(SchwabCallTimeout):
+            await facade.call(time.sleep, 0.5, timeout=0.05)
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 0.4
+    assert (facade.timeouts, facade.in_flight) == (1, 0)
+
+
+def test_calls_work_again_after_the_pool_is_shut_down():
+    facade = AsyncSchwabService(None)
+    assert asyncio.run(facade.call(lambda: "first lifespan")) == "first lifespan"
+    shutdown_executor()
+    assert asyncio.run(facade.call(lambda: "second lifespan")) == "second lifespan"
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from app import schwab_api
+from app.schwab_api import SchwabAPIService
+
+TOKENS = {"access_token": "at", "refresh_token": "rt", "id_token": "id", "expires_in": 1800}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_KEY", "k" * 32)
+    monkeypatch.setenv("APP_SECRET", "s" * 16)
+    monkeypatch.setattr(schwab_api, "SCHWAB_TOKENS_FILE", str(tmp_path / "tokens.json"))
+    return SchwabAPIService(backend="schwab")
+
+
+def fake_token_endpoint(monkeypatch, status_code, payload):
+    calls = []
+
+    def post(url, **kwargs):
+        calls.append((url, kwargs))
+        return httpx.Response(status_code, json=payload)
+
+    monkeypatch.setattr(schwab_api.httpx, "post", post)
+    return calls
+
+
+def test_code_is_exchanged_before_the_client_is_built(service, monkeypatch):
+    calls = fake_token_endpoint(monkeypatch, 200, TOKENS)
+    seen = {}
+
+    def initialize_client():
+        # schwabdev would start its interactive login if the tokens file were missing
+        seen["tokens_file"] = os.path.exists(schwab_api.SCHWAB_TOKENS_FILE)
+        return True
+
+    monkeypatch.setattr(service, "initialize_client", initialize_client)
+    result = asyncio.run(service.exchange_code_for_tokens("C0DE@"))
+
+    assert result["success"] and seen["tokens_file"]
+    url, kwargs = calls[0]
+    assert url == schwab_api.SCHWAB_TOKEN_URL
+    assert kwargs["data"]["grant_type"] == "authorization_code" and kwargs["data"]["code"] == "C0DE@"
+    with open(schwab_api.SCHWAB_TOKENS_FILE) as f:
+        stored = json.load(f)
+    assert stored["token_dictionary"] == TOKENS
+    assert stored["access_token_issued"] == stored["refresh_token_issued"]
+
+
+def test_rejected_code_reports_failure_without_building_a_client(service, monkeypatch):
+    fake_token_endpoint(monkeypatch, 400, {"error": "invalid_grant"})
+    monkeypatch.setattr(service, "initialize_client", lambda: pytest.fail("client built without tokens"))
+
+    assert asyncio.run(service.exchange_code_for_tokens("expired")) is None
+    assert not os.path.exists(schwab_api.SCHWAB_TOKENS_FILE)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app import screener as screener_module
+from app.screener import Screener, score_shard
+
+
+def random_bars(symbols: int, bars: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, (symbols, bars)), axis=1)
+    spread = rng.uniform(0.1, 1.0, (symbols, bars))
+    return close + spread, close - spread, close
+
+
+def test_small_universe_scores_in_process_without_a_pool():
+    high, low, close = random_bars(20, 80)
+    screener = Screener(workers=2)
+    scores, shards = screener._score(high, low, close)
+
+    assert shards == 1
+    assert screener._pool is None
+    np.testing.assert_array_equal(scores["score"], score_shard(high, low, close)["score"])
+
+
+def test_sharded_scores_match_in_process_scores(monkeypatch):
+    monkeypatch.setattr(screener_module, "SCREENER_PARALLEL_MIN_SYMBOLS", 10)
+    high, low, close = random_bars(30, 80)
+    expected = score_shard(high, low, close)
+
+    screener = Screener(workers=2)
+    try:
+        scores, shards = screener._score(high, low, close)
+        assert screener._pool is not None
+    finally:
+        screener.shutdown()
+
+    assert shards == 2
+    assert scores.keys() == expected.keys()
+    for key, values in expected.items():
+        np.testing.assert_allclose(scores[key], values, rtol=1e-12, equal_nan=True, err_msg=key)
+    ranking = lambda s: np.argsort(-np.nan_to_num(s["score"], nan=-1.0), kind="stable").tolist()
+    assert ranking(scores) == ranking(expected)
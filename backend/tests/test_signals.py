@@ -0,0 +1,127 @@
+import json
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+
+from app import signals
+from app.models import StrategyType, TradeSide
+from app.signals import (
+    CompiledStrategy, MacdCrossRule, MovingAverageTrendRule, RsiReversionRule, SignalEngine,
+)
+
+
+class CollectingWriter:
+    def __init__(self):
+        self.rows = []
+
+    def submit_many(self, rows):
+        self.rows.extend(rows)
+
+
+def strategy_row(strategy_id, strategy_type, **params):
+    return SimpleNamespace(id=strategy_id, name=f"strategy-{strategy_id}", type=strategy_type,
+                           is_active=True, parameters=json.dumps(params))
+
+
+def run(rule, sequence, closes=None):
+    memory = {}
+    closes = closes or [100.0] * len(sequence)
+    return [rule.evaluate(memory, close, values) for close, values in zip(closes, sequence)]
+
+
+def test_macd_cross_fires_on_zero_crossings_filtered_by_rsi():
+    rule = MacdCrossRule({"rsi_max": 70, "rsi_min": 30})
+    decisions = run(rule, [
+        {"MACD_HIST": -0.2, "RSI_14": 45, "ATR_14": 1.0},
+        {"MACD_HIST": 0.3, "RSI_14": 55, "ATR_14": 1.0},   # crosses up
+        {"MACD_HIST": 0.1, "RSI_14": 60, "ATR_14": 1.0},
+        {"MACD_HIST": -0.1, "RSI_14": 25, "ATR_14": 1.0},  # crosses down, but RSI too low
+        {"MACD_HIST": 0.2, "RSI_14": 75, "ATR_14": 1.0},   # crosses up, but RSI too high
+        {"MACD_HIST": -0.4, "RSI_14": 50, "ATR_14": 1.0},  # crosses down
+    ])
+
+    assert [d[0] if d else None for d in decisions] == [None, TradeSide.BUY, None, None, None, TradeSide.SELL]
+    assert decisions[5][1] > decisions[1][1] > 0.5
+
+
+def test_moving_average_trend_follows_the_sma_trend():
+    rule = MovingAverageTrendRule({})
+    uptrend = {"SMA_20": 101.0, "SMA_50": 100.0, "ATR_14": 1.0}
+    downtrend = {"SMA_20": 99.0, "SMA_50": 100.0, "ATR_14": 1.0}
+    decisions = run(rule, [uptrend, uptrend, uptrend, downtrend, downtrend, downtrend],
+                    closes=[100.0, 102.0, 100.5, 98.0, 99.5, 98.5])
+
+    # Crossings against the trend (bars 3 and 5) are ignored
+    assert [d[0] if d else None for d in decisions] == [None, TradeSide.BUY, None, None, None, TradeSide.SELL]
+
+
+def test_rsi_reversion_reports_the_excursion_extreme():
+    rule = RsiReversionRule({"oversold": 30, "overbought": 70})
+    decisions = run(rule, [{"RSI_14": r} for r in (40, 28, 22, 26, 33, 75, 81, 68)])
+
+    assert [d[0] if d else None for d in decisions] == [None] * 4 + [TradeSide.BUY, None, None, TradeSide.SELL]
+    assert "low 22.0" in decisions[4][2]
+    assert "high 81.0" in decisions[7][2]
+
+
+@pytest.mark.parametrize("symbols", ["AAPL", {"AAPL": 1}, ["AAPL", 3]])
+def test_load_rejects_symbols_that_are_not_a_list(symbols):
+    engine = SignalEngine()
+    loaded = engine.load([
+        strategy_row(1, StrategyType.TECHNICAL, symbols=symbols),
+        strategy_row(2, StrategyType.TECHNICAL, symbols=["aapl"]),
+        strategy_row(3, StrategyType.TECHNICAL, symbols="*"),
+    ])
+
+    assert loaded == 2
+    assert [s.id for s in engine._index[("5m", "AAPL")]] == [2]
+    assert [s.id for s in engine._index[("5m", None)]] == [3]
+    assert ("5m", "A") not in engine._index
+
+
+def test_rotation_starts_each_tick_with_a_different_strategy(monkeypatch):
+    # Every clock read advances one second, so only the first strategy fits the budget
+    ticks = count()
+    monkeypatch.setattr(signals, "time", SimpleNamespace(perf_counter=lambda: float(next(ticks))))
+    engine = SignalEngine(budget_ms=500)
+    engine.load([strategy_row(i, StrategyType.MEAN_REVERSION, symbols=["AAPL"]) for i in (1, 2, 3)])
+
+    evaluated = []
+    for _ in range(3):
+        before = {s.id: s.stats.evaluations for s in engine._strategies}
+        engine.on_indicators("AAPL", "5m", {"close": 100.0}, {"RSI_14": 50.0})
+        evaluated += [s.id for s in engine._strategies if s.stats.evaluations > before[s.id]]
+
+    assert sorted(evaluated) == [1, 2, 3]
+    assert engine.budget_exceeded == 3
+    assert engine.evaluations_skipped == 6
+
+
+def test_signal_row_places_stops_on_the_losing_side():
+    strategy = CompiledStrategy(7, "macd", StrategyType.TECHNICAL,
+                                {"symbols": ["AAPL"], "timeframe": "1m", "stop_atr": 1.5, "take_atr": 2.0})
+    values = {"ATR_14": 2.0}
+
+    buy = SignalEngine._signal_row(strategy, "AAPL", 100.0, values, (TradeSide.BUY, 1.2, "up"))
+    sell = SignalEngine._signal_row(strategy, "AAPL", 100.0, values, (TradeSide.SELL, 0.8, "down"))
+    no_atr = SignalEngine._signal_row(strategy, "AAPL", 100.0, {}, (TradeSide.BUY, 0.8, "up"))
+
+    assert (buy["stop_loss"], buy["take_profit"], buy["confidence"]) == (97.0, 104.0, 1.0)
+    assert (sell["stop_loss"], sell["take_profit"], sell["confidence"]) == (103.0, 96.0, 0.8)
+    assert (no_atr["stop_loss"], no_atr["take_profit"]) == (None, None)
+    assert buy["reasoning"] == "[1m] up"
+    assert buy["strategy_id"] == 7 and not buy["is_executed"]
+
+
+def test_min_confidence_filters_queued_signals():
+    writer = CollectingWriter()
+    engine = SignalEngine(writer=writer)
+    engine.load([
+        strategy_row(1, StrategyType.MEAN_REVERSION, symbols="*", min_confidence=0.0),
+        strategy_row(2, StrategyType.MEAN_REVERSION, symbols="*", min_confidence=0.99),
+    ])
+    for rsi in (25, 35):
+        engine.on_indicators("MSFT", "5m", {"close": 50.0}, {"RSI_14": rsi})
+
+    assert [(row["strategy_id"], row["side"]) for row in writer.rows] == [(1, TradeSide.BUY)]
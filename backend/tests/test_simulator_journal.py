@@ -0,0 +1,25 @@
+import json
+
+from app import market_simulator
+from app.market_simulator import SimulatedClient, SimulatedStream
+from app.stream_subscriptions import subscription_manager
+from app.market_stream import handle_stream_message
+from app.tick_journal import TickJournal, trading_day
+
+
+def test_simulated_streams_are_not_journaled():
+    assert subscription_manager.handler is handle_stream_message
+
+
+def test_journal_source_replays_the_latest_closed_day(tmp_path, monkeypatch):
+    journal = TickJournal(str(tmp_path))
+    closed_ms = 1_700_000_040_000
+    journal.append(json.dumps({"day": "closed"}), closed_ms)
+    journal.append(json.dumps({"day": "today"}))
+    journal.close()
+    monkeypatch.setattr("app.tick_journal.tick_journal", journal)
+    monkeypatch.setattr(market_simulator, "SIMULATOR_JOURNAL_DAY", None)
+    assert trading_day(closed_ms) < trading_day()
+
+    source = SimulatedStream(SimulatedClient(), source="journal")._frames()
+    assert [json.loads(next(source))["day"] for _ in range(3)] == ["closed"] * 3
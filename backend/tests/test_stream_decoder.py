@@ -0,0 +1,88 @@
+import json
+
+from app.stream_decoder import (
+    LEVELONE_EQUITY_SUBSCRIBE_FIELDS, LEVELONE_FUTURES_SUBSCRIBE_FIELDS, QuoteRecord, StreamDecoder,
+    equity_fields, loads,
+)
+
+# Shaped like the streamer's frames: a full first item, then deltas carrying only changed fields
+EQUITY_FRAMES = [
+    {"data": [{"service": "LEVELONE_EQUITIES", "timestamp": 1700000001000, "command": "SUBS", "content": [
+        {"key": "AAPL", "delayed": False, "assetMainType": "EQUITY", "assetSubType": "COE", "cusip": "037833100",
+         "1": 189.51, "2": 189.53, "3": 189.52, "4": 3, "5": 5, "8": 41234567, "9": 100,
+         "10": 190.1, "11": 187.9, "12": 188.0, "17": 188.2, "18": 1.52, "19": 199.62, "20": 164.08,
+         "33": 189.52, "34": 1700000000950, "35": 1700000000900},
+    ]}]},
+    {"data": [{"service": "LEVELONE_EQUITIES", "timestamp": 1700000002000, "command": "SUBS", "content": [
+        {"key": "AAPL", "delayed": False, "3": 189.6, "8": 41234667, "9": 100, "18": 1.6, "35": 1700000001990},
+    ]}]},
+]
+
+FUTURES_FRAMES = [
+    {"data": [{"service": "LEVELONE_FUTURES", "timestamp": 1700000001500, "command": "SUBS", "content": [
+        {"key": "/ESZ23", "delayed": False, "1": 4500.0, "2": 4500.25, "3": 4500.25, "4": 12, "5": 9,
+         "8": 812345, "9": 2, "10": 1700000001400, "11": 1700000001450, "12": 4512.5, "13": 4488.0,
+         "14": 4490.0, "16": "E-mini S&P 500 Index Futures,Dec-2023,ETH", "18": 4491.0, "19": 10.25,
+         "20": 0.0023, "23": 2123456},
+    ]}]},
+    {"data": [{"service": "LEVELONE_FUTURES", "timestamp": 1700000002500, "command": "SUBS", "content": [
+        {"key": "/ESZ23", "3": 4501.0, "8": 812400, "11": 1700000002450, "12": 4513.0},
+    ]}]},
+]
+
+
+def decode(decoder, frames):
+    for frame in frames:
+        for section in loads(json.dumps(frame).encode())["data"]:
+            for item in section["content"]:
+                fields = equity_fields(section["service"], {k: v for k, v in item.items() if k != "key"})
+                decoder.apply(item["key"], fields, section["timestamp"])
+
+
+def test_equity_deltas_merge_into_one_record():
+    decoder = StreamDecoder()
+    decode(decoder, EQUITY_FRAMES)
+    record = decoder.get("AAPL")
+
+    # Changed by the delta
+    assert (record.last, record.volume, record.net_change, record.trade_time) == (189.6, 41234667, 1.6, 1700000001990)
+    # Carried over from the first item
+    assert (record.bid, record.ask, record.bid_size, record.ask_size) == (189.51, 189.53, 3, 5)
+    assert (record.open, record.high, record.low, record.close) == (188.2, 190.1, 187.9, 188.0)
+    assert (record.high_52w, record.low_52w, record.mark, record.quote_time) == (199.62, 164.08, 189.52, 1700000000950)
+    assert record.updated_ms == 1700000002000
+    assert isinstance(record.volume, int) and isinstance(record.bid_size, int)
+
+
+def test_futures_items_decode_through_the_equity_codes():
+    decoder = StreamDecoder()
+    decode(decoder, FUTURES_FRAMES)
+    record = decoder.get("/ESZ23")
+
+    assert (record.last, record.volume, record.high) == (4501.0, 812400, 4513.0)
+    assert (record.bid, record.ask, record.bid_size, record.ask_size, record.last_size) == (4500.0, 4500.25, 12, 9, 2)
+    assert (record.low, record.close, record.open, record.net_change) == (4488.0, 4490.0, 4491.0, 10.25)
+    assert (record.quote_time, record.trade_time) == (1700000001400, 1700000002450)
+    # Futures-only fields (description, percent change, open interest) have no equity code
+    assert record.high_52w is None and record.mark is None
+
+    row = record.market_data_row()
+    assert row["price"] == 4501.0 and row["change_percent"] == 10.25 / 4490.0 * 100
+
+
+def test_record_fields_are_slotted_and_unset_until_streamed():
+    record = StreamDecoder().apply("MSFT", {"1": "401.5", "4": "7", "3": None})
+
+    assert record.bid == 401.5 and record.bid_size == 7
+    assert record.last is None and record.market_data_row() is None
+    assert not hasattr(record, "__dict__")
+    assert set(record.to_dict()) == set(QuoteRecord.__slots__)
+
+
+def test_subscribe_fields_cover_every_decoded_code():
+    equity = LEVELONE_EQUITY_SUBSCRIBE_FIELDS.split(",")
+    futures = LEVELONE_FUTURES_SUBSCRIBE_FIELDS.split(",")
+    assert equity[0] == futures[0] == "0"
+    assert [int(c) for c in equity] == sorted(int(c) for c in equity)
+    assert {"1", "3", "8", "18", "33", "35"} <= set(equity)
+    assert {"10", "11", "14", "18", "19"} <= set(futures) and "16" not in futures
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import threading
+import time
+
+from app.stream_hub import StreamHub
+
+
+def test_slow_client_gets_only_the_latest_quote_per_symbol():
+    hub = StreamHub()
+    flush_threads = set()
+    flush = hub._flush
+
+    def recording_flush():
+        flush_threads.add(threading.get_ident())
+        flush()
+
+    hub._flush = recording_flush
+
+    def publish_from_streamer():
+        hub.publish("AAPL", {"1": 189.5})
+        for i in range(200):
+            hub.publish("AAPL", {"3": 190 + i})
+            hub.publish("MSFT", {"3": 400 + i, "8": 1000 + i})
+            if i % 20 == 0:
+                time.sleep(0.002)
+
+    async def scenario():
+        hub.start()
+        fast, slow = hub.connect(), hub.connect()
+        fast.subscribe(["aapl", "MSFT"])
+        slow.subscribe(["AAPL", "msft"])
+
+        async def read_fast():
+            latest = {}
+            while latest != {"AAPL": 389, "MSFT": 599}:
+                for update in await fast.next_batch(timeout=1):
+                    latest[update.symbol] = json.loads(update.text)["quote"].get("lastPrice")
+            return latest
+
+        reader = asyncio.create_task(read_fast())
+        await asyncio.to_thread(publish_from_streamer)
+        await asyncio.wait_for(reader, 5)
+        batch = await slow.next_batch(timeout=0)
+        hub.stop()
+        return fast, slow, batch, threading.get_ident()
+
+    fast, slow, batch, loop_thread = asyncio.run(scenario())
+
+    quotes = {update.symbol: json.loads(update.text)["quote"] for update in batch}
+    assert quotes == {
+        "AAPL": {"bidPrice": 189.5, "lastPrice": 389},
+        "MSFT": {"lastPrice": 599, "totalVolume": 1199},
+    }
+    assert slow.delivered == 2
+    assert slow.conflated > 0
+    assert fast.delivered > slow.delivered
+    # Flushes ran on the event loop, scheduled from the publishing thread
+    assert flush_threads == {loop_thread}
+    assert hub.published == 401
+    # Each flushed quote was encoded once and shared by both clients
+    assert hub.fanned_out == 2 * hub.encoded
+    assert slow.delivered + fast.delivered + slow.conflated + fast.conflated == hub.fanned_out
@@ -0,0 +1,66 @@
+from app.market_simulator import SimulatedClient, SimulatedStream
+from app.stream_subscriptions import SubscriptionManager
+
+
+def subscribed(stream, service="LEVELONE_EQUITIES"):
+    return set(stream.subscriptions.get(service, {}))
+
+
+def manager_with_streams(shard_size=500):
+    client = SimulatedClient()
+    streams = {}
+
+    def factory(index):
+        # Like the Schwab client's streamer, one stream object per index outlives the shards
+        if index not in streams:
+            streams[index] = SimulatedStream(client, rate=10)
+        return streams[index]
+
+    return SubscriptionManager(factory, lambda message: None, shard_size=shard_size), streams
+
+
+def test_stop_forgets_subscriptions_on_the_long_lived_stream():
+    manager, streams = manager_with_streams()
+    try:
+        manager.set_symbols(["AAPL", "GOOG"])
+        manager.stop()
+        assert subscribed(streams[0]) == set()
+
+        manager.set_symbols(["MSFT"])
+        assert subscribed(streams[0]) == {"MSFT"}
+
+        assert manager.remove(["AAPL"])["removed"] == []
+        assert manager.remove(["MSFT"])["removed"] == ["MSFT"]
+        assert subscribed(streams[0]) == set()
+    finally:
+        manager.stop()
+
+
+def test_diff_only_sends_changes_and_stops_empty_shards():
+    manager, streams = manager_with_streams(shard_size=2)
+    try:
+        manager.set_symbols(["AAPL", "GOOG", "MSFT"])
+        assert len(manager.shards) == 2
+        assert subscribed(streams[0]) | subscribed(streams[1]) == {"AAPL", "GOOG", "MSFT"}
+
+        changes = manager.set_symbols(["AAPL", "GOOG"])
+        assert changes == {"added": [], "removed": ["MSFT"], "rejected": []}
+        emptied = manager.shards[1]
+        assert not emptied.started and not streams[1].active
+        assert subscribed(streams[1]) == set()
+
+        manager.add(["TSLA"])
+        assert emptied.started and subscribed(streams[1]) == {"TSLA"}
+    finally:
+        manager.stop()
+
+
+def test_symbols_beyond_the_shard_limit_are_rejected():
+    manager, _ = manager_with_streams(shard_size=1)
+    manager.max_shards = 1
+    try:
+        changes = manager.set_symbols(["AAPL", "MSFT"])
+        assert changes["added"] == ["AAPL"] and changes["rejected"] == ["MSFT"]
+        assert manager.desired["LEVELONE_EQUITIES"] == {"AAPL"}
+    finally:
+        manager.stop()
@@ -0,0 +1,68 @@
+-- 001: Convert market_data into a range-partitioned time-series table
+--
+-- * Primary key becomes (id, timestamp): the partition key must be part of it
+-- * One partition per day (market_data_pYYYYMMDD) plus a DEFAULT partition
+-- * (symbol, timestamp DESC) composite index replaces the separate symbol/timestamp indexes
+--
+-- The backend keeps partitions created ahead and drops expired ones
+-- (see backend/app/partitioning.py). Run once, during a quiet period:
+--
+--   psql "$DATABASE_URL" -f database/migrations/001_partition_market_data.sql
+
+BEGIN;
+
+ALTER TABLE market_data RENAME TO market_data_legacy;
+ALTER TABLE market_data_legacy RENAME CONSTRAINT market_data_pkey TO market_data_legacy_pkey;
+
+CREATE TABLE market_data (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    symbol VARCHAR(10) NOT NULL,
+    price NUMERIC(10, 4) NOT NULL,
+    volume INTEGER NOT NULL DEFAULT 0,
+    high NUMERIC(10, 4) NOT NULL,
+    low NUMERIC(10, 4) NOT NULL,
+    open_price NUMERIC(10, 4) NOT NULL,
+    change NUMERIC(10, 4) NOT NULL DEFAULT 0,
+    change_percent DOUBLE PRECISION NOT NULL DEFAULT 0,
+    bid NUMERIC(10, 4),
+    ask NUMERIC(10, 4),
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX ix_market_data_symbol_timestamp ON market_data (symbol, timestamp DESC);
+
+-- Daily partitions covering the existing data and the next three days
+DO $$
+DECLARE
+    day DATE;
+    last_day DATE := (now() AT TIME ZONE 'UTC')::date + 3;
+BEGIN
+    SELECT COALESCE(min(timestamp AT TIME ZONE 'UTC')::date, (now() AT TIME ZONE 'UTC')::date)
+      INTO day FROM market_data_legacy;
+    WHILE day <= last_day LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF market_data FOR VALUES FROM (%L) TO (%L)',
+            'market_data_p' || to_char(day, 'YYYYMMDD'),
+            -- Explicit UTC bounds: a bare date would be read in the session time zone
+            to_char(day, 'YYYY-MM-DD') || ' 00:00:00+00', to_char(day + 1, 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+        day := day + 1;
+    END LOOP;
+END $$;
+
+CREATE TABLE market_data_default PARTITION OF market_data DEFAULT;
+
+INSERT INTO market_data (id, symbol, price, volume, high, low, open_price, change,
+                         change_percent, bid, ask, timestamp, created_at)
+SELECT id, symbol, price, volume, high, low, open_price, change,
+       change_percent, bid, ask, timestamp, created_at
+FROM market_data_legacy;
+
+SELECT setval(pg_get_serial_sequence('market_data', 'id'), COALESCE(max(id), 0) + 1, false)
+FROM market_data;
+
+DROP TABLE market_data_legacy;
+
+COMMIT;
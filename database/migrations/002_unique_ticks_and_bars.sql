@@ -0,0 +1,27 @@
+-- 002: Unique (symbol, timestamp) ticks and (symbol, timeframe, timestamp) bars
+--
+-- The bulk writers insert with ON CONFLICT DO NOTHING on these keys, so a
+-- journal replay that overlaps rows already written does not duplicate them.
+-- Existing duplicates are removed first (the oldest row, lowest id, is kept).
+-- On the partitioned market_data table the index includes the partition key,
+-- as PostgreSQL requires. Run once, after 001:
+--
+--   psql "$DATABASE_URL" -f database/migrations/002_unique_ticks_and_bars.sql
+
+BEGIN;
+
+DELETE FROM market_data a
+USING market_data b
+WHERE a.symbol = b.symbol AND a.timestamp = b.timestamp AND a.id > b.id;
+
+DROP INDEX IF EXISTS ix_market_data_symbol_timestamp;
+CREATE UNIQUE INDEX ix_market_data_symbol_timestamp ON market_data (symbol, timestamp DESC);
+
+DELETE FROM market_bars a
+USING market_bars b
+WHERE a.symbol = b.symbol AND a.timeframe = b.timeframe AND a.timestamp = b.timestamp AND a.id > b.id;
+
+DROP INDEX IF EXISTS ix_market_bars_symbol_timeframe_timestamp;
+CREATE UNIQUE INDEX ix_market_bars_symbol_timeframe_timestamp ON market_bars (symbol, timeframe, timestamp DESC);
+
+COMMIT;